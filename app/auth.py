@@ -3,10 +3,15 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
 from passlib.context import CryptContext
 from datetime import datetime, timezone, timedelta
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.database import get_session  # No more circular import
 from app import models
-from typing import Optional
+from app.cache import TTLCache
+from app.metrics import registry
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
 from dotenv import load_dotenv
 
@@ -17,15 +22,51 @@ SECRET_KEY = os.getenv("SECRET_KEY") # JWT signing from .env
 ALGORITHM = "HS256"
 EXPIRATION_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto") 
+# Token subject -> CurrentUser, saves the user lookup on every authenticated request
+user_cache = TTLCache("auth_user", maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")), ttl=float(os.getenv("AUTH_CACHE_TTL", "60")))
+
+# Password hashing. Raising BCRYPT_ROUNDS rehashes each user's password at their next login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=int(os.getenv("BCRYPT_ROUNDS", "12")))
+
+# bcrypt takes hundreds of ms per call, so it runs on its own threads (it releases the GIL)
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(PASSWORD_WORKERS * 4))) # Waiting calls before 503
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+_password_calls = 0 # Running plus queued; only touched from the event loop
+password_rejections = registry.counter("password_pool_rejected_total", "Hash/verify calls refused with 503 because the pool was full.")
+
+async def _run_password_call(fn, *args):
+    """Run fn on the password pool, or 503 when the pool and its queue are full."""
+    global _password_calls
+    if _password_calls >= PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT:
+        password_rejections.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many password checks in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    _password_calls += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_pool, fn, *args)
+    finally:
+        _password_calls -= 1
+
+async def hash_password(password: str) -> str:
+    """bcrypt-hash a password off the event loop."""
+    return await _run_password_call(pwd_context.hash, password)
+
+async def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Check a password off the event loop. Also returns a new hash when the stored one uses outdated settings."""
+    return await _run_password_call(pwd_context.verify_and_update, password, hashed_password)
 
 # Define HTTPBearer scheme for JWT
 oauth2_scheme = HTTPBearer()
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """Create JWT access token with an expiration date."""
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, uid: Optional[int] = None) -> str:
+    """Create JWT access token with an expiration date. uid lets cache misses look the user up by primary key."""
     to_encode = data.copy()
+    if uid is not None:
+        to_encode["uid"] = uid
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
@@ -36,9 +77,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
-    session: Session = Depends(get_session)
-) -> models.User:
-    """Retrieve current authenticated user from JWT token"""
+    session: AsyncSession = Depends(get_session)
+) -> models.CurrentUser:
+    """Retrieve current authenticated user's identity from JWT token"""
     token = credentials.credentials # Extract token from auth header
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -61,11 +102,26 @@ async def get_current_user(
             detail="Invalid token",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = session.exec(select(models.User).where(models.User.username == username)).first()
+    current_user = user_cache.get(username)
+    if current_user is not None:
+        return current_user
+    uid = payload.get("uid")
+    if uid is not None:
+        user = await session.get(models.User, uid)
+        if user is not None and user.username != username:
+            user = None # Id now belongs to someone else
+    else:
+        user = (await session.exec(select(models.User).where(models.User.username == username))).first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
\ No newline at end of file
+    current_user = models.CurrentUser(id=user.id, username=user.username)
+    user_cache.set(username, current_user)
+    return current_user
+
+def invalidate_user(username: str):
+    """Drop a cached identity. Call whenever a user row is created, renamed or deleted."""
+    user_cache.pop(username)
\ No newline at end of file
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from app.metrics import registry
+
+cache_requests = registry.counter("cache_requests_total", "Cache lookups by cache and result (hit/miss).")
+
+def _hit_ratios():
+    lookups: Dict[str, Dict[str, float]] = {}
+    for labels, value in cache_requests.samples():
+        lookups.setdefault(labels.get("cache", ""), {}).setdefault(labels.get("result"), value)
+    for cache, results in sorted(lookups.items()):
+        total = results.get("hit", 0) + results.get("miss", 0)
+        if total:
+            yield {"cache": cache}, results.get("hit", 0) / total
+
+registry.gauge("cache_hit_ratio", "Hits over lookups since process start, by cache.", _hit_ratios)
+
+_MISSING = object()
+
+class TTLCache:
+    """In-process LRU mapping whose entries expire ttl seconds after they were set.
+
+    With maxbytes, entries are also evicted until the sizes passed to set() fit.
+    """
+    def __init__(self, name: str, maxsize: int, ttl: float, maxbytes: Optional[int] = None):
+        self.name, self.maxsize, self.ttl, self.maxbytes = name, maxsize, ttl, maxbytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict() # key -> (expires_at, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value for key, or default when missing or expired. Counts a hit or a miss."""
+        value = _MISSING
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    value = entry[1]
+                else:
+                    self._remove(key)
+        cache_requests.inc(cache=self.name, result="miss" if value is _MISSING else "hit")
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any, size: int = 0):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+            while len(self._entries) > self.maxsize or (self.maxbytes is not None and self._bytes > self.maxbytes):
+                self._remove(next(iter(self._entries))) # Least recently used
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._remove(key) if key in self._entries else None
+        return entry[1] if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> tuple:
+        entry = self._entries.pop(key)
+        self._bytes -= entry[2]
+        return entry
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,226 @@
+"""Item-item collaborative filtering over ratings and favorites.
+
+Interactions form a sparse user x recipe matrix (a favorite and a rating on the same
+recipe add up). Recipe columns are L2-normalized and each recipe keeps its
+NEIGHBORS most cosine-similar recipes, so a user's scores are one sparse
+vector-matrix product: their interaction row times the neighbor matrix.
+
+    python -m app.collaborative            # refresh recipes whose interactions changed
+    python -m app.collaborative --rebuild  # recompute every neighbor list
+
+A refresh diffs the current interactions against the stored matrix and recomputes
+similarities only for recipes whose interactions changed; no other pair can have moved.
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from app.embeddings import EMBEDDINGS_DIR
+from app.models import Favorite, Rating
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = "collaborative.npz"
+NEIGHBORS = 50 # Similar recipes kept per recipe
+CHUNK_SIZE = 2048 # Recipes per similarity block, bounds peak memory
+FAVORITE_WEIGHT = 1.0
+RATING_WEIGHTS = {1: 0.25, 2: 0.6, 3: 1.0} # A low rating is still a weak signal of interest
+
+class Model(NamedTuple):
+    user_ids: np.ndarray # Row -> user id
+    recipe_ids: np.ndarray # Column -> recipe id
+    interactions: sparse.csr_matrix # users x recipes
+    neighbors: sparse.csr_matrix # recipes x recipes, top NEIGHBORS per row
+
+def load_interactions(db_engine: Engine) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(user ids, recipe ids, weights) for every rating and favorite; pairs may repeat."""
+    with db_engine.connect() as connection:
+        ratings = connection.execute(select(Rating.user_id, Rating.recipe_id, Rating.value)).all()
+        favorites = connection.execute(select(Favorite.user_id, Favorite.recipe_id)).all()
+    users = np.array([row[0] for row in ratings] + [row[0] for row in favorites], dtype=np.int64)
+    recipes = np.array([row[1] for row in ratings] + [row[1] for row in favorites], dtype=np.int64)
+    weights = np.array([RATING_WEIGHTS[row[2]] for row in ratings] + [FAVORITE_WEIGHT] * len(favorites), dtype=np.float32)
+    return users, recipes, weights
+
+def _extend_ids(known: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """known followed by the unseen ids, so existing rows and columns keep their index."""
+    new = np.setdiff1d(np.unique(ids), known, assume_unique=True)
+    return np.concatenate([known, new]).astype(np.int64)
+
+def _positions(known: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    order = np.argsort(known, kind="stable")
+    return order[np.searchsorted(known[order], ids)]
+
+def _resize(matrix: sparse.csr_matrix, shape: Tuple[int, int]) -> sparse.csr_matrix:
+    matrix = matrix.copy()
+    matrix.resize(shape)
+    return matrix
+
+def _normalized_columns(interactions: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(interactions.multiply(interactions).sum(axis=0))).ravel()
+    return (interactions @ sparse.diags(np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0))).tocsr()
+
+def _similarities(normalized: sparse.csr_matrix, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(row, col, cosine) of every positive similarity between the recipe columns in rows and all others."""
+    transposed = normalized.T.tocsr()
+    parts = []
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        block = (transposed[chunk] @ normalized).tocoo()
+        row = chunk[block.row]
+        keep = (block.col != row) & (block.data > 0)
+        parts.append((row[keep], block.col[keep], block.data[keep]))
+    if not parts:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+    return tuple(np.concatenate(values) for values in zip(*parts))
+
+def _prune(row: np.ndarray, col: np.ndarray, data: np.ndarray, size: int) -> sparse.csr_matrix:
+    """Neighbor matrix keeping the NEIGHBORS highest similarities per row."""
+    order = np.lexsort((-data, row))
+    row, col, data = row[order], col[order], data[order]
+    rank = np.arange(len(row)) - np.searchsorted(row, row)
+    keep = rank < NEIGHBORS
+    return sparse.csr_matrix((data[keep].astype(np.float32), (row[keep], col[keep])), shape=(size, size))
+
+def build_model(users: np.ndarray, recipes: np.ndarray, weights: np.ndarray, previous: Optional[Model] = None) -> Tuple[Model, int]:
+    """Model for these interactions and the number of recipes whose similarities were recomputed.
+
+    With previous, only recipes whose interactions changed are recomputed. Their new
+    similarities replace the old ones in every other recipe's list too (similarity is
+    symmetric). A recipe pushed out of a list by a drop is not replaced until the next
+    rebuild, so lists can run short of NEIGHBORS between rebuilds.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    user_ids = _extend_ids(previous.user_ids if previous else empty, users)
+    recipe_ids = _extend_ids(previous.recipe_ids if previous else empty, recipes)
+    shape = (len(user_ids), len(recipe_ids))
+    interactions = sparse.csr_matrix(
+        (weights, (_positions(user_ids, users), _positions(recipe_ids, recipes))), shape=shape, dtype=np.float32
+    )
+    interactions.sum_duplicates()
+    normalized = _normalized_columns(interactions)
+    if previous is None:
+        touched = np.arange(shape[1])
+        neighbors = _prune(*_similarities(normalized, touched), shape[1])
+        return Model(user_ids, recipe_ids, interactions, neighbors), len(touched)
+    changed = abs(interactions - _resize(previous.interactions, shape))
+    changed.eliminate_zeros()
+    touched = np.unique(changed.indices)
+    neighbors = _resize(previous.neighbors, (shape[1], shape[1]))
+    if len(touched):
+        kept = neighbors.tocoo()
+        is_touched = np.zeros(shape[1], dtype=bool)
+        is_touched[touched] = True
+        keep = ~is_touched[kept.row] & ~is_touched[kept.col]
+        row, col, data = _similarities(normalized, touched)
+        mirrored = ~is_touched[col] # Pairs of two touched recipes are already in both directions
+        neighbors = _prune(
+            np.concatenate([kept.row[keep], row, col[mirrored]]),
+            np.concatenate([kept.col[keep], col, row[mirrored]]),
+            np.concatenate([kept.data[keep], data, data[mirrored]]),
+            shape[1],
+        )
+    return Model(user_ids, recipe_ids, interactions, neighbors), len(touched)
+
+def save_model(path: Path, model: Model):
+    """Write the whole model to one file and rename it into place, so readers never see a mix."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp.npz")
+    arrays = {"user_ids": model.user_ids, "recipe_ids": model.recipe_ids}
+    for name in ("interactions", "neighbors"):
+        matrix = getattr(model, name)
+        arrays.update({f"{name}_data": matrix.data, f"{name}_indices": matrix.indices, f"{name}_indptr": matrix.indptr})
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+def load_model(path: Path) -> Model:
+    with np.load(path) as arrays:
+        user_ids, recipe_ids = arrays["user_ids"], arrays["recipe_ids"]
+        matrices = {
+            name: sparse.csr_matrix((arrays[f"{name}_data"], arrays[f"{name}_indices"], arrays[f"{name}_indptr"]), shape=shape)
+            for name, shape in (("interactions", (len(user_ids), len(recipe_ids))), ("neighbors", (len(recipe_ids), len(recipe_ids))))
+        }
+    return Model(user_ids, recipe_ids, matrices["interactions"], matrices["neighbors"])
+
+def update_model(db_engine: Engine, directory: Path = EMBEDDINGS_DIR, rebuild: bool = False) -> int:
+    """Refresh (or rebuild) the stored model from the database. Returns recipes recomputed."""
+    path = directory / MODEL_FILE
+    previous = load_model(path) if path.exists() and not rebuild else None
+    model, recomputed = build_model(*load_interactions(db_engine), previous=previous)
+    if previous is None or recomputed:
+        save_model(path, model)
+    return recomputed
+
+class CollaborativeIndex:
+    """Read side: loads the stored model and reloads it when the file is replaced."""
+    def __init__(self, directory: Path = EMBEDDINGS_DIR):
+        self.directory = Path(directory)
+        self._loaded: Optional[Tuple[int, Model, np.ndarray, np.ndarray]] = None # mtime, model, sorted ids, order
+
+    def refresh(self) -> bool:
+        """One stat call when nothing changed. False if no model has been built."""
+        path = self.directory / MODEL_FILE
+        try:
+            mtime = path.stat().st_mtime_ns
+            if self._loaded is not None and self._loaded[0] == mtime:
+                return True
+            model = load_model(path)
+        except FileNotFoundError:
+            self._loaded = None
+            return False
+        order = np.argsort(model.recipe_ids, kind="stable")
+        self._loaded = (mtime, model, model.recipe_ids[order], order)
+        return True
+
+    def _columns(self, recipe_ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Columns of the recipe ids that are in the model, and a mask of which ids were."""
+        _, _, sorted_ids, order = self._loaded
+        lookup = np.asarray(recipe_ids, dtype=np.int64)
+        if not len(sorted_ids) or not len(lookup):
+            return np.empty(0, dtype=np.intp), np.zeros(len(lookup), dtype=bool)
+        positions = np.searchsorted(sorted_ids, lookup).clip(max=len(sorted_ids) - 1)
+        found = sorted_ids[positions] == lookup
+        return order[positions[found]], found
+
+    def recommend(self, weights: Dict[int, float], exclude_ids: Iterable[int], k: int) -> List[Tuple[int, float]]:
+        """Top k (recipe id, score) for a user's {recipe id: interaction weight}, best first."""
+        if not weights or not self.refresh():
+            return []
+        model = self._loaded[1]
+        columns, found = self._columns(list(weights))
+        if not len(columns):
+            return []
+        values = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))[found]
+        user = sparse.csr_matrix((values, (np.zeros(len(columns), dtype=np.intp), columns)), shape=(1, len(model.recipe_ids)))
+        scores = (user @ model.neighbors).tocoo() # Touches only the neighbors of the user's recipes
+        candidates, candidate_scores = scores.col, scores.data
+        excluded, _ = self._columns(list(exclude_ids))
+        keep = ~np.isin(candidates, excluded)
+        candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+        if len(candidates) > k:
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+            candidates, candidate_scores = candidates[top], candidate_scores[top]
+        order = np.argsort(-candidate_scores, kind="stable")
+        return [(int(model.recipe_ids[column]), float(score)) for column, score in zip(candidates[order], candidate_scores[order])]
+
+interaction_index = CollaborativeIndex()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="Recompute every recipe's neighbors")
+    parser.add_argument("--dir", type=Path, default=EMBEDDINGS_DIR)
+    args = parser.parse_args()
+
+    from app.database import engine
+    started = time.perf_counter()
+    recomputed = update_model(engine, args.dir, rebuild=args.rebuild)
+    print(f"Recomputed neighbors of {recomputed} recipes in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
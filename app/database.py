@@ -1,64 +1,219 @@
-import json
+import os
+from typing import Dict, Tuple
 from sqlmodel import SQLModel, create_engine, Session, select
-from sqlalchemy.engine import Engine
-from app.models import Recipe
-from random import randint
+from sqlalchemy import event, inspect, text, make_url
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models import Recipe, TableVersion
+from app.search import rebuild_search_index
+from app.facets import backfill_recipe_terms
+from app.seed import HASHED_FIELDS, content_hash
+from app.metrics import instrument_engine
+from dotenv import load_dotenv
 import logging
 
-# using SQLite for now, echo=True for debugging
-DATABASE_URL = "sqlite:///recipes.db"
-engine = create_engine(DATABASE_URL, echo=True)
+load_dotenv()
+
+# asyncio driver used by the request-serving engine for each backend
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+# PRAGMAs run on every new SQLite connection, chosen by SQLITE_PROFILE
+SQLITE_PROFILES = {
+    # Stock SQLite: rollback journal, so a writer blocks readers and vice versa
+    "default": {},
+    "production": {
+        "journal_mode": "WAL", # Readers no longer block the writer (persists in the file)
+        "synchronous": "NORMAL", # Safe under WAL, fsyncs at checkpoints instead of every commit
+        "busy_timeout": 5000, # ms to wait for the write lock before "database is locked"
+        "mmap_size": 268435456, # Read up to 256 MiB through memory mapping
+        "cache_size": -65536, # Negative is KiB, so 64 MiB of page cache per connection
+    },
+}
+
+def to_async_url(url: str) -> str:
+    """Swap a database URL's driver for its asyncio counterpart (sqlite -> sqlite+aiosqlite)."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+def pool_options(url: str) -> Dict[str, object]:
+    """Connection pool settings for url from DB_POOL_* environment variables."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {} # In-memory SQLite is pinned to one connection, there is no pool to size
+    options = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    }
+    if parsed.get_backend_name() != "sqlite":
+        # Servers and proxies drop idle connections, so test and recycle them
+        options["pool_pre_ping"] = True
+        options["pool_recycle"] = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    return options
+
+def set_sqlite_pragmas(db_engine: Engine, pragmas: Dict[str, object]):
+    """Run the pragmas on every connection db_engine opens (pass AsyncEngine.sync_engine for async)."""
+    if not pragmas:
+        return
+    @event.listens_for(db_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_engines(url: str, sqlite_profile: str = "production") -> Tuple[Engine, AsyncEngine]:
+    """Sync and async engines for url, sharing pool settings and the SQLite profile's pragmas."""
+    if sqlite_profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile {sqlite_profile!r}, expected one of {list(SQLITE_PROFILES)}")
+    echo = os.getenv("DB_ECHO", "").lower() in ("1", "true") # Logs every statement, debugging only
+    sync_engine = create_engine(url, echo=echo, **pool_options(url))
+    async_engine = create_async_engine(to_async_url(url), echo=echo, **pool_options(url))
+    for db_engine in (sync_engine, async_engine.sync_engine):
+        if make_url(url).get_backend_name() == "sqlite":
+            set_sqlite_pragmas(db_engine, SQLITE_PROFILES[sqlite_profile])
+        instrument_engine(db_engine)
+    return sync_engine, async_engine
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///recipes.db")
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+# Sync engine for schema setup and seeding, async engine for request handlers
+engine, async_engine = create_engines(DATABASE_URL, SQLITE_PROFILE)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Rebuilds every recipe's rating aggregates from the rating table
+RECOMPUTE_RATING_TOTALS = (
+    "UPDATE recipe SET "
+    "rating_count = (SELECT COUNT(*) FROM rating WHERE rating.recipe_id = recipe.id), "
+    "rating_sum = (SELECT COALESCE(SUM(value), 0) FROM rating WHERE rating.recipe_id = recipe.id)"
+)
+
 def create_db_and_tables(db_engine: Engine = engine):
-    """Creates all DB tables defined in models and seeds initial data if empty."""
+    """Creates all DB tables defined in models and upgrades tables from older versions. Does not seed."""
     SQLModel.metadata.create_all(db_engine)
-    with Session(db_engine) as session:
-        # Check if the recipes table is empty
-        recipe_count = session.exec(select(Recipe)).all()
-        if not recipe_count:  # If empty, seed data
-            # Load the JSON file
-            # with open("./data/recipeData.json", "r") as file:
-            with open("app/data/frenchcookingacademy.json", "r") as file:
-                recipes_data = json.load(file)
-            
-            # Add this for other Ollama parsed JSON files
-            recipe_list = recipes_data["recipes"]
-
-            # Insert each recipe from the JSON file
-            for recipe_entry in recipe_list:
-                # Map JSON fields to Recipe model
-                recipe_data = recipe_entry["recipe"] 
-                # Convert ingredients list to a string
-                ingredients_str = ", ".join(
-                    f"{ing['amount']} {ing['unit']} {ing['id']}"+"\n" 
-                    for ing in recipe_data["ingredients"]
-                )
-                # Serialize Python objects into strong w/ JSON syntax
-                tags_json = json.dumps(recipe_data.get("tags", []))
-                instructions_json = json.dumps(recipe_data.get("instructions", []))
-                
-                sample_recipe = Recipe(
-                    title=recipe_data["title"],
-                    description=recipe_data["description"],
-                    ingredients=ingredients_str,
-                    instructions=instructions_json,
-                    author_id=randint(1, 10),
-                    category=recipe_data.get("category", ""),
-                    image_source=recipe_data["image_source"],
-                    serves=recipe_data["serves"],
-                    time=recipe_data["time"],
-                    tags=tags_json
-                )
-                session.add(sample_recipe)
-            
-            session.commit()
-            print(f"Seeded database with {len(recipes_data)} recipes from recipeData.json.")
-
-def get_session():
-    """Yields a database session for FastAPI."""
-    with Session(engine) as session:
+    migrate_rating_aggregates(db_engine)
+    migrate_content_hash(db_engine) # Must run before its unique index is created
+    dedupe_user_recipe_rows(db_engine) # Must run before the unique indexes are created
+    ensure_indexes(db_engine)
+    # Older DBs only have the joined ingredient string and tags JSON, so parse those once
+    backfilled = backfill_recipe_terms(db_engine)
+    if backfilled:
+        logger.info(f"Backfilled ingredient/tag rows for {backfilled} recipes")
+    # Triggers keep it in sync afterwards; rebuild covers DBs created before the index existed
+    rebuild_search_index(db_engine)
+
+def ensure_indexes(db_engine: Engine = engine):
+    """Create model indexes missing from tables that predate them (create_all skips existing tables).
+
+    Indexes on columns a later revision adds are left to that revision.
+    """
+    with db_engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            columns = {column["name"] for column in inspect(connection).get_columns(table.name)}
+            for index in table.indexes:
+                if all(column.name in columns for column in index.columns):
+                    # IF NOT EXISTS rather than checkfirst: reflection doesn't see expression indexes
+                    connection.execute(CreateIndex(index, if_not_exists=True))
+
+def migrate_rating_aggregates(db_engine: Engine = engine):
+    """Add recipe.rating_count/rating_sum to older DBs and fill them from existing ratings."""
+    columns = {column["name"] for column in inspect(db_engine).get_columns("recipe")}
+    if "rating_count" in columns:
+        return
+    with db_engine.begin() as connection:
+        connection.execute(text("ALTER TABLE recipe ADD COLUMN rating_count INTEGER NOT NULL DEFAULT 0"))
+        connection.execute(text("ALTER TABLE recipe ADD COLUMN rating_sum INTEGER NOT NULL DEFAULT 0"))
+        connection.execute(text(RECOMPUTE_RATING_TOTALS))
+    logger.info("Added rating aggregate columns to recipe")
+
+def migrate_content_hash(db_engine: Engine = engine):
+    """Add recipe.content_hash to older DBs and hash their rows so reseeding skips them."""
+    columns = {column["name"] for column in inspect(db_engine).get_columns("recipe")}
+    if "content_hash" in columns:
+        return
+    with db_engine.begin() as connection:
+        connection.execute(text("ALTER TABLE recipe ADD COLUMN content_hash VARCHAR"))
+        rows = connection.execute(select(Recipe.id, *(getattr(Recipe, field) for field in HASHED_FIELDS))).mappings()
+        seen = set()
+        updates = []
+        for row in rows:
+            hash = content_hash(row)
+            if hash not in seen: # Existing duplicates keep NULL rather than break the unique index
+                seen.add(hash)
+                updates.append({"row_id": row["id"], "hash": hash})
+        if updates:
+            connection.execute(text("UPDATE recipe SET content_hash = :hash WHERE id = :row_id"), updates)
+    logger.info(f"Added content_hash to recipe and hashed {len(updates)} rows")
+
+def migrate_recipe_versioning(db_engine: Engine = engine):
+    """Add recipe.updated_at (starting at created_at) and the recipe write counter to older DBs."""
+    SQLModel.metadata.create_all(db_engine, tables=[TableVersion.__table__])
+    columns = {column["name"] for column in inspect(db_engine).get_columns("recipe")}
+    with db_engine.begin() as connection:
+        if "updated_at" not in columns:
+            connection.execute(text("ALTER TABLE recipe ADD COLUMN updated_at TIMESTAMP"))
+            connection.execute(text("UPDATE recipe SET updated_at = created_at"))
+            logger.info("Added updated_at to recipe")
+        connection.execute(table_version_bump(connection, "recipe")) # Invalidates ETags issued before
+
+def migrate_source_url(db_engine: Engine = engine):
+    """Add recipe.source_url and its unique index to older DBs. Existing recipes keep NULL."""
+    columns = {column["name"] for column in inspect(db_engine).get_columns("recipe")}
+    if "source_url" not in columns:
+        with db_engine.begin() as connection:
+            connection.execute(text("ALTER TABLE recipe ADD COLUMN source_url VARCHAR"))
+        logger.info("Added source_url to recipe")
+    ensure_indexes(db_engine)
+
+def migrate_category_key(db_engine: Engine = engine):
+    """Replace the lower(category) index with the lower(trim(category)) one the filter and facet use."""
+    with db_engine.begin() as connection:
+        connection.execute(text("DROP INDEX IF EXISTS ix_recipe_category_lower"))
+    ensure_indexes(db_engine)
+
+def dedupe_user_recipe_rows(db_engine: Engine = engine):
+    """Drop duplicate (user_id, recipe_id) favorites and ratings left by the old read-then-insert."""
+    with db_engine.begin() as connection:
+        # Keep the first favorite and the most recent rating of each pair
+        favorites = connection.execute(text(
+            "DELETE FROM favorite WHERE id NOT IN "
+            "(SELECT MIN(id) FROM favorite GROUP BY user_id, recipe_id)"
+        )).rowcount
+        ratings = connection.execute(text(
+            "DELETE FROM rating WHERE id NOT IN "
+            "(SELECT MAX(id) FROM rating GROUP BY user_id, recipe_id)"
+        )).rowcount
+        if ratings:
+            connection.execute(text(RECOMPUTE_RATING_TOTALS))
+    if favorites or ratings:
+        logger.info(f"Removed {favorites} duplicate favorites and {ratings} duplicate ratings")
+
+def dialect_insert(session: Session | AsyncSession | Connection, model):
+    """INSERT construct for the session's backend, with on_conflict_do_nothing/do_update."""
+    if getattr(session, "bind", session).dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+def table_version_bump(session: Session | AsyncSession | Connection, table_name: str):
+    """Statement adding one to table_name's write counter. Execute it in the writing transaction."""
+    statement = dialect_insert(session, TableVersion).values(name=table_name, version=1)
+    return statement.on_conflict_do_update(index_elements=["name"], set_={"version": TableVersion.version + 1})
+
+async def get_table_version(session: AsyncSession, table_name: str) -> int:
+    """Current write counter for table_name, 0 if it was never written."""
+    version = (await session.exec(select(TableVersion.version).where(TableVersion.name == table_name))).first()
+    return version or 0
+
+async def get_session():
+    """Yields an async database session for FastAPI."""
+    # No expire on commit: lazy attribute reloads can't run outside an await
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
         yield session
\ No newline at end of file
@@ -0,0 +1,253 @@
+"""Content embeddings for recipes and the kNN index the recommendations router searches.
+
+Each recipe's ingredients, tags and category are hashed into EMBEDDING_DIM buckets,
+weighted by inverse document frequency and L2-normalized, so a dot product is cosine
+similarity. The matrix is stored as raw float32 rows and memory-mapped by every worker.
+
+    python -m app.embeddings            # embed recipes added since the last run (builds if missing)
+    python -m app.embeddings --rebuild  # re-embed everything and recompute IDF, e.g. nightly
+
+New recipes created through the API are appended right after the request, with the stored
+IDF; a nightly --rebuild folds them into fresh weights.
+"""
+import argparse
+import fcntl
+import json
+import os
+import time
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from app.facets import normalize_term
+from app.models import Recipe, RecipeIngredient, RecipeTag
+import logging
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_DIR = Path(os.getenv("EMBEDDINGS_DIR", "embeddings"))
+EMBEDDING_DIM = 128 # 100k recipes x 128 float32 is a 50 MB map; scanning it takes ~3 ms on one core
+METADATA_FILE = "index.json"
+
+Record = Tuple[int, List[str]] # recipe id, features
+
+def recipe_features(ingredient_names: Iterable[str], tags: Iterable[str], category: str = "") -> List[str]:
+    """Hashed feature names for one recipe. Multi-word ingredients also add their words,
+    so 'ground beef' shares weight with 'beef'."""
+    features = []
+    for name in ingredient_names:
+        name = normalize_term(name)
+        features.append(f"i:{name}")
+        words = name.split()
+        if len(words) > 1:
+            features.extend(f"w:{word}" for word in words)
+    features.extend(f"t:{normalize_term(str(tag))}" for tag in tags)
+    if category:
+        features.append(f"c:{normalize_term(category)}")
+    return features
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str) -> Tuple[int, float]:
+    """Bucket and sign for a feature; the sign keeps collisions from only ever adding up."""
+    h = zlib.crc32(feature.encode())
+    return h % EMBEDDING_DIM, 1.0 if h & 0x80000000 else -1.0
+
+def hashed_counts(feature_lists: Sequence[List[str]]) -> np.ndarray:
+    """Signed feature counts, one float32 row per feature list."""
+    rows, columns, signs = [], [], []
+    for row, features in enumerate(feature_lists):
+        for feature in features:
+            column, sign = _bucket(feature)
+            rows.append(row)
+            columns.append(column)
+            signs.append(sign)
+    counts = np.zeros((len(feature_lists), EMBEDDING_DIM), dtype=np.float32)
+    np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), np.array(signs, dtype=np.float32))
+    return counts
+
+def compute_idf(counts: np.ndarray) -> np.ndarray:
+    document_frequency = np.count_nonzero(counts, axis=0)
+    return (np.log((1 + len(counts)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+def embed(counts: np.ndarray, idf: np.ndarray) -> np.ndarray:
+    """IDF-weight and L2-normalize rows in place. Recipes without features stay zero."""
+    counts *= idf
+    norms = np.linalg.norm(counts, axis=1, keepdims=True)
+    np.divide(counts, norms, out=counts, where=norms > 0)
+    return counts
+
+def iter_recipe_features(db_engine: Engine, after_id: int = 0) -> Iterator[Record]:
+    """(id, features) for recipes with id > after_id, in id order, from the normalized term tables."""
+    ingredients, tags = defaultdict(list), defaultdict(list)
+    with db_engine.connect() as connection:
+        for recipe_id, name in connection.execute(select(RecipeIngredient.recipe_id, RecipeIngredient.name).where(RecipeIngredient.recipe_id > after_id)):
+            ingredients[recipe_id].append(name)
+        for recipe_id, tag in connection.execute(select(RecipeTag.recipe_id, RecipeTag.tag).where(RecipeTag.recipe_id > after_id)):
+            tags[recipe_id].append(tag)
+        for recipe_id, category in connection.execute(select(Recipe.id, Recipe.category).where(Recipe.id > after_id).order_by(Recipe.id)):
+            yield recipe_id, recipe_features(ingredients.pop(recipe_id, ()), tags.pop(recipe_id, ()), category)
+
+def _paths(directory: Path, generation: int) -> Tuple[Path, Path, Path]:
+    return (directory / f"vectors-{generation}.f32", directory / f"ids-{generation}.i64", directory / f"idf-{generation}.f32")
+
+def _read_metadata(directory: Path) -> Optional[dict]:
+    try:
+        return json.loads((directory / METADATA_FILE).read_text())
+    except FileNotFoundError:
+        return None
+
+@contextmanager
+def _write_lock(directory: Path):
+    """Serializes builds and appends across processes (several API workers may append)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def build_index(directory: Path, records: Iterable[Record]) -> int:
+    """Embed every record into a new generation and switch readers to it. Returns rows written."""
+    records = list(records)
+    ids = np.array([recipe_id for recipe_id, _ in records], dtype=np.int64)
+    counts = hashed_counts([features for _, features in records])
+    idf = compute_idf(counts)
+    vectors = embed(counts, idf)
+    with _write_lock(directory):
+        previous = _read_metadata(directory)
+        generation = previous["generation"] + 1 if previous else 1
+        vectors_path, ids_path, idf_path = _paths(directory, generation)
+        vectors.tofile(vectors_path)
+        ids.tofile(ids_path)
+        idf.tofile(idf_path)
+        metadata = {"generation": generation, "dim": EMBEDDING_DIM, "built_through": int(ids.max()) if len(ids) else 0}
+        tmp = directory / f"{METADATA_FILE}.tmp"
+        tmp.write_text(json.dumps(metadata))
+        os.replace(tmp, directory / METADATA_FILE) # Readers switch here
+        if previous:
+            # Workers still mapping the old files keep them alive until they reload
+            for path in _paths(directory, previous["generation"]):
+                path.unlink(missing_ok=True)
+    return len(ids)
+
+def append_to_index(directory: Path, records: Iterable[Record]) -> int:
+    """Embed records with the stored IDF and append the ones not yet indexed. Returns rows appended.
+
+    No-op when no index has been built.
+    """
+    records = list(records)
+    if not records or not (directory / METADATA_FILE).exists():
+        return 0
+    with _write_lock(directory):
+        metadata = _read_metadata(directory)
+        if metadata is None:
+            return 0
+        vectors_path, ids_path, idf_path = _paths(directory, metadata["generation"])
+        indexed = np.isin([recipe_id for recipe_id, _ in records], np.fromfile(ids_path, dtype=np.int64))
+        records = [record for record, present in zip(records, indexed) if not present]
+        if not records:
+            return 0
+        vectors = embed(hashed_counts([features for _, features in records]), np.fromfile(idf_path, dtype=np.float32))
+        # Vectors before ids: readers only use rows that have an id
+        with open(vectors_path, "ab") as file:
+            file.write(vectors.tobytes())
+        with open(ids_path, "ab") as file:
+            file.write(np.array([recipe_id for recipe_id, _ in records], dtype=np.int64).tobytes())
+    return len(records)
+
+def update_index(db_engine: Engine, directory: Path = EMBEDDINGS_DIR, rebuild: bool = False) -> int:
+    """Rebuild, or embed recipes created since the last build that are not indexed yet."""
+    metadata = _read_metadata(directory)
+    if rebuild or metadata is None:
+        return build_index(directory, iter_recipe_features(db_engine))
+    return append_to_index(directory, iter_recipe_features(db_engine, after_id=metadata["built_through"]))
+
+class _LoadedIndex(NamedTuple):
+    metadata_mtime: int
+    ids_path: Path
+    ids: np.ndarray # Recipe id per vector row
+    vectors: np.ndarray
+    sorted_ids: np.ndarray
+    order: np.ndarray # Row of each sorted id
+
+class EmbeddingIndex:
+    """Read side of the index: memory-maps the current generation and reloads when it changes."""
+    def __init__(self, directory: Path = EMBEDDINGS_DIR):
+        self.directory = Path(directory)
+        self._loaded: Optional[_LoadedIndex] = None
+
+    def refresh(self) -> bool:
+        """Pick up rebuilds and appends (two stat calls when nothing changed). False if no index exists."""
+        metadata_path = self.directory / METADATA_FILE
+        for _ in range(2): # A rebuild may delete the generation we just read about
+            try:
+                metadata_mtime = metadata_path.stat().st_mtime_ns
+                loaded = self._loaded
+                if loaded is not None and loaded.metadata_mtime == metadata_mtime:
+                    if loaded.ids_path.stat().st_size // 8 == len(loaded.ids):
+                        return True
+                metadata = json.loads(metadata_path.read_text())
+                vectors_path, ids_path, _ = _paths(self.directory, metadata["generation"])
+                ids = np.fromfile(ids_path, dtype=np.int64)
+                if vectors_path.stat().st_size:
+                    vectors = np.memmap(vectors_path, dtype=np.float32, mode="r").reshape(-1, metadata["dim"])
+                else:
+                    vectors = np.empty((0, metadata["dim"]), dtype=np.float32) # Built from no recipes; mmap refuses empty files
+            except FileNotFoundError:
+                continue
+            count = min(len(ids), len(vectors)) # An append may be between its two writes
+            order = np.argsort(ids[:count], kind="stable")
+            self._loaded = _LoadedIndex(metadata_mtime, ids_path, ids[:count], vectors[:count], ids[:count][order], order)
+            return True
+        self._loaded = None
+        return False
+
+    def _rows(self, recipe_ids: Sequence[int]) -> np.ndarray:
+        """Vector rows of the given ids; ids not in the index are skipped."""
+        sorted_ids, order = self._loaded.sorted_ids, self._loaded.order
+        if not len(sorted_ids) or not len(recipe_ids):
+            return np.empty(0, dtype=np.intp)
+        lookup = np.asarray(recipe_ids, dtype=np.int64)
+        positions = np.searchsorted(sorted_ids, lookup).clip(max=len(sorted_ids) - 1)
+        return order[positions[sorted_ids[positions] == lookup]]
+
+    def recommend(self, liked_ids: Sequence[int], exclude_ids: Sequence[int], k: int) -> List[Tuple[int, float]]:
+        """Top k (recipe id, cosine score) nearest the mean of the liked recipes' vectors, best first."""
+        if not self.refresh():
+            return []
+        liked_rows = self._rows(liked_ids)
+        if not len(liked_rows):
+            return []
+        vectors = self._loaded.vectors
+        scores = vectors @ vectors[liked_rows].mean(axis=0)
+        scores[self._rows(exclude_ids)] = -np.inf
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(self._loaded.ids[row]), float(scores[row])) for row in top if scores[row] > -np.inf]
+
+    def add(self, records: Iterable[Record]) -> int:
+        """Embed recipes created since the last build (incremental path). No-op without an index."""
+        return append_to_index(self.directory, records)
+
+recipe_index = EmbeddingIndex()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed every recipe and recompute IDF")
+    parser.add_argument("--dir", type=Path, default=EMBEDDINGS_DIR)
+    args = parser.parse_args()
+
+    from app.database import engine
+    started = time.perf_counter()
+    written = update_index(engine, args.dir, rebuild=args.rebuild)
+    print(f"Embedded {written} recipes into {args.dir} in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
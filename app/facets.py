@@ -0,0 +1,121 @@
+import json
+import re
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import intersect, literal, union_all, desc
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select, func, exists
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models import Recipe, RecipeIngredient, RecipeTag
+
+FACET_LIMIT = 20 # Top values returned per facet
+# Free-text categories compare on this, so "Dinner", "dinner" and "DINNER " are one category;
+# the same expression as the ix_recipe_category_key index
+CATEGORY_KEY = func.lower(func.trim(Recipe.category))
+
+# Leading unit words stripped when backfilling names from the joined ingredient string
+_UNITS = {
+    "g", "gram", "grams", "kg", "kilos", "mg", "ml", "cl", "l", "litre", "liter", "liters",
+    "tbsp", "tbs", "tablespoon", "tablespoons", "tsp", "teaspoon", "teaspoons",
+    "cup", "cups", "oz", "ounces", "lb", "lbs", "pinch", "pinches", "piece", "pieces", "pc", "pcs",
+    "clove", "cloves", "twig", "twigs", "sprig", "sprigs", "slice", "slices", "handful", "handfuls",
+    "can", "tin", "bunch", "stalk", "stalks", "leaf", "leaves", "small", "medium", "large", "whole",
+}
+_AMOUNT = re.compile(r"^[\d./½¼¾]+$")
+
+def normalize_term(term: str) -> str:
+    """Lowercase and collapse separators so 'Ground_Beef ' and 'ground beef' match."""
+    return " ".join(term.replace("_", " ").lower().split())
+
+def parse_ingredient_names(ingredients: str) -> List[str]:
+    """Best-effort ingredient names from a comma/newline-joined '2 cups flour' style string."""
+    names = []
+    for item in re.split(r"[,\n]", ingredients):
+        words = re.sub(r"\(.*?\)", " ", item).split()
+        while words and _AMOUNT.match(words[0]):
+            words.pop(0)
+        if words[:2] == ["to", "taste"]:
+            words = words[2:]
+        while len(words) > 1 and words[0].lower() in _UNITS:
+            words.pop(0)
+        name = normalize_term(" ".join(words))
+        if name and name not in names:
+            names.append(name)
+    return names
+
+def parse_tags(tags: str) -> List[str]:
+    """Normalized tag list from the JSON string stored on Recipe.tags."""
+    try:
+        values = json.loads(tags) if tags else []
+    except json.JSONDecodeError:
+        return []
+    normalized = []
+    for value in values if isinstance(values, list) else []:
+        tag = normalize_term(str(value))
+        if tag and tag not in normalized:
+            normalized.append(tag)
+    return normalized
+
+def index_recipe_terms(session: Session | AsyncSession, recipe_id: int, ingredient_names: Iterable[str], tags: Iterable[str]):
+    """Add association rows for a recipe. Caller commits."""
+    for name in dict.fromkeys(normalize_term(n) for n in ingredient_names):
+        if name:
+            session.add(RecipeIngredient(recipe_id=recipe_id, name=name))
+    for tag in dict.fromkeys(normalize_term(t) for t in tags):
+        if tag:
+            session.add(RecipeTag(recipe_id=recipe_id, tag=tag))
+
+def backfill_recipe_terms(db_engine: Engine) -> int:
+    """Populate ingredient/tag rows for recipes that have none yet. Returns recipes processed."""
+    with Session(db_engine) as session:
+        missing = session.exec(
+            select(Recipe.id, Recipe.ingredients, Recipe.tags).where(
+                ~exists().where(RecipeIngredient.recipe_id == Recipe.id),
+                ~exists().where(RecipeTag.recipe_id == Recipe.id),
+            )
+        ).all()
+        for recipe_id, ingredients, tags in missing:
+            index_recipe_terms(session, recipe_id, parse_ingredient_names(ingredients or ""), parse_tags(tags))
+        session.commit()
+    return len(missing)
+
+def matching_recipe_ids(
+    tags: Optional[List[str]] = None,
+    ingredients: Optional[List[str]] = None,
+    category: Optional[str] = None
+):
+    """Subquery of recipe ids matching every filter, or None when unfiltered.
+
+    Each term is an index seek on (tag, recipe_id) / (name, recipe_id) and
+    the per-term id sets are combined with INTERSECT.
+    """
+    selects = [select(RecipeTag.recipe_id).where(RecipeTag.tag == normalize_term(t)) for t in tags or []]
+    selects += [select(RecipeIngredient.recipe_id).where(RecipeIngredient.name == normalize_term(i)) for i in ingredients or []]
+    if category:
+        selects.append(select(Recipe.id).where(CATEGORY_KEY == category.strip().lower()))
+    if not selects:
+        return None
+    if len(selects) == 1:
+        return selects[0]
+    return intersect(*selects)
+
+async def facet_counts(session: AsyncSession, recipe_ids=None) -> Dict[str, Dict[str, int]]:
+    """Top tag, ingredient and category counts over the matching recipes in one query."""
+    def _facet(kind, column, recipe_id_column, label=None):
+        """Counts grouped by column; label (default the column) is the value shown for each group."""
+        label = column if label is None else label
+        statement = select(literal(kind).label("facet"), label.label("value"), func.count().label("count"))
+        if recipe_ids is not None:
+            statement = statement.where(recipe_id_column.in_(recipe_ids))
+        return statement.group_by(column).order_by(desc("count"), column).limit(FACET_LIMIT).subquery()
+
+    parts = [
+        _facet("tags", RecipeTag.tag, RecipeTag.recipe_id),
+        _facet("ingredients", RecipeIngredient.name, RecipeIngredient.recipe_id),
+        # Grouped the way the category filter matches, so a bucket's count is what clicking it returns
+        _facet("categories", CATEGORY_KEY, Recipe.id, label=func.min(func.trim(Recipe.category))),
+    ]
+    statement = union_all(*(select(part.c.facet, part.c.value, part.c.count) for part in parts))
+    facets = {"tags": {}, "ingredients": {}, "categories": {}}
+    for facet, value, count in (await session.exec(statement)).all():
+        facets[facet][value] = count
+    return facets
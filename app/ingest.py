@@ -0,0 +1,169 @@
+"""Load the scraper's recipe log into the database, from where the last run stopped.
+
+    python -m app.ingest recipe_scraper/recipes.ndjson
+    python -m app.ingest recipe_scraper/recipes.ndjson --follow      # keep loading while scraper.py runs
+    python -m app.ingest recipe_scraper/recipes.ndjson --from-start  # ignore the checkpoint
+
+Each line of the log is a {"url", "source", "recipe"} record (recipe_scraper/recipe_log.py;
+crawler.py output works too, its records without a recipe are skipped). Recipes go in
+through insert_recipe_batch keyed by source URL: a URL already in the recipe table is left
+as it is, so loading a record twice is a no-op. After each committed batch the byte offset
+reached is written to <log>.offset, so a restart after a crash reads on from there.
+
+Scraped recipes are credited to a "scraper" system user, created on first use, or to the
+user given with --author-id.
+"""
+import argparse
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from app.models import User
+from app.seed import BATCH_SIZE, insert_recipe_batch, recipe_row
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_SUFFIX = ".offset"
+FOLLOW_INTERVAL = 2.0 # Seconds between looks at the log with --follow
+SCRAPER_USERNAME = "scraper"
+SCRAPER_EMAIL = "scraper@localhost"
+
+def checkpoint_path(path: Path) -> Path:
+    return path.with_name(path.name + CHECKPOINT_SUFFIX)
+
+def read_checkpoint(path: Path) -> int:
+    """Byte offset of the log already loaded, 0 without a checkpoint or if the log was replaced since."""
+    try:
+        offset = int(checkpoint_path(path).read_text())
+    except (FileNotFoundError, ValueError):
+        return 0
+    return offset if offset <= path.stat().st_size else 0
+
+def write_checkpoint(path: Path, offset: int):
+    """Replace the checkpoint atomically, so a crash leaves the old offset or the new one."""
+    checkpoint = checkpoint_path(path)
+    temporary = checkpoint.with_name(checkpoint.name + ".tmp")
+    temporary.write_text(str(offset))
+    os.replace(temporary, checkpoint)
+
+def iter_records(path: Path, offset: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """(offset after the line, record) for each complete line from offset on.
+
+    A last line without its newline is still being written (or was cut off by a crash) and is left for the next read.
+    A complete line that isn't a JSON object is logged and skipped.
+    """
+    with open(path, "rb") as file:
+        file.seek(offset)
+        for line in file:
+            if not line.endswith(b"\n"):
+                return
+            start, offset = offset, offset + len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                logger.warning(f"Skipping unreadable line at byte {start} of {path}: {e}")
+                continue
+            if not isinstance(record, dict):
+                logger.warning(f"Skipping line at byte {start} of {path}: not a JSON object")
+                continue
+            yield offset, record
+
+def scraper_user_id(db_engine: Engine) -> int:
+    """Id of the system user scraped recipes are credited to, created on first use."""
+    with Session(db_engine) as session:
+        user = session.exec(select(User).where(User.username == SCRAPER_USERNAME)).first()
+        if user is None:
+            from app.auth import pwd_context
+            # A random password nobody knows: the account exists to own rows, not to log in
+            user = User(username=SCRAPER_USERNAME, email=SCRAPER_EMAIL, hashed_password=pwd_context.hash(secrets.token_urlsafe(32)))
+            session.add(user)
+            session.commit()
+            logger.info(f"Created the {SCRAPER_USERNAME!r} user (id {user.id}) for scraped recipes")
+        return user.id
+
+def record_row(record: Dict, author_id: int) -> Tuple[Dict, List[str], List[str]]:
+    """Recipe row, ingredient names and tags for a scraped recipe, with the page it came from."""
+    recipe = record["recipe"]
+    instructions = recipe.get("instructions", [])
+    if isinstance(instructions, dict):
+        instructions = instructions.get("Steps", []) # The scraper's Instructions model
+    row, ingredient_names, tags = recipe_row({**recipe, "instructions": instructions}, author_id)
+    row["source_url"] = record["url"]
+    return row, ingredient_names, tags
+
+def ingest_log(db_engine: Engine, path: Path, batch_size: int = BATCH_SIZE, from_start: bool = False,
+               author_id: Optional[int] = None) -> Dict[str, int]:
+    """Load the log's new recipes in batches, credited to author_id (default the scraper user).
+    Returns recipes read, inserted and invalid."""
+    stats = {"read": 0, "inserted": 0, "invalid": 0}
+    if not path.exists():
+        return stats # --follow started before the scraper
+    offset = 0 if from_start else read_checkpoint(path)
+    batch: Dict[str, Tuple[Dict, List[str], List[str]]] = {}
+    batch_urls = set()
+    def flush(end: int):
+        if batch:
+            with db_engine.begin() as connection:
+                stats["inserted"] += len(insert_recipe_batch(connection, batch))
+            batch.clear()
+            batch_urls.clear()
+        write_checkpoint(path, end)
+    end = offset
+    for end, record in iter_records(path, offset):
+        if "recipe" not in record:
+            continue # Crawler records of page text or errors
+        stats["read"] += 1
+        if author_id is None:
+            author_id = scraper_user_id(db_engine)
+        try:
+            entry = record_row(record, author_id)
+        except (KeyError, TypeError, ValueError) as e:
+            stats["invalid"] += 1
+            logger.warning(f"Skipping invalid recipe for {record.get('url')}: {e!r}")
+            continue
+        if entry[0]["source_url"] in batch_urls:
+            continue # First record of a URL wins, as it does against the table
+        batch_urls.add(entry[0]["source_url"])
+        batch.setdefault(entry[0]["content_hash"], entry) # Same recipe under two URLs
+        if len(batch) >= batch_size:
+            flush(end)
+    if end != offset or batch:
+        flush(end)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", type=Path)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--follow", action="store_true", help="Keep loading new lines until interrupted")
+    parser.add_argument("--from-start", action="store_true", help="Read the whole log, not just what follows the checkpoint")
+    parser.add_argument("--author-id", type=int, help=f"User to credit the recipes to, default the {SCRAPER_USERNAME!r} user")
+    args = parser.parse_args()
+
+    from app.database import engine
+    from app.migrations import upgrade
+    upgrade(engine)
+    from_start = args.from_start
+    while True:
+        started = time.perf_counter()
+        stats = ingest_log(engine, args.log, args.batch_size, from_start, args.author_id)
+        from_start = False
+        if stats["read"] or not args.follow:
+            print(f"Read {stats['read']} recipes from {args.log}, inserted {stats['inserted']} new, "
+                  f"{stats['invalid']} invalid, in {time.perf_counter() - started:.2f}s")
+        if not args.follow:
+            break
+        try:
+            time.sleep(FOLLOW_INTERVAL)
+        except KeyboardInterrupt:
+            break
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import create_db_and_tables, engine
+from fastapi.responses import PlainTextResponse
+from app.database import engine
+from app.migrations import check_schema
+from app.metrics import QueryMetricsMiddleware, registry
 from app.routers.users import router as users_router
 from app.routers.ratings import router as ratings_router
 from app.routers.recipes import router as recipes_router
 from app.routers.favorites import router as favorites_router
+from app.routers.recommendations import router as recommendations_router
 from dotenv import load_dotenv
 import os
 import logging
@@ -19,8 +23,9 @@ logger.info(f"FRONTEND_URL: {FRONTEND_URL}") # Add this line to check the loaded
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Manages the application lifespan by creating DB tables on startup."""
-    create_db_and_tables(engine) # Create DB schema before app starts
+    """Manages the application lifespan by checking the DB schema on startup."""
+    # Schema changes and seeding run once via `python -m app.migrations`, not in every worker
+    check_schema(engine)
     yield
 
 app = FastAPI(lifespan=lifespan)
@@ -32,13 +37,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(QueryMetricsMiddleware)
 
 @app.get("/")
 async def root():
     """Welcome messgae for API root endpoint."""
     return {"message": "Welcome to the Recipe Platform API"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(users_router, prefix="/users", tags=["users"])
 app.include_router(recipes_router, prefix="/recipes", tags=["recipes"])
 app.include_router(ratings_router, prefix="/ratings", tags=["ratings"])
-app.include_router(favorites_router, prefix="/favorites", tags=["favorites"])
\ No newline at end of file
+app.include_router(favorites_router, prefix="/favorites", tags=["favorites"])
+app.include_router(recommendations_router, prefix="/recommendations", tags=["recommendations"])
\ No newline at end of file
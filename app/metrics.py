@@ -0,0 +1,175 @@
+import bisect
+import logging
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Fraction of requests whose queries are recorded, 0 turns query metrics off
+QUERY_SAMPLE_RATE = float(os.getenv("QUERY_SAMPLE_RATE", "0"))
+# Statements slower than this are logged (all requests, not just sampled ones), unset turns it off
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS")) if os.getenv("SLOW_QUERY_MS") else None
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 50)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _format_labels(labels: Labels, **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Counter:
+    """Monotonic counter with optional labels."""
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        """(labels, value) for every series."""
+        with self._lock:
+            return [(dict(labels), value) for labels, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value:g}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+    def __init__(self, name: str, help: str, buckets: Sequence[float]):
+        self.name, self.help, self.buckets = name, help, tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {} # Per-bucket counts, then +Inf count and sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 2))
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(labels, le=bound)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-1]:g}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+class Gauge:
+    """Values computed at scrape time by collect(), which yields (labels, value) pairs."""
+    def __init__(self, name: str, help: str, collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        self.name, self.help, self.collect = name, help, collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_format_labels(tuple(sorted(labels.items())))} {value:g}")
+        return lines
+
+class Registry:
+    """Metrics served by GET /metrics, in registration order."""
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help: str) -> Counter:
+        metric = Counter(name, help)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float]) -> Histogram:
+        metric = Histogram(name, help, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help: str, collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> Gauge:
+        metric = Gauge(name, help, collect)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+registry = Registry()
+query_duration = registry.histogram("db_query_duration_seconds", "SQL statement latency by route.", LATENCY_BUCKETS)
+queries_per_request = registry.histogram("db_queries_per_request", "SQL statements issued per request by route.", COUNT_BUCKETS)
+slow_queries = registry.counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.")
+
+class _RequestQueries:
+    """Statement timings collected while serving one request."""
+    __slots__ = ("path", "sampled", "durations")
+    def __init__(self, path: str, sampled: bool):
+        self.path, self.sampled = path, sampled
+        self.durations: List[float] = []
+
+# Set per request by QueryMetricsMiddleware; the route template is only known once routing is done
+_current_request: ContextVar[Optional[_RequestQueries]] = ContextVar("current_request", default=None)
+
+def instrumentation_enabled() -> bool:
+    return QUERY_SAMPLE_RATE > 0 or SLOW_QUERY_MS is not None
+
+def instrument_engine(db_engine: Engine):
+    """Time every statement on db_engine (pass AsyncEngine.sync_engine for async). No-op unless enabled."""
+    if not instrumentation_enabled():
+        return
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(db_engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start"].pop()
+        current = _current_request.get()
+        if current is not None and current.sampled:
+            current.durations.append(duration)
+        if SLOW_QUERY_MS is not None and duration * 1000 >= SLOW_QUERY_MS:
+            slow_queries.inc()
+            path = current.path if current is not None else "-"
+            logger.warning(f"Slow query ({duration * 1000:.1f} ms, {path}): {' '.join(statement.split())[:500]}")
+
+class QueryMetricsMiddleware:
+    """ASGI middleware recording each sampled request's statement count and latencies by route template."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        current = _RequestQueries(scope["path"], QUERY_SAMPLE_RATE > 0 and random.random() < QUERY_SAMPLE_RATE)
+        token = _current_request.set(current)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_request.reset(token)
+            if current.sampled:
+                # The router stores the matched route in the shared scope
+                route = getattr(scope.get("route"), "path", "unmatched")
+                queries_per_request.observe(len(current.durations), route=route)
+                for duration in current.durations:
+                    query_duration.observe(duration, route=route)
@@ -0,0 +1,96 @@
+"""Bring the database schema up to date and seed it if empty. Run once per deploy, before starting workers.
+
+    python -m app.migrations            # upgrade to head, seed an empty DB
+    python -m app.migrations --no-seed
+    python -m app.migrations --current  # print the stored revision
+"""
+import argparse
+import time
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from app.database import (
+    create_db_and_tables, engine, ensure_indexes, migrate_category_key, migrate_recipe_versioning, migrate_source_url,
+)
+from app.search import migrate_search_trigger
+from app.seed import DEFAULT_SEED_FILES, recipes_exist, seed_recipes
+import logging
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = "schema_version"
+
+# Ordered schema revisions, oldest first: (revision id, description, upgrade function).
+# Append new ones; never edit or reorder a revision that has shipped. The baseline creates
+# fresh databases from the current models, so later revisions must skip work already done.
+REVISIONS: List[Tuple[str, str, Callable[[Engine], None]]] = [
+    # Idempotent, so it also upgrades databases created before revisions were tracked
+    ("0001_baseline", "Current models, indexes and search index; pre-versioning upgrades", create_db_and_tables),
+    ("0002_recipe_versioning", "recipe.updated_at and the table_version write counter", migrate_recipe_versioning),
+    ("0003_recipe_source_url", "recipe.source_url for scraper ingest dedupe", migrate_source_url),
+    ("0004_search_update_trigger", "Search index update trigger limited to the indexed columns", migrate_search_trigger),
+    ("0005_recipe_category_lower", "lower(category) index for the case-insensitive category filter", ensure_indexes),
+    ("0006_recipe_category_key", "lower(trim(category)) index shared by the category filter and facet", migrate_category_key),
+]
+HEAD = REVISIONS[-1][0]
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is not at HEAD; run python -m app.migrations."""
+
+def current_revision(db_engine: Engine) -> Optional[str]:
+    """Revision stored in the database, None if it has never been migrated."""
+    if not inspect(db_engine).has_table(VERSION_TABLE):
+        return None
+    with db_engine.connect() as connection:
+        return connection.execute(text(f"SELECT version_num FROM {VERSION_TABLE}")).scalar()
+
+def _set_revision(db_engine: Engine, revision: str):
+    with db_engine.begin() as connection:
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (version_num VARCHAR(64) NOT NULL)"))
+        connection.execute(text(f"DELETE FROM {VERSION_TABLE}"))
+        connection.execute(text(f"INSERT INTO {VERSION_TABLE} (version_num) VALUES (:revision)"), {"revision": revision})
+
+def upgrade(db_engine: Engine = engine) -> List[str]:
+    """Apply every revision after the stored one, recording each as it completes. Returns those applied."""
+    revision_ids = [revision_id for revision_id, _, _ in REVISIONS]
+    current = current_revision(db_engine)
+    if current is not None and current not in revision_ids:
+        raise SchemaOutOfDate(f"Database is at unknown revision {current!r}, newer code may have migrated it")
+    start = revision_ids.index(current) + 1 if current is not None else 0
+    applied = []
+    for revision_id, description, upgrade_fn in REVISIONS[start:]:
+        logger.info(f"Applying {revision_id}: {description}")
+        upgrade_fn(db_engine)
+        _set_revision(db_engine, revision_id)
+        applied.append(revision_id)
+    return applied
+
+def check_schema(db_engine: Engine = engine):
+    """Fail fast at worker startup unless the database is at HEAD. One small query."""
+    current = current_revision(db_engine)
+    if current != HEAD:
+        raise SchemaOutOfDate(f"Database schema is at {current!r}, expected {HEAD!r}. Run `python -m app.migrations` first.")
+
+def bootstrap(db_engine: Engine = engine, seed: bool = True):
+    """Upgrade to HEAD, then seed from app/data if the recipe table is empty."""
+    applied = upgrade(db_engine)
+    logger.info(f"Applied {len(applied)} revisions, database at {HEAD}")
+    if seed and not recipes_exist(db_engine):
+        stats = seed_recipes(db_engine, DEFAULT_SEED_FILES)
+        logger.info(f"Seeded database with {stats['inserted']} recipes from {len(DEFAULT_SEED_FILES)} files")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-seed", action="store_true", help="Skip seeding an empty database")
+    parser.add_argument("--current", action="store_true", help="Print the stored revision and exit")
+    args = parser.parse_args()
+    if args.current:
+        print(f"{current_revision(engine)} (head {HEAD})")
+        return
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    bootstrap(engine, seed=not args.no_seed)
+    print(f"Database at {HEAD} in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, text
+from pydantic import computed_field
 from typing import Optional
 from datetime import datetime
 import datetime as dt
-from typing import List
+from typing import List, Dict
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -22,7 +24,23 @@ class UserResponse(SQLModel):
     email: str
     id: Optional[int] = None
 
+class CurrentUser(SQLModel):
+    """Slim identity of the authenticated user, cached by auth.get_current_user."""
+    id: int
+    username: str
+
 class Recipe(SQLModel, table=True):
+    __table_args__ = (
+        # Keyset index for paginated listing ordered by (created_at, id)
+        Index("ix_recipe_created_at_id", "created_at", "id"),
+        # Seed loader and bulk import dedupe; NULL for recipes created one at a time
+        Index("ux_recipe_content_hash", "content_hash", unique=True),
+        # Scraper ingest dedupe; NULL for recipes not scraped from a page
+        Index("ux_recipe_source_url", "source_url", unique=True),
+        # Category filter and facet, which ignore case and surrounding spaces (app.facets.CATEGORY_KEY)
+        Index("ix_recipe_category_key", text("lower(trim(category))")),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str = Field(index=True)
     description: str 
@@ -30,11 +48,24 @@ class Recipe(SQLModel, table=True):
     instructions: str
     author_id: int = Field(foreign_key="user.id")
     created_at: datetime = Field(default_factory=lambda: datetime.now(dt.UTC))
+    # Bumped by anything that changes the recipe's payload, including rating totals
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(dt.UTC))
     image_source: str
-    category: str
+    category: str = Field(index=True)
     serves: int = 1 # Default if no serving size
     time: str
     tags: str # Stored as a JSON string
+    # Running rating aggregates, kept in step with the rating table by the ratings router
+    rating_count: int = Field(default=0)
+    rating_sum: int = Field(default=0)
+    content_hash: Optional[str] = Field(default=None) # sha256 of the content columns, see app.seed
+    source_url: Optional[str] = Field(default=None) # Page a scraped recipe came from, see app.ingest
+
+def average_rating(rating_sum: int, rating_count: int) -> float:
+    """Average rating rounded to one decimal, 0.0 when unrated."""
+    if not rating_count:
+        return 0.0
+    return round(rating_sum / rating_count, 1)
 
 class RecipeCreate(SQLModel):
     """Input model for creating a recipe."""
@@ -49,14 +80,98 @@ class RecipeCreate(SQLModel):
     # At create it's a list but becomes a JSON string at endpoint
     tags: List[str]
 
-class RecipeRead(Recipe):
-    """Response model including auto-generated fields for id & created_at"""
-    # Empty for now
-    pass
+class RecipeRead(SQLModel):
+    """Response model including auto-generated fields for id & created_at.
+    Recipe's columns minus the dedupe keys (content_hash, source_url) and the raw rating sum."""
+    id: int
+    title: str
+    description: str
+    ingredients: str
+    instructions: str
+    author_id: int
+    created_at: datetime
+    updated_at: datetime
+    image_source: str
+    category: str
+    serves: int
+    time: str
+    tags: str
+    rating_count: int
+    rating_sum: int = Field(exclude=True)
+
+    @computed_field
+    @property
+    def average_rating(self) -> float:
+        return average_rating(self.rating_sum, self.rating_count)
+
+class RecipeSummary(SQLModel):
+    """Card fields only, for list views. Selected column-by-column, not via Recipe."""
+    id: int
+    title: str
+    author_id: int
+    created_at: datetime
+    image_source: str
+    category: str
+    serves: int
+    time: str
+    rating_count: int
+    rating_sum: int = Field(exclude=True)
+
+    @computed_field
+    @property
+    def average_rating(self) -> float:
+        return average_rating(self.rating_sum, self.rating_count)
+
+class RecipeRatingSummary(SQLModel):
+    """Inline rating aggregate for one recipe."""
+    recipe_id: int
+    average_rating: float
+    rating_count: int
+
+class RecipeIngredient(SQLModel, table=True):
+    """Normalized ingredient name per recipe, for indexed filtering."""
+    # PK covers recipe -> names, the extra index is the inverted name -> recipes lookup
+    __table_args__ = (Index("ix_recipeingredient_name_recipe_id", "name", "recipe_id"),)
+
+    recipe_id: int = Field(foreign_key="recipe.id", primary_key=True)
+    name: str = Field(primary_key=True)
+
+class RecipeTag(SQLModel, table=True):
+    """Normalized tag per recipe, for indexed filtering."""
+    __table_args__ = (Index("ix_recipetag_tag_recipe_id", "tag", "recipe_id"),)
+
+    recipe_id: int = Field(foreign_key="recipe.id", primary_key=True)
+    tag: str = Field(primary_key=True)
+
+class BulkImportError(SQLModel):
+    line: int # 1-based line of the NDJSON body
+    detail: str
+
+class BulkImportResult(SQLModel):
+    """Outcome of POST /recipes/bulk. Rows identical to a stored recipe count as duplicates."""
+    received: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    errors: List[BulkImportError] = Field(default_factory=list) # First MAX_REPORTED_ERRORS failures
+
+class RecipeFacets(SQLModel):
+    """Value -> recipe count for each facet, over the filtered recipes."""
+    tags: Dict[str, int]
+    ingredients: Dict[str, int]
+    categories: Dict[str, int]
+
+class TableVersion(SQLModel, table=True):
+    """Write counter per table, bumped in each writing transaction. Drives list ETags."""
+    name: str = Field(primary_key=True)
+    version: int = Field(default=0)
 
 class Rating(SQLModel, table=True):
+    # One rating per user per recipe; also serves the (user_id, recipe_id) lookups
+    __table_args__ = (Index("ux_rating_user_id_recipe_id", "user_id", "recipe_id", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key = True)
-    recipe_id: int = Field(foreign_key="recipe.id")
+    recipe_id: int = Field(foreign_key="recipe.id", index=True)
     user_id: int = Field(foreign_key="user.id")
     value: int = Field(ge=1, le=3) # 1 to 3 rating
 
@@ -70,6 +185,8 @@ class RatingRead(Rating):
     pass
 
 class Favorite(SQLModel, table=True):
+    __table_args__ = (Index("ux_favorite_user_id_recipe_id", "user_id", "recipe_id", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     recipe_id: int = Field(foreign_key="recipe.id")
@@ -0,0 +1,33 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import Request, Response
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Encode the (created_at, id) keyset position of the last row on a page."""
+    raw = f"{created_at.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor back into (created_at, id). Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = base64.urlsafe_b64decode(padded).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(id)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def set_next_link(request: Request, response: Response, **params):
+    """Attach an RFC 8288 Link header pointing at the current URL with params replaced."""
+    next_url = request.url.include_query_params(**params)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+def set_page_headers(request: Request, response: Response, next_cursor: Optional[str]):
+    """Attach Link and X-Next-Cursor headers when there is another page."""
+    if next_cursor is None:
+        return
+    set_next_link(request, response, cursor=next_cursor)
+    response.headers["X-Next-Cursor"] = next_cursor
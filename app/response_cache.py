@@ -0,0 +1,143 @@
+"""Serialized responses for the hot recipe reads, keyed on route and parameters.
+
+Writes drop exactly the entries they change: a recipe's detail and rating entries by key,
+list pages by bumping the list generation that their keys include. Entries also expire
+after RESPONSE_CACHE_TTL seconds, which bounds staleness from writes made by other
+workers when each worker has its own in-memory cache. Point RESPONSE_CACHE_URL at a
+Redis-compatible server (needs the redis extra) to share one cache between workers.
+"""
+import json
+import os
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from app.cache import TTLCache, cache_requests
+from app.http_cache import is_not_modified, not_modified
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "memory")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30")) # 0 turns the cache off
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))
+RESPONSE_CACHE_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+CACHE_NAME = "response"
+LIST_NAMESPACE = "recipes"
+# Response headers stored with the body; the validators let hits answer conditional GETs
+STORED_HEADERS = ("etag", "last-modified", "cache-control", "link", "x-next-cursor")
+
+class MemoryBackend:
+    """Per-process LRU bounded by entry count and total bytes."""
+    def __init__(self, maxsize: int, maxbytes: int, ttl: float):
+        self.entries = TTLCache(CACHE_NAME, maxsize, ttl, maxbytes=maxbytes)
+        self.generations: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: bytes):
+        self.entries.set(key, value, size=len(value))
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self.entries.pop(key)
+
+    async def generation(self, namespace: str) -> int:
+        return self.generations.get(namespace, 0)
+
+    async def bump(self, namespace: str):
+        self.generations[namespace] = self.generations.get(namespace, 0) + 1
+
+    async def clear(self):
+        self.entries.clear()
+        self.generations.clear()
+
+class RedisBackend:
+    """Shared cache on any client with the redis.asyncio get/set/delete/incr interface."""
+    def __init__(self, client, ttl: float, prefix: str = "response:"):
+        self.client, self.ttl, self.prefix = client, ttl, prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self.client.get(self.prefix + key)
+        cache_requests.inc(cache=CACHE_NAME, result="miss" if value is None else "hit")
+        return value
+
+    async def set(self, key: str, value: bytes):
+        await self.client.set(self.prefix + key, value, ex=max(1, round(self.ttl)))
+
+    async def delete(self, *keys: str):
+        await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def generation(self, namespace: str) -> int:
+        return int(await self.client.get(f"{self.prefix}generation:{namespace}") or 0)
+
+    async def bump(self, namespace: str):
+        await self.client.incr(f"{self.prefix}generation:{namespace}")
+
+    async def clear(self):
+        # Entries expire on their own; moving every generation on orphans the list pages
+        await self.bump(LIST_NAMESPACE)
+
+def create_backend(url: str = RESPONSE_CACHE_URL):
+    if url == "memory":
+        return MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_BYTES, RESPONSE_CACHE_TTL)
+    import redis.asyncio # Optional dependency, only needed for a shared cache
+    return RedisBackend(redis.asyncio.from_url(url), RESPONSE_CACHE_TTL)
+
+def _encode(headers: Dict[str, str], body: bytes) -> bytes:
+    return json.dumps(headers, separators=(",", ":")).encode() + b"\n" + body
+
+def _decode(value: bytes):
+    headers, _, body = value.partition(b"\n")
+    return json.loads(headers), body
+
+class ResponseCache:
+    """Route-level cache in front of a backend. Disabled when ttl is 0."""
+    def __init__(self, backend, enabled: bool = True):
+        self.backend, self.enabled = backend, enabled
+
+    async def list_key(self, request: Request) -> str:
+        """Key for a list page: route, current list generation and the query string."""
+        generation = await self.backend.generation(LIST_NAMESPACE)
+        return f"{LIST_NAMESPACE}:{generation}:{request.url.path}?{request.url.query}"
+
+    async def get(self, request: Request, key: str) -> Optional[Response]:
+        """Cached response for key (a 304 if the client's copy matches), None on a miss."""
+        if not self.enabled:
+            return None
+        value = await self.backend.get(key)
+        if value is None:
+            return None
+        headers, body = _decode(value)
+        etag = headers.get("etag")
+        if etag is not None:
+            last_modified = headers.get("last-modified")
+            last_modified = parsedate_to_datetime(last_modified) if last_modified else None
+            if is_not_modified(request, etag, last_modified):
+                return not_modified(etag, headers.get("cache-control", "no-cache"), last_modified)
+        return Response(body, media_type="application/json", headers=headers)
+
+    async def put(self, key: str, content: Any, response: Response) -> Response:
+        """Serialize content once, store it with response's cache headers and return it as the response."""
+        body = json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        if self.enabled:
+            await self.backend.set(key, _encode(headers, body))
+        return Response(body, media_type="application/json", headers=headers)
+
+    async def invalidate_recipe(self, recipe_id: Optional[int] = None):
+        """Drop entries showing recipe_id, and every list page. Call after the write commits."""
+        if not self.enabled:
+            return
+        if recipe_id is not None:
+            await self.backend.delete(recipe_key(recipe_id), average_rating_key(recipe_id))
+        await self.backend.bump(LIST_NAMESPACE)
+
+    async def clear(self):
+        await self.backend.clear()
+
+def recipe_key(recipe_id: int) -> str:
+    return f"recipe:{recipe_id}"
+
+def average_rating_key(recipe_id: int) -> str:
+    return f"recipe:{recipe_id}:average-rating"
+
+response_cache = ResponseCache(create_backend(), enabled=RESPONSE_CACHE_TTL > 0)
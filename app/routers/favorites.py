@@ -1,82 +1,76 @@
 from app.auth import get_current_user
-from app.database import get_session
-from app.models import Favorite, FavoriteCreate, FavoriteRead, FavoriteReadDetailed, Recipe, User
+from app.database import get_session, dialect_insert
+from app.models import Favorite, FavoriteCreate, FavoriteRead, FavoriteReadDetailed, Recipe, CurrentUser
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import select, Session
+from sqlmodel import select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
 
 import logging
 
 router = APIRouter()
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 @router.post("/", response_model=FavoriteRead)
-async def create_favorite(favorite: FavoriteCreate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+async def create_favorite(favorite: FavoriteCreate, session: AsyncSession = Depends(get_session), current_user: CurrentUser = Depends(get_current_user)):
     """Adds a recipe to a user's favorites."""
     # Check if recipe and user exist
-    recipe = session.get(Recipe, favorite.recipe_id)
+    recipe = await session.get(Recipe, favorite.recipe_id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    # Check if already favorited
-    existing = session.exec(
-        select(Favorite).where(
-            Favorite.user_id == current_user.id, 
-            Favorite.recipe_id == favorite.recipe_id
-        )
-    ).first()
-    if existing:
+    # Unique (user_id, recipe_id) index turns "already favorited" into a no-op insert
+    db_favorite = (await session.exec(
+        dialect_insert(session, Favorite)
+        .values(recipe_id=favorite.recipe_id, user_id=current_user.id)
+        .on_conflict_do_nothing(index_elements=["user_id", "recipe_id"])
+        .returning(Favorite)
+    )).scalar_one_or_none()
+    if db_favorite is None:
         raise HTTPException(status_code=400, detail="Already favorited")
-    db_favorite = Favorite(recipe_id=favorite.recipe_id, user_id=current_user.id)
-    session.add(db_favorite)
-    session.commit()
-    session.refresh(db_favorite)
-    return db_favorite
+    result = FavoriteRead.model_validate(db_favorite) # Snapshot before commit expires the row
+    await session.commit()
+    return result
 
 @router.get("/", response_model=FavoriteRead)
-async def read_favorite(recipe_id: int, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+async def read_favorite(recipe_id: int, session: AsyncSession = Depends(get_session), current_user: CurrentUser = Depends(get_current_user)):
     """Retrieve if user's favorited the recipe."""
-    db_favorite = session.exec(
+    db_favorite = (await session.exec(
         select(Favorite).where(
             Favorite.user_id == current_user.id,
             Favorite.recipe_id == recipe_id
         )
-    ).first()
+    )).first()
     if not db_favorite:
         raise HTTPException(status_code=404, detail="Favorite not found")
     return db_favorite
 
 @router.delete("/", response_model=dict)
-async def remove_favorite(favorite: FavoriteCreate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+async def remove_favorite(favorite: FavoriteCreate, session: AsyncSession = Depends(get_session), current_user: CurrentUser = Depends(get_current_user)):
     """Removes a recipe from user favorites."""
-    # Check if favorite exists
-    db_favorite = session.exec(
-        select(Favorite).where(
-            Favorite.user_id == current_user.id,
-            Favorite.recipe_id == favorite.recipe_id
-        )
-    ).first()
-    if not db_favorite:
+    # Delete and check existence in one statement
+    deleted = (await session.exec(
+        delete(Favorite)
+        .where(Favorite.user_id == current_user.id, Favorite.recipe_id == favorite.recipe_id)
+        .returning(Favorite.id)
+    )).first()
+    if not deleted:
         raise HTTPException(status_code=404, detail="Favorite not found")
-    
-    # Delete Favorite
-    session.delete(db_favorite)
-    session.commit()
+    await session.commit()
     logger.info(f"Removed favorite: user_id={current_user.id}, recipe_id={favorite.recipe_id}")
     return {"message": f"Favorite (user_id={current_user.id}, recipe_id={favorite.recipe_id}) removed successfully"}
 
 @router.get("/all", response_model=List[FavoriteReadDetailed])
 async def read_all_favorites(
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    session: AsyncSession = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     # Join Favorite with Recipe to get recipe detail
-    favorites = session.exec(
+    favorites = (await session.exec(
         select(Favorite, Recipe)
         .join(Recipe, Favorite.recipe_id == Recipe.id)
         .where(Favorite.user_id == current_user.id)
-    ).all()
+    )).all()
 
     return [
         FavoriteReadDetailed(
@@ -1,73 +1,109 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.models import User, Recipe, Rating, RatingCreate, RatingRead
+from sqlmodel import select, update, delete, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models import CurrentUser, Recipe, Rating, RatingCreate, RatingRead
 from app.auth import get_current_user
-from app.database import get_session
+from app.database import get_session, dialect_insert, table_version_bump
+from app.response_cache import response_cache
+from datetime import datetime
+import datetime as dt
 import logging
 
 router = APIRouter()
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@router.post("/", response_model=RatingRead)
-async def create_rating(rating: RatingCreate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    """Creates a new rating for a recipe."""
-    recipe = session.get(Recipe, rating.recipe_id) # Verify recipe exists
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
+async def _refresh_rating_totals(session: AsyncSession, recipe_id: int):
+    """Recompute the recipe's rating aggregates in the caller's transaction."""
+    # Upserts don't report the value they replaced, so re-aggregate this recipe's
+    # ratings (an index range on rating.recipe_id) instead of applying a delta.
+    # Lock the recipe row first: on Postgres READ COMMITTED the UPDATE's subqueries would
+    # otherwise read a snapshot taken before a concurrent rating committed, and the last
+    # writer would overwrite its totals. The UPDATE below starts after the lock, so its
+    # snapshot includes every rating committed before. SQLite serializes writers already.
+    await session.exec(select(Recipe.id).where(Recipe.id == recipe_id).with_for_update())
+    ratings = select(Rating.value).where(Rating.recipe_id == recipe_id).subquery()
+    await session.exec(
+        update(Recipe)
+        .where(Recipe.id == recipe_id)
+        .values(
+            rating_count=select(func.count()).select_from(ratings).scalar_subquery(),
+            rating_sum=select(func.coalesce(func.sum(ratings.c.value), 0)).scalar_subquery(),
+            updated_at=datetime.now(dt.UTC),
+        )
+    )
+    await session.exec(table_version_bump(session, "recipe")) # Cards show the average too
+
+async def _check_rating(rating: RatingCreate, session: AsyncSession):
+    """Validate value range and that the recipe exists."""
     if rating.value < 1 or rating.value > 3:
         raise HTTPException(status_code=400, detail="Rating must be between 1 and 3")
-    db_rating = Rating(recipe_id=rating.recipe_id, user_id=current_user.id, value=rating.value)
-    session.add(db_rating)
-    session.commit()
-    session.refresh(db_rating)
-    return db_rating
+    if not await session.get(Recipe, rating.recipe_id):
+        raise HTTPException(status_code=404, detail="Recipe not found")
+
+@router.post("/", response_model=RatingRead)
+async def create_rating(rating: RatingCreate, session: AsyncSession = Depends(get_session), current_user: CurrentUser = Depends(get_current_user)):
+    """Creates a new rating for a recipe."""
+    await _check_rating(rating, session)
+    # Unique (user_id, recipe_id) index makes duplicate detection part of the insert
+    db_rating = (await session.exec(
+        dialect_insert(session, Rating)
+        .values(recipe_id=rating.recipe_id, user_id=current_user.id, value=rating.value)
+        .on_conflict_do_nothing(index_elements=["user_id", "recipe_id"])
+        .returning(Rating)
+    )).scalar_one_or_none()
+    if db_rating is None:
+        raise HTTPException(status_code=400, detail="Already rated")
+    result = RatingRead.model_validate(db_rating) # Snapshot before commit expires the row
+    await _refresh_rating_totals(session, rating.recipe_id)
+    await session.commit()
+    await response_cache.invalidate_recipe(rating.recipe_id)
+    return result
 
 @router.get("/", response_model=RatingRead)
-async def read_rating(user_id: int, recipe_id: int, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+async def read_rating(user_id: int, recipe_id: int, session: AsyncSession = Depends(get_session), current_user: CurrentUser = Depends(get_current_user)):
     """Retrieve a user's rating for a recipe."""
-    db_rating = session.exec(
+    db_rating = (await session.exec(
         select(Rating).where(
             Rating.user_id == current_user.id,
             Rating.recipe_id == recipe_id
         )
-    ).first()
+    )).first()
     if not db_rating:
         raise HTTPException(status_code=404, detail="Rating not found")
     return db_rating
 
 @router.put("/", response_model=RatingRead)
-async def update_rating(rating: RatingCreate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    """Update a user's rating for a recipe."""
-    db_rating = session.exec(
-        select(Rating).where(
-            Rating.user_id == current_user.id,
-            Rating.recipe_id == rating.recipe_id
-        )
-    ).first()
-    if not db_rating:
-        raise HTTPException(status_code=404, detail="Rating not found")
-    if rating.value < 1 or rating.value > 3:
-        raise HTTPException(status_code=400, detail="Rating must be between 1 and 3")
-    db_rating.value = rating.value
-    session.add(db_rating)
-    session.commit()
-    session.refresh(db_rating)
+async def update_rating(rating: RatingCreate, session: AsyncSession = Depends(get_session), current_user: CurrentUser = Depends(get_current_user)):
+    """Create or update a user's rating for a recipe."""
+    await _check_rating(rating, session)
+    statement = dialect_insert(session, Rating).values(
+        recipe_id=rating.recipe_id, user_id=current_user.id, value=rating.value
+    )
+    db_rating = (await session.exec(
+        statement.on_conflict_do_update(
+            index_elements=["user_id", "recipe_id"],
+            set_={"value": statement.excluded.value}
+        ).returning(Rating).execution_options(populate_existing=True)
+    )).scalar_one()
+    result = RatingRead.model_validate(db_rating)
+    await _refresh_rating_totals(session, rating.recipe_id)
+    await session.commit()
+    await response_cache.invalidate_recipe(rating.recipe_id)
     logging.info(f"Updated rating: user_id={current_user.id}, recipe_id={rating.recipe_id}, value={rating.value}")
-    return db_rating
+    return result
 
 @router.delete("/", response_model=dict)
-async def remove_rating(rating: RatingCreate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
-    db_rating = session.exec(
-        select(Rating).where(
-            Rating.user_id == current_user.id,
-            Rating.recipe_id == rating.recipe_id
-        )
-    ).first()
-    if not db_rating:
+async def remove_rating(rating: RatingCreate, session: AsyncSession = Depends(get_session), current_user: CurrentUser = Depends(get_current_user)):
+    deleted = (await session.exec(
+        delete(Rating)
+        .where(Rating.user_id == current_user.id, Rating.recipe_id == rating.recipe_id)
+        .returning(Rating.id)
+    )).first()
+    if not deleted:
         raise HTTPException(status_code=404, detail="Rating not found")
-    session.delete(db_rating)
-    session.commit()
+    await _refresh_rating_totals(session, rating.recipe_id)
+    await session.commit()
+    await response_cache.invalidate_recipe(rating.recipe_id)
     logger.info(f"Removed rating: user_id={current_user.id}, recipe_id={rating.recipe_id}")
     return {"message": f"Rating (user_id={current_user.id}, recipe_id={rating.recipe_id}) removed successfully"}
@@ -1,19 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, func
-from app.models import User, Rating, Recipe, RecipeRead, RecipeCreate
-from app.database import get_session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import select, or_, and_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models import (
+    CurrentUser, Recipe, RecipeRead, RecipeCreate, RecipeSummary, RecipeFacets, RecipeRatingSummary,
+    BulkImportError, BulkImportResult, average_rating
+)
+from app.database import get_session, get_table_version, table_version_bump
 from app.auth import get_current_user
-from typing import List
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor, set_page_headers, set_next_link
+from app.search import recipe_fts, to_match_query
+from app.facets import matching_recipe_ids, facet_counts, index_recipe_terms, parse_ingredient_names
+from app.http_cache import make_etag, is_not_modified, not_modified, set_cache_headers
+from app.response_cache import response_cache, recipe_key, average_rating_key
+from app.embeddings import recipe_index, recipe_features
+from app.seed import complete_row, insert_recipe_batch
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import json
 import logging
 
 router = APIRouter()
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Cache-Control per read route. Single recipes and ratings always revalidate (a 304 is
+# cheap and a user expects their own rating to show); lists may lag new recipes briefly.
+RECIPE_CACHE_CONTROL = "public, no-cache"
+LIST_CACHE_CONTROL = "public, max-age=10, stale-while-revalidate=60"
+SEARCH_CACHE_CONTROL = "public, max-age=60"
+RATINGS_CACHE_CONTROL = "public, no-cache"
+
+async def _commit_recipe_write(session: AsyncSession, recipe_id: Optional[int] = None, version_bumped: bool = False):
+    """Commit a write to the recipe table, then drop the cached reads it changed.
+
+    Recipe writes commit through here so none skips the table's version bump (list ETags)
+    or the response cache invalidation. insert_recipe_batch bumps the version itself, so
+    its callers pass version_bumped.
+    """
+    if not version_bumped:
+        await session.exec(table_version_bump(session, "recipe"))
+    await session.commit()
+    await response_cache.invalidate_recipe(recipe_id)
+
+async def _list_etag(request: Request, session: AsyncSession) -> str:
+    """ETag for responses computed from the whole recipe table: its write counter plus the query."""
+    return make_etag(request.url.path, await get_table_version(session, "recipe"), request.url.query)
+
 @router.post("/", response_model=RecipeRead)
-async def create_recipe(recipe: RecipeCreate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+async def create_recipe(
+    recipe: RecipeCreate,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Recipe creation for current user."""
     logger.info(f"Creating recipe for user: {current_user.username}, ID: {current_user.id}")
     try:
@@ -25,52 +66,319 @@ async def create_recipe(recipe: RecipeCreate, session: Session = Depends(get_ses
         recipe_dict["author_id"] = current_user.id
         db_recipe = Recipe(**recipe_dict)
         session.add(db_recipe)
-        session.commit()
-        session.refresh(db_recipe)
+        await session.flush() # Need the id for the ingredient/tag rows
+        ingredient_names = parse_ingredient_names(recipe.ingredients)
+        index_recipe_terms(session, db_recipe.id, ingredient_names, recipe.tags)
+        await _commit_recipe_write(session)
+        await session.refresh(db_recipe)
+        # Embedded after the response is sent, so it can be recommended before the next rebuild
+        background_tasks.add_task(recipe_index.add, [(db_recipe.id, recipe_features(ingredient_names, recipe.tags, recipe.category))])
         logger.info(f"Recipe created: {db_recipe.id}")
         return db_recipe
     except Exception as e:
         logger.error(f"Error creating recipe: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create recipe: {str(e)}")
     
-@router.get("/", response_model=List[RecipeRead])
-async def get_recipes(session: Session = Depends(get_session)):
-    """Retrieve all recipes from database."""
-    statement = select(Recipe) # SQLModel select to query all recipes
-    recipes = session.exec(statement).all()
-    return recipes # Return as list for RecipeRead format
+BULK_CHUNK_SIZE = 500 # Rows per transaction in POST /recipes/bulk
+MAX_LINE_BYTES = 1024 * 1024
+MAX_REPORTED_ERRORS = 1000
+EXPORT_BATCH_SIZE = 1000 # Rows fetched per round trip by GET /recipes/export
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[Tuple[int, bytes]]:
+    """(line number, line) pairs as the body arrives, without buffering the whole body."""
+    buffer = b""
+    line_number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line
+        if len(buffer) > MAX_LINE_BYTES:
+            raise HTTPException(status_code=413, detail=f"Line {line_number + 1} is longer than {MAX_LINE_BYTES} bytes")
+    if buffer:
+        yield line_number + 1, buffer
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in error.errors())
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_create_recipes(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Create recipes from an NDJSON body (Content-Type: application/x-ndjson), one RecipeCreate per line.
+
+    Rows are inserted BULK_CHUNK_SIZE per transaction, so a failed chunk does not undo earlier ones.
+    Invalid rows are reported by line and skipped; rows identical to a stored recipe are skipped too.
+    """
+    result = BulkImportResult()
+    batch: Dict[str, Tuple[Dict, List[str], List[str]]] = {} # content hash -> row, ingredient names, tags
+    batch_lines: Dict[str, int] = {}
+    embed_records = []
+
+    def fail(line: int, detail: str):
+        result.failed += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(BulkImportError(line=line, detail=detail))
+
+    async def flush():
+        try:
+            inserted = await session.run_sync(lambda sync_session: insert_recipe_batch(sync_session.connection(), batch))
+            await _commit_recipe_write(session, version_bumped=True) # Each chunk is readable once committed
+        except SQLAlchemyError as e:
+            await session.rollback()
+            logger.error(f"Bulk import chunk failed: {str(e)}")
+            for line in batch_lines.values():
+                fail(line, "Database error, row not inserted")
+        else:
+            result.inserted += len(inserted)
+            result.duplicates += len(batch) - len(inserted)
+            for recipe_id, hash in inserted:
+                row, ingredient_names, tags = batch[hash]
+                embed_records.append((recipe_id, recipe_features(ingredient_names, tags, row["category"])))
+        batch.clear()
+        batch_lines.clear()
+
+    async for line_number, line in _ndjson_lines(request):
+        if not line.strip():
+            continue
+        result.received += 1
+        try:
+            recipe = RecipeCreate.model_validate_json(line)
+        except ValidationError as e:
+            fail(line_number, _validation_detail(e))
+            continue
+        row = complete_row({
+            **recipe.model_dump(exclude={"instructions", "tags"}),
+            "instructions": json.dumps(recipe.instructions),
+            "tags": json.dumps(recipe.tags),
+        }, author_id=current_user.id)
+        if row["content_hash"] in batch:
+            result.duplicates += 1 # Same recipe twice in one chunk
+            continue
+        batch[row["content_hash"]] = (row, parse_ingredient_names(recipe.ingredients), recipe.tags)
+        batch_lines[row["content_hash"]] = line_number
+        if len(batch) >= BULK_CHUNK_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    if result.inserted:
+        background_tasks.add_task(recipe_index.add, embed_records)
+    logger.info(f"Bulk import by {current_user.username}: {result.inserted} inserted, {result.duplicates} duplicates, {result.failed} failed")
+    return result
+
+# Columns written by GET /recipes/export, in order; tags and instructions are decoded back to lists
+EXPORT_COLUMNS = (
+    Recipe.id, Recipe.title, Recipe.description, Recipe.ingredients, Recipe.instructions,
+    Recipe.serves, Recipe.time, Recipe.image_source, Recipe.category, Recipe.tags,
+    Recipe.author_id, Recipe.created_at, Recipe.updated_at, Recipe.rating_count, Recipe.rating_sum,
+)
+
+@router.get("/export")
+async def export_recipes(session: AsyncSession = Depends(get_session)):
+    """Every recipe as NDJSON in id order. Each line is also a valid POST /recipes/bulk row."""
+    # The request's session is closed before the body streams, so stream from a session of our own
+    bind = session.bind
+    async def rows():
+        async with AsyncSession(bind) as export_session:
+            # yield_per streams from a server-side cursor where the driver has one, EXPORT_BATCH_SIZE rows at a time
+            result = await export_session.stream(
+                select(*EXPORT_COLUMNS).order_by(Recipe.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+            )
+            async for partition in result.partitions():
+                lines = []
+                for row in partition:
+                    recipe = dict(row._mapping)
+                    recipe["instructions"] = json.loads(recipe["instructions"])
+                    recipe["tags"] = json.loads(recipe["tags"])
+                    recipe["created_at"] = recipe["created_at"].isoformat()
+                    recipe["updated_at"] = recipe["updated_at"].isoformat()
+                    lines.append(json.dumps(recipe, ensure_ascii=False))
+                yield ("\n".join(lines) + "\n").encode()
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+# Only the columns a recipe card needs, so list pages skip the large text fields
+SUMMARY_COLUMNS = (
+    Recipe.id, Recipe.title, Recipe.author_id, Recipe.created_at,
+    Recipe.image_source, Recipe.category, Recipe.serves, Recipe.time,
+    Recipe.rating_count, Recipe.rating_sum,
+)
+
+@router.get("/", response_model=List[RecipeSummary])
+async def get_recipes(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    tag: List[str] = Query([]),
+    ingredient: List[str] = Query([]),
+    category: Optional[str] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    """Retrieve a page of recipe summaries, oldest first. Next page cursor is in the Link header.
+
+    Repeat tag/ingredient to require all of them, e.g. ?tag=vegetarian&ingredient=garlic.
+    """
+    key = await response_cache.list_key(request)
+    cached = await response_cache.get(request, key)
+    if cached is not None:
+        return cached
+    # Checked before the page query, so an unchanged table answers 304 without running it
+    etag = await _list_etag(request, session)
+    if is_not_modified(request, etag):
+        return not_modified(etag, LIST_CACHE_CONTROL)
+    statement = select(*SUMMARY_COLUMNS).order_by(Recipe.created_at, Recipe.id)
+    recipe_ids = matching_recipe_ids(tag, ingredient, category)
+    if recipe_ids is not None:
+        statement = statement.where(Recipe.id.in_(recipe_ids))
+    if cursor:
+        try:
+            after_created_at, after_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # Keyset seek instead of OFFSET so deep pages cost the same as the first
+        statement = statement.where(or_(
+            Recipe.created_at > after_created_at,
+            and_(Recipe.created_at == after_created_at, Recipe.id > after_id)
+        ))
+    # Fetch one extra row to know whether another page exists
+    rows = (await session.exec(statement.limit(limit + 1))).all()
+    recipes = [RecipeSummary.model_validate(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = recipes[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    set_page_headers(request, response, next_cursor)
+    set_cache_headers(response, etag, LIST_CACHE_CONTROL)
+    return await response_cache.put(key, recipes, response)
+
+@router.get("/facets", response_model=RecipeFacets)
+async def get_recipe_facets(
+    request: Request,
+    response: Response,
+    tag: List[str] = Query([]),
+    ingredient: List[str] = Query([]),
+    category: Optional[str] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    """Tag, ingredient and category counts for recipes matching the same filters as GET /recipes/."""
+    etag = await _list_etag(request, session)
+    if is_not_modified(request, etag):
+        return not_modified(etag, SEARCH_CACHE_CONTROL)
+    set_cache_headers(response, etag, SEARCH_CACHE_CONTROL)
+    return await facet_counts(session, matching_recipe_ids(tag, ingredient, category))
+
+@router.get("/ratings", response_model=List[RecipeRatingSummary])
+async def get_ratings(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description="Comma-separated recipe ids"),
+    session: AsyncSession = Depends(get_session)
+):
+    """Rating aggregates for many recipes in one query. Unknown ids are omitted."""
+    try:
+        recipe_ids = {int(id) for id in ids.split(",") if id.strip()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if len(recipe_ids) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PAGE_SIZE} ids per request")
+    etag = await _list_etag(request, session)
+    if is_not_modified(request, etag):
+        return not_modified(etag, RATINGS_CACHE_CONTROL)
+    set_cache_headers(response, etag, RATINGS_CACHE_CONTROL)
+    rows = (await session.exec(
+        select(Recipe.id, Recipe.rating_sum, Recipe.rating_count).where(Recipe.id.in_(recipe_ids)).order_by(Recipe.id)
+    )).all()
+    return [
+        RecipeRatingSummary(recipe_id=id, average_rating=average_rating(rating_sum, rating_count), rating_count=rating_count)
+        for id, rating_sum, rating_count in rows
+    ]
+
+@router.get("/search", response_model=List[RecipeSummary])
+async def search_recipes(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_session)
+):
+    """Full-text search over title, description, ingredients and tags, best BM25 match first."""
+    match = to_match_query(q)
+    if not match:
+        return []
+    etag = await _list_etag(request, session)
+    if is_not_modified(request, etag):
+        return not_modified(etag, SEARCH_CACHE_CONTROL)
+    set_cache_headers(response, etag, SEARCH_CACHE_CONTROL)
+    statement = (
+        select(*SUMMARY_COLUMNS)
+        .join(recipe_fts, recipe_fts.c.rowid == Recipe.id)
+        .where(recipe_fts.c.recipe_fts.op("MATCH")(match))
+        .order_by(recipe_fts.c.rank, Recipe.id)
+        .offset(offset)
+        .limit(limit + 1)
+    )
+    rows = (await session.exec(statement)).all()
+    if len(rows) > limit:
+        set_next_link(request, response, offset=offset + limit)
+    return [RecipeSummary.model_validate(row._mapping) for row in rows[:limit]]
+
+async def _check_recipe_modified(request: Request, id: int, cache_control: str, session: AsyncSession) -> Optional[Response]:
+    """304 response if the client's copy of recipe id is current, else None. Reads only updated_at."""
+    if "if-none-match" not in request.headers and "if-modified-since" not in request.headers:
+        return None
+    updated_at = (await session.exec(select(Recipe.updated_at).where(Recipe.id == id))).first()
+    if updated_at is None:
+        return None # Let the caller produce the 404
+    etag = make_etag(request.url.path, id, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified(etag, cache_control, updated_at)
+    return None
+
+def _set_recipe_cache_headers(request: Request, response: Response, recipe: Recipe, cache_control: str):
+    etag = make_etag(request.url.path, recipe.id, recipe.updated_at)
+    set_cache_headers(response, etag, cache_control, recipe.updated_at)
 
 # Get a specific recipe
 @router.get("/{id}", response_model=RecipeRead)
-async def get_recipe(id: int, session: Session = Depends(get_session)):
-    recipe = session.get(Recipe,id)
+async def get_recipe(id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    cached = await response_cache.get(request, recipe_key(id))
+    if cached is None:
+        cached = await _check_recipe_modified(request, id, RECIPE_CACHE_CONTROL, session)
+    if cached is not None:
+        return cached
+    recipe = await session.get(Recipe,id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    return recipe
+    _set_recipe_cache_headers(request, response, recipe, RECIPE_CACHE_CONTROL)
+    return await response_cache.put(recipe_key(id), RecipeRead.model_validate(recipe), response)
 
 @router.put("/recipes/{id}", response_model=RecipeRead)
-async def update_recipe(id: int, recipe: RecipeCreate, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+async def update_recipe(id: int, recipe: RecipeCreate, session: AsyncSession = Depends(get_session), current_user: CurrentUser = Depends(get_current_user)):
     """Update a recipe."""
     pass
 
 @router.delete("/recipes/{id}", response_model=dict)
-async def delete_recipe(id: int, session: Session = Depends(get_session), current_user: User = Depends(get_current_user)):
+async def delete_recipe(id: int, session: AsyncSession = Depends(get_session), current_user: CurrentUser = Depends(get_current_user)):
     """Delete a recipe from database."""
     pass
     
 @router.get("/{id}/average-rating", response_model=dict)
-async def get_average_rating(id: int, session: Session = Depends(get_session)):
+async def get_average_rating(id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
     """Get the average rating for a specific recipe."""
-    # Check if recipe exists
-    recipe = session.get(Recipe, id)
+    cached = await response_cache.get(request, average_rating_key(id))
+    if cached is None:
+        cached = await _check_recipe_modified(request, id, RATINGS_CACHE_CONTROL, session)
+    if cached is not None:
+        return cached
+    # Aggregates live on the recipe row, so this is a single primary-key lookup
+    recipe = await session.get(Recipe, id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    
-    avg_rating = session.exec(
-        select(func.avg(Rating.value)).where(Rating.recipe_id == id)
-    ).first()
-
-    if avg_rating is None:
-        return {"average_rating": 0.0}
-    
-    return {"average_rating": round(float(avg_rating), 1)}
\ No newline at end of file
+    _set_recipe_cache_headers(request, response, recipe, RATINGS_CACHE_CONTROL)
+    content = {"average_rating": average_rating(recipe.rating_sum, recipe.rating_count)}
+    return await response_cache.put(average_rating_key(id), content, response)
\ No newline at end of file
@@ -1,14 +1,79 @@
 # router for /recommendations/ endpoint that returns 10 recipes the user
-# hasn't favorited yet
+# hasn't favorited or rated yet
 
-# fetch all recipes including user's favorited recipes
-# generate embeddings for each recipe based on tags and ingredients
-# use kNN to find similar recipes, excluding user favorites
-# return top 10
+# Two offline-built indexes (see their modules), blended on request:
+# - content: embeddings of each recipe's tags and ingredients (`python -m app.embeddings`),
+#   nearest by cosine to the recipes the user favorited or rated highly
+# - collaborative: recipe neighbors from everyone's ratings and favorites
+#   (`python -m app.collaborative`), scored from all of the user's interactions
 
-# use sentence-bert to convert tags and ignredients into vectors
-# probably do the embeddings like once a day?  
-# on request, fetch embeddings, run kNN, return results?
-# knn for fast lookups
-# offline embedding to save time
+from app.auth import get_current_user
+from app.collaborative import FAVORITE_WEIGHT, RATING_WEIGHTS, interaction_index
+from app.database import get_session
+from app.embeddings import recipe_index
+from app.models import CurrentUser, Favorite, Rating, Recipe, RecipeSummary
+from app.pagination import MAX_PAGE_SIZE
+from app.routers.recipes import SUMMARY_COLUMNS
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Dict, List, Tuple
+import os
 
+import logging
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATION_COUNT = 10
+CANDIDATES = 50 # Taken from each index before blending
+# Share of the blended score from collaborative filtering; the rest is content similarity
+CF_WEIGHT = float(os.getenv("RECOMMENDATION_CF_WEIGHT", "0.5"))
+
+def blend(content: List[Tuple[int, float]], collaborative: List[Tuple[int, float]], k: int) -> List[int]:
+    """Top k ids by weighted score. CF scores are scaled to the best candidate's; cosines are kept as is."""
+    if not collaborative:
+        return [id for id, _ in content[:k]]
+    if not content:
+        return [id for id, _ in collaborative[:k]]
+    top_cf = collaborative[0][1]
+    scores: Dict[int, float] = {}
+    for id, score in content:
+        scores[id] = (1 - CF_WEIGHT) * score
+    for id, score in collaborative:
+        scores[id] = scores.get(id, 0.0) + CF_WEIGHT * score / top_cf
+    return sorted(scores, key=scores.get, reverse=True)[:k]
+
+def _recommend(weights: Dict[int, float], liked_ids: List[int], k: int) -> List[int]:
+    content = recipe_index.recommend(liked_ids, list(weights), CANDIDATES)
+    collaborative = interaction_index.recommend(weights, weights, CANDIDATES)
+    return blend(content, collaborative, k)
+
+@router.get("/", response_model=List[RecipeSummary])
+async def get_recommendations(
+    limit: int = Query(RECOMMENDATION_COUNT, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_session),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Recipes for the user from their favorites and ratings, best first. Empty until they have either."""
+    weights: Dict[int, float] = {}
+    for recipe_id, value in (await session.exec(select(Rating.recipe_id, Rating.value).where(Rating.user_id == current_user.id))).all():
+        weights[recipe_id] = RATING_WEIGHTS[value]
+    favorite_ids = (await session.exec(select(Favorite.recipe_id).where(Favorite.user_id == current_user.id))).all()
+    for recipe_id in favorite_ids:
+        weights[recipe_id] = weights.get(recipe_id, 0.0) + FAVORITE_WEIGHT
+    if not weights:
+        return []
+    if not recipe_index.refresh() and not interaction_index.refresh():
+        raise HTTPException(status_code=503, detail="Recommendations are not available yet")
+    liked_ids = [id for id, weight in weights.items() if weight >= FAVORITE_WEIGHT]
+    # The numpy/scipy work releases the GIL, so keep it off the event loop
+    ids = await run_in_threadpool(_recommend, weights, liked_ids, limit)
+    if not ids:
+        return []
+    rows = (await session.exec(select(*SUMMARY_COLUMNS).where(Recipe.id.in_(ids)))).all()
+    by_id = {row.id: row for row in rows}
+    # Recipes deleted since the last index build are skipped
+    return [RecipeSummary.model_validate(by_id[id]._mapping) for id in ids if id in by_id]
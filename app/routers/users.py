@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import select, Session
-from app.models import User, UserCreate, UserResponse
-from app.auth import create_access_token, pwd_context, get_current_user
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models import CurrentUser, User, UserCreate, UserResponse
+from app.auth import create_access_token, hash_password, verify_password, get_current_user, invalidate_user
 from app.database import get_session
 from pydantic import BaseModel
 from datetime import datetime, timedelta, timezone as dt_timezone
@@ -14,38 +15,46 @@ class LoginRequest(BaseModel):
     password: str
 
 @router.post("/token")
-async def login(request: LoginRequest, session: Session = Depends(get_session)):
+async def login(request: LoginRequest, session: AsyncSession = Depends(get_session)):
     """Handles user login and returns access token."""
     # No username or password
     if not request.username or not request.password:
         raise HTTPException(status_code=400, detail="Username and password are required")
-    user = session.exec(select(User).where(User.username == request.username)).first()
-    if not user or not pwd_context.verify(request.password, user.hashed_password):
+    user = (await session.exec(select(User).where(User.username == request.username))).first()
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await verify_password(request.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash: # Stored hash predates the current cost settings
+        user.hashed_password = new_hash
+        await session.commit()
     # Token expires after 1 hour
-    token = create_access_token({"sub": user.username}, timedelta(hours=1))
+    token = create_access_token({"sub": user.username}, timedelta(hours=1), uid=user.id)
     return {"access_token": token, "token_type": "bearer"}
 
 @router.post("/", response_model=UserResponse)
-async def create_user(user: UserCreate, session: Session = Depends(get_session)):
+async def create_user(user: UserCreate, session: AsyncSession = Depends(get_session)):
     """Creates a new user in database."""
     # Check if username already exists
-    existing_user_by_username = session.exec(select(User).where(User.username == user.username)).first()
+    existing_user_by_username = (await session.exec(select(User).where(User.username == user.username))).first()
     if existing_user_by_username:
         raise HTTPException(status_code=409, detail="Username already registered")
 
     # Check if email already exists
-    existing_user_by_email = session.exec(select(User).where(User.email == user.email)).first()
+    existing_user_by_email = (await session.exec(select(User).where(User.email == user.email))).first()
     if existing_user_by_email:
         raise HTTPException(status_code=409, detail="Email already registered")
 
-    db_user = User(username=user.username, email=user.email, hashed_password=pwd_context.hash(user.password))
+    db_user = User(username=user.username, email=user.email, hashed_password=await hash_password(user.password))
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user) # Reload the user to add auto-generated fields
+    await session.commit()
+    await session.refresh(db_user) # Reload the user to add auto-generated fields
+    invalidate_user(db_user.username) # Username may have been cached for an earlier row
     return db_user
 
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: CurrentUser = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
     """Returns the current authenticated user's details."""
-    return current_user
\ No newline at end of file
+    # The cached identity has no email, so load the full row
+    return await session.get(User, current_user.id)
\ No newline at end of file
@@ -0,0 +1,80 @@
+import re
+from sqlalchemy import event, text, table, column
+from sqlalchemy.engine import Connection, Engine
+from app.models import Recipe
+
+# External-content FTS5 index over the searchable recipe columns.
+# Rows live in `recipe`; the index only stores tokens, keyed by recipe.id.
+FTS_TABLE = "recipe_fts"
+FTS_COLUMNS = ("title", "description", "ingredients", "tags")
+# BM25 column weights, same order as FTS_COLUMNS (title hits matter most)
+FTS_WEIGHTS = (10.0, 2.0, 4.0, 5.0)
+
+recipe_fts = table(FTS_TABLE, column("rowid"), column("rank"), column(FTS_TABLE))
+
+_cols = ", ".join(FTS_COLUMNS)
+_new = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_old = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+# Only updates to indexed columns touch the index: rating writes update rating_count,
+# rating_sum and updated_at on every rating and must not delete and re-add the FTS row
+_UPDATE_TRIGGER_DDL = (
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_cols} ON recipe BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_cols}) VALUES ('delete', old.id, {_old}); "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_cols}) VALUES (new.id, {_new}); END"
+)
+
+_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{_cols}, content='recipe', content_rowid='id', tokenize='porter unicode61')",
+    # Triggers keep the index in sync with every write to recipe
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON recipe BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_cols}) VALUES (new.id, {_new}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON recipe BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_cols}) VALUES ('delete', old.id, {_old}); END",
+    _UPDATE_TRIGGER_DDL,
+    # Persist the ranking function so `ORDER BY rank` uses weighted BM25
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES "
+    f"('rank', 'bm25({', '.join(str(w) for w in FTS_WEIGHTS)})')",
+]
+
+def create_search_index(connection: Connection):
+    """Create the FTS5 table and sync triggers if missing. SQLite only."""
+    if connection.dialect.name != "sqlite":
+        return
+    for ddl in _SEARCH_DDL:
+        connection.execute(text(ddl))
+
+def rebuild_search_index(db_engine: Engine):
+    """Create the index if needed and rebuild it from the recipe table."""
+    if db_engine.dialect.name != "sqlite":
+        return
+    with db_engine.begin() as connection:
+        create_search_index(connection)
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+def migrate_search_trigger(db_engine: Engine):
+    """Replace the update trigger of older DBs, which fired on any recipe column, with the indexed-columns one."""
+    if db_engine.dialect.name != "sqlite":
+        return
+    with db_engine.begin() as connection:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au"))
+        connection.execute(text(_UPDATE_TRIGGER_DDL))
+
+def to_match_query(query: str) -> str:
+    """Turn free text into a safe FTS5 MATCH expression (AND of quoted terms, last one prefix-matched)."""
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*" # Search-as-you-type on the last word
+    return " ".join(quoted)
+
+@event.listens_for(Recipe.__table__, "after_create")
+def _after_recipe_create(target, connection, **kw):
+    create_search_index(connection)
+
+@event.listens_for(Recipe.__table__, "before_drop")
+def _before_recipe_drop(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
@@ -0,0 +1,148 @@
+"""Load recipe seed files into the database. Re-running is safe: recipes already present are skipped.
+
+    python -m app.seed                      # every app/data/*.json
+    python -m app.seed path/to/a.json b.json --batch-size 1000
+"""
+import argparse
+import hashlib
+import json
+import time
+import datetime as dt
+from datetime import datetime
+from pathlib import Path
+from random import randint
+from typing import Dict, Iterable, Iterator, List, Tuple
+import ijson
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Connection, Engine
+from app.models import Recipe, RecipeIngredient, RecipeTag
+from app.facets import normalize_term
+import logging
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent / "data"
+DEFAULT_SEED_FILES = sorted(DATA_DIR.glob("*.json"))
+BATCH_SIZE = 500 # Recipes per multi-row INSERT and transaction
+
+# Recipe columns that define "the same recipe" across files and runs
+HASHED_FIELDS = ("title", "description", "ingredients", "instructions", "category", "image_source", "serves", "time", "tags")
+
+def content_hash(row: Dict) -> str:
+    """sha256 of a recipe's content columns, as stored on the row."""
+    payload = json.dumps([row[field] for field in HASHED_FIELDS], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def iter_seed_recipes(path: Path) -> Iterator[Dict]:
+    """Stream recipe dicts from a seed file without loading it whole.
+
+    Accepts the Ollama output shape {"recipes": [{"recipe": {...}}, ...]} or a bare list of recipes.
+    """
+    with open(path, "rb") as file:
+        head = file.read(64).lstrip()
+        file.seek(0)
+        prefix = "item" if head.startswith(b"[") else "recipes.item"
+        for entry in ijson.items(file, prefix, use_float=True):
+            yield entry.get("recipe", entry)
+
+def recipe_row(recipe_data: Dict, author_id: int) -> Tuple[Dict, List[str], List[str]]:
+    """Recipe column values plus raw ingredient names and tags for one seed entry, credited to author_id."""
+    ingredients = recipe_data["ingredients"]
+    tags = recipe_data.get("tags", [])
+    row = {
+        "title": recipe_data["title"],
+        "description": recipe_data["description"],
+        # Same joined-string and JSON-string encodings POST /recipes/ produces
+        "ingredients": ", ".join(f"{ing['amount']} {ing['unit']} {ing['id']}" + "\n" for ing in ingredients),
+        "instructions": json.dumps(recipe_data.get("instructions", [])),
+        "category": recipe_data.get("category", ""),
+        "image_source": recipe_data["image_source"],
+        "serves": recipe_data["serves"],
+        "time": recipe_data["time"],
+        "tags": json.dumps(tags),
+    }
+    return complete_row(row, author_id=author_id), [ing["id"] for ing in ingredients], tags
+
+def complete_row(row: Dict, author_id: int) -> Dict:
+    """Add the content hash, author and the model defaults Core inserts skip to a row of content columns."""
+    now = datetime.now(dt.UTC)
+    row.update(
+        content_hash=content_hash(row),
+        author_id=author_id,
+        created_at=now,
+        updated_at=now,
+        rating_count=0,
+        rating_sum=0,
+    )
+    return row
+
+def insert_recipe_batch(connection: Connection, batch: Dict[str, Tuple[Dict, List[str], List[str]]]) -> List[Tuple[int, str]]:
+    """Insert one batch keyed by content hash, skipping recipes already stored (same content hash or
+    source URL). Returns (id, hash) of rows inserted."""
+    from app.database import dialect_insert, table_version_bump
+    inserted = connection.execute(
+        dialect_insert(connection, Recipe)
+        .values([row for row, _, _ in batch.values()])
+        .on_conflict_do_nothing() # Any unique index: content_hash, or source_url for app.ingest
+        .returning(Recipe.id, Recipe.content_hash)
+    ).all()
+    ingredient_rows, tag_rows = [], []
+    for recipe_id, hash in inserted:
+        _, ingredient_names, tags = batch[hash]
+        names = dict.fromkeys(normalize_term(name) for name in ingredient_names)
+        ingredient_rows.extend({"recipe_id": recipe_id, "name": name} for name in names if name)
+        tag_values = dict.fromkeys(normalize_term(str(tag)) for tag in tags)
+        tag_rows.extend({"recipe_id": recipe_id, "tag": tag} for tag in tag_values if tag)
+    if inserted:
+        connection.execute(table_version_bump(connection, "recipe"))
+    # executemany for the association rows
+    if ingredient_rows:
+        connection.execute(insert(RecipeIngredient), ingredient_rows)
+    if tag_rows:
+        connection.execute(insert(RecipeTag), tag_rows)
+    return inserted
+
+def seed_recipes(db_engine: Engine, paths: Iterable[Path], batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """Stream every file into the recipe table in batches. Returns recipes read and inserted."""
+    read = inserted = 0
+    batch: Dict[str, Tuple[Dict, List[str], List[str]]] = {}
+    def flush():
+        nonlocal inserted
+        with db_engine.begin() as connection:
+            inserted += len(insert_recipe_batch(connection, batch))
+        batch.clear()
+    for path in paths:
+        for recipe_data in iter_seed_recipes(path):
+            read += 1
+            entry = recipe_row(recipe_data, author_id=randint(1, 10)) # Demo data: spread over the demo users
+            batch.setdefault(entry[0]["content_hash"], entry) # Same recipe twice in a batch
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+    return {"read": read, "inserted": inserted}
+
+def recipes_exist(db_engine: Engine) -> bool:
+    """True if the recipe table has any row (reads at most one)."""
+    with db_engine.connect() as connection:
+        return connection.execute(select(Recipe.id).limit(1)).first() is not None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", type=Path, default=DEFAULT_SEED_FILES)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    from app.database import engine
+    from app.migrations import upgrade
+    upgrade(engine)
+    started = time.perf_counter()
+    stats = seed_recipes(engine, args.files, args.batch_size)
+    elapsed = time.perf_counter() - started
+    print(
+        f"Read {stats['read']} recipes from {len(args.files)} files, inserted {stats['inserted']} new "
+        f"in {elapsed:.2f}s ({stats['read'] / elapsed:.0f} rows/s)"
+    )
+
+if __name__ == "__main__":
+    main()
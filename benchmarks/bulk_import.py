@@ -0,0 +1,86 @@
+"""Import throughput, one POST /recipes/ per recipe vs one streamed POST /recipes/bulk,
+and peak Python memory of the streaming export vs loading every row at once.
+
+    python -m benchmarks.bulk_import --recipes 5000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import httpx
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.auth import create_access_token
+from app.database import create_engines, get_session
+from app.main import app
+from app.migrations import upgrade
+from app.models import Recipe
+from benchmarks.common import seed_database, serve, print_table
+
+def recipe(i: int, run: str) -> dict:
+    return {
+        "title": f"{run} recipe {i}", "description": "Benchmark recipe " * 20,
+        "ingredients": "1 cup flour\n, 2 eggs\n, 100 ml milk\n", "instructions": ["Mix", "Cook"] * 5,
+        "category": "Dinner", "image_source": "x.png", "serves": 2, "time": "30 Mins", "tags": ["bench", f"tag{i % 50}"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=5000)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        sync_engine = seed_database(url, 0)
+        upgrade(sync_engine)
+        _, async_engine = create_engines(url)
+        async def _get_session():
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                yield session
+        app.dependency_overrides[get_session] = _get_session
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench'}, uid=1)}"}
+
+        with serve(app) as base_url, httpx.Client(base_url=base_url, headers=headers, timeout=600) as client:
+            started = time.perf_counter()
+            for i in range(args.recipes):
+                client.post("/recipes/", json=recipe(i, "single")).raise_for_status()
+            elapsed = time.perf_counter() - started
+            rows.append({"mode": "POST /recipes/ each", "rows_per_s": args.recipes / elapsed, "seconds": elapsed, "peak_mb": "-"})
+
+            body = (json.dumps(recipe(i, "bulk")).encode() + b"\n" for i in range(args.recipes))
+            started = time.perf_counter()
+            response = client.post("/recipes/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+            elapsed = time.perf_counter() - started
+            assert response.json()["inserted"] == args.recipes, response.text
+            rows.append({"mode": "POST /recipes/bulk", "rows_per_s": args.recipes / elapsed, "seconds": elapsed, "peak_mb": "-"})
+
+            total = args.recipes * 2
+            tracemalloc.start()
+            started = time.perf_counter()
+            with client.stream("GET", "/recipes/export") as response:
+                exported = sum(1 for _ in response.iter_lines())
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+            assert exported == total
+            rows.append({"mode": "GET /recipes/export", "rows_per_s": total / elapsed, "seconds": elapsed, "peak_mb": peak})
+
+        # What an export without a cursor does: every row in memory, then one big body
+        tracemalloc.start()
+        started = time.perf_counter()
+        with Session(sync_engine) as session:
+            body = "\n".join(recipe.model_dump_json() for recipe in session.exec(select(Recipe)).all())
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        rows.append({"mode": "all() then dump", "rows_per_s": total / elapsed, "seconds": elapsed, "peak_mb": peak})
+    print_table(f"{args.recipes} recipes per import, {total} exported", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Collaborative-filtering build time, incremental refresh time and per-request latency
+as the number of interactions grows.
+
+Synthetic users interact with recipes drawn from a skewed popularity curve. "refresh_s"
+applies 0.1% new interactions to the built model; requests score a random user's
+interactions against the neighbor matrix, the work GET /recommendations/ adds per request.
+
+    python -m benchmarks.collaborative --interactions 10000 100000 1000000 --recipes 20000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from app.collaborative import MODEL_FILE, CollaborativeIndex, build_model, save_model
+from benchmarks.common import print_table
+
+def synthetic_interactions(count: int, recipes: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    users = rng.integers(1, max(count // 20, 2), size=count)
+    popularity = 1 / np.arange(1, recipes + 1) ** 0.8
+    items = rng.choice(np.arange(1, recipes + 1), size=count, p=popularity / popularity.sum())
+    weights = rng.choice(np.array([0.25, 0.6, 1.0], dtype=np.float32), size=count)
+    return users.astype(np.int64), items.astype(np.int64), weights
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interactions", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--recipes", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rows = []
+    for count in args.interactions:
+        users, items, weights = synthetic_interactions(count, args.recipes)
+        started = time.perf_counter()
+        model, _ = build_model(users, items, weights)
+        build = time.perf_counter() - started
+
+        extra_users, extra_items, extra_weights = synthetic_interactions(max(count // 1000, 1), args.recipes, seed=1)
+        started = time.perf_counter()
+        _, recomputed = build_model(
+            np.concatenate([users, extra_users]), np.concatenate([items, extra_items]),
+            np.concatenate([weights, extra_weights]), previous=model,
+        )
+        refresh = time.perf_counter() - started
+
+        by_user = {}
+        for user, item, weight in zip(users[:50000].tolist(), items[:50000].tolist(), weights[:50000].tolist()):
+            by_user.setdefault(user, {})[item] = weight
+        samples = random.sample(list(by_user.values()), min(args.queries, len(by_user)))
+        with tempfile.TemporaryDirectory() as tmp:
+            save_model(Path(tmp) / MODEL_FILE, model)
+            index = CollaborativeIndex(Path(tmp))
+            index.refresh()
+            latencies = []
+            for interactions in samples:
+                started = time.perf_counter()
+                index.recommend(interactions, interactions, 50)
+                latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        rows.append({
+            "interactions": count,
+            "build_s": build,
+            "refresh_s": refresh,
+            "recomputed": recomputed,
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+        })
+    print_table(f"Item-item CF over {args.recipes} recipes", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import random
+import socket
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+import httpx
+import uvicorn
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel, Session, create_engine
+from app.models import Recipe, User
+
+def seed_database(url: str, recipes: int) -> Engine:
+    """Create the schema at url and fill it with placeholder recipes."""
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(username="bench", email="bench@example.com", hashed_password="x"))
+        session.flush()
+        for i in range(recipes):
+            session.add(Recipe(
+                title=f"Recipe {i}", description="Benchmark recipe " * 20,
+                ingredients="1 cup flour\n, 2 eggs\n, 100 ml milk\n", instructions=json.dumps(["Mix", "Cook"] * 5),
+                author_id=1, image_source="x.png", category=random.choice(["Dinner", "Lunch", "Dessert"]),
+                serves=2, time="30 Mins", tags=json.dumps(["bench", "test"]),
+            ))
+        session.commit()
+    return engine
+
+def add_query_latency(engine: Engine, latency_ms: float):
+    """Sleep before every statement to mimic a networked database server.
+
+    Hooks SQLite's trace callback so the sleep happens on the thread running the
+    statement: the event loop for a sync Session, aiosqlite's worker for AsyncSession.
+    """
+    if latency_ms <= 0:
+        return
+    def _sleep(statement):
+        time.sleep(latency_ms / 1000)
+    @event.listens_for(engine, "connect")
+    def _trace(dbapi_connection, connection_record):
+        if hasattr(dbapi_connection, "run_async"): # aiosqlite adapter
+            dbapi_connection.run_async(lambda connection: connection.set_trace_callback(_sleep))
+        else:
+            dbapi_connection.set_trace_callback(_sleep)
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@contextmanager
+def serve(app):
+    """Run app under uvicorn on a background thread and yield its base URL."""
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+async def _load(base_url: str, make_request: Callable[[], Dict], total: int, concurrency: int) -> Tuple[List[float], int]:
+    latencies = []
+    errors = 0
+    queue = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for _ in queue:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(**make_request())
+                except httpx.TransportError: # Dropped connection under load
+                    errors += 1
+                    continue
+                if response.is_error: # e.g. 500 from "database is locked"
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - started)
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+def run_load(base_url: str, make_request: Callable[[], Dict], total: int, concurrency: int) -> Dict[str, float]:
+    """Fire total requests with the given concurrency and summarize throughput, latency and errors."""
+    started = time.perf_counter()
+    latencies, errors = asyncio.run(_load(base_url, make_request, total, concurrency))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "req_per_s": (total - errors) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+def print_table(title: str, rows: List[Dict]):
+    """Print result dicts as an aligned text table."""
+    print(f"\n{title}")
+    columns = list(rows[0])
+    print("  ".join(f"{c:>14}" for c in columns))
+    for row in rows:
+        print("  ".join(f"{v:>14.1f}" if isinstance(v, float) else f"{v!s:>14}" for v in row.values()))
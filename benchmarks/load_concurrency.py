@@ -0,0 +1,80 @@
+"""Concurrent read throughput before and after the AsyncSession port.
+
+"before" serves GET /recipes/{id} the old way: an async handler calling a
+sync Session, which blocks the event loop for the whole query. "after" is
+the real app with its AsyncSession dependency. --db-latency-ms adds a sleep
+to every statement to mimic a database server across the network, which is
+where blocking the loop hurts most.
+
+    python -m benchmarks.load_concurrency --requests 2000 --concurrency 50 --db-latency-ms 5
+"""
+import argparse
+import os
+import random
+import tempfile
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_session, to_async_url
+from app.main import app
+from app.models import Recipe, RecipeRead
+from benchmarks.common import seed_database, add_query_latency, serve, run_load, print_table
+
+def blocking_app(url: str, latency_ms: float, pool_size: int) -> FastAPI:
+    """Recipe detail route using the pre-async pattern (sync Session inside async def)."""
+    # A pool checkout that has to wait would block the loop that releases connections
+    engine = create_engine(url, pool_size=pool_size)
+    add_query_latency(engine, latency_ms)
+    before = FastAPI()
+    def _get_session():
+        with Session(engine) as session:
+            yield session
+
+    @before.get("/recipes/{id}", response_model=RecipeRead)
+    async def get_recipe(id: int, session: Session = Depends(_get_session)):
+        recipe = session.get(Recipe, id)
+        if not recipe:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        return recipe
+    return before
+
+def async_app(url: str, latency_ms: float, pool_size: int) -> FastAPI:
+    """The real app with get_session bound to the benchmark database."""
+    async_engine = create_async_engine(to_async_url(url), pool_size=pool_size)
+    add_query_latency(async_engine.sync_engine, latency_ms)
+    async def _get_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+    app.dependency_overrides[get_session] = _get_session
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed_database(url, args.recipes)
+        pool_size = max(args.concurrency)
+
+        def make_request():
+            return {"method": "GET", "url": f"/recipes/{random.randint(1, args.recipes)}"}
+
+        rows = []
+        for name, target in (
+            ("before (sync)", blocking_app(url, args.db_latency_ms, pool_size)),
+            ("after (async)", async_app(url, args.db_latency_ms, pool_size)),
+        ):
+            with serve(target) as base_url:
+                for concurrency in args.concurrency:
+                    result = run_load(base_url, make_request, args.requests, concurrency)
+                    rows.append({"mode": name, "concurrency": concurrency, **result})
+        print_table(f"GET /recipes/{{id}} x {args.requests}, {args.db_latency_ms} ms simulated DB latency", rows)
+
+if __name__ == "__main__":
+    main()
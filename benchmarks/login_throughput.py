@@ -0,0 +1,93 @@
+"""Login throughput, and recipe-read latency during a login burst, with bcrypt inline vs on the pool.
+
+"before" verifies passwords inside the async login handler, as the app used
+to, so every bcrypt call stalls the event loop. "after" is the real app,
+which runs bcrypt on the bounded password pool. Both serve the same recipe
+router, and reads are fired concurrently with the logins.
+
+    python -m benchmarks.login_throughput --logins 200 --concurrency 20 --bcrypt-rounds 10
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi import Depends, FastAPI, HTTPException
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app import auth
+from app.database import create_engines, get_session
+from app.main import app
+from app.models import User
+from app.routers.recipes import router as recipes_router
+from app.routers.users import LoginRequest
+from benchmarks.common import seed_database, serve, run_load, print_table
+
+def blocking_app() -> FastAPI:
+    """Recipe routes plus a login that verifies inline (the pre-pool pattern)."""
+    before = FastAPI()
+    @before.post("/users/token")
+    async def login(request: LoginRequest, session: AsyncSession = Depends(get_session)):
+        user = (await session.exec(select(User).where(User.username == request.username))).first()
+        if not user or not auth.pwd_context.verify(request.password, user.hashed_password):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        return {"access_token": auth.create_access_token({"sub": user.username}), "token_type": "bearer"}
+    before.include_router(recipes_router, prefix="/recipes")
+    return before
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=500)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    auth.pwd_context.update(bcrypt__rounds=args.bcrypt_rounds)
+    def login_request():
+        return {"method": "POST", "url": "/users/token", "json": {"username": "bench", "password": "benchpass"}}
+    def read_request():
+        return {"method": "GET", "url": f"/recipes/{random.randint(1, args.recipes)}"}
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        sync_engine = seed_database(url, args.recipes)
+        with Session(sync_engine) as session:
+            user = session.exec(select(User).where(User.username == "bench")).one()
+            user.hashed_password = auth.pwd_context.hash("benchpass")
+            session.commit()
+        _, async_engine = create_engines(url)
+        async def _get_session():
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                yield session
+
+        for name, target in (("before (inline)", blocking_app()), ("after (pool)", app)):
+            target.dependency_overrides[get_session] = _get_session
+            with serve(target) as base_url:
+                results = {}
+                # Reads run alongside the login burst to show how much the loop stalls
+                reads = threading.Thread(target=lambda: results.update(reads=run_load(base_url, read_request, args.reads, args.concurrency)))
+                reads.start()
+                results["logins"] = run_load(base_url, login_request, args.logins, args.concurrency)
+                reads.join()
+            rows.append({
+                "mode": name,
+                "login_req_per_s": results["logins"]["req_per_s"],
+                "login_p95_ms": results["logins"]["p95_ms"],
+                "login_errors": results["logins"]["errors"], # 503s once the password queue is full
+                "read_p50_ms": results["reads"]["p50_ms"],
+                "read_p95_ms": results["reads"]["p95_ms"],
+                "read_errors": results["reads"]["errors"],
+            })
+    print_table(
+        f"{args.logins} logins + {args.reads} GET /recipes/{{id}}, concurrency {args.concurrency}, "
+        f"bcrypt rounds {args.bcrypt_rounds}, {auth.PASSWORD_WORKERS} password workers", rows
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Embedding build time and per-request kNN latency as the recipe count grows.
+
+Synthetic recipes draw ingredients and tags from skewed vocabularies. Each query
+averages 5 random favorites and takes the top 10 excluding them, the work
+GET /recommendations/ does after its favorites query.
+
+    python -m benchmarks.recommendations --recipes 10000 100000 --queries 500
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from app.embeddings import EmbeddingIndex, build_index, recipe_features
+from benchmarks.common import print_table
+
+def synthetic_records(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    ingredients = [f"ingredient {i}" for i in range(3000)]
+    tags = [f"tag{i}" for i in range(150)]
+    categories = ["Dinner", "Lunch", "Breakfast", "Dessert", "Snack"]
+    weights = [1 / (rank + 1) for rank in range(len(ingredients))]
+    for recipe_id in range(1, count + 1):
+        yield recipe_id, recipe_features(
+            set(rng.choices(ingredients, weights=weights, k=rng.randint(4, 14))),
+            rng.sample(tags, rng.randint(1, 5)),
+            rng.choice(categories),
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--favorites", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    for count in args.recipes:
+        with tempfile.TemporaryDirectory() as tmp:
+            records = list(synthetic_records(count))
+            started = time.perf_counter()
+            build_index(Path(tmp), records)
+            build = time.perf_counter() - started
+            index = EmbeddingIndex(Path(tmp))
+            index.refresh()
+            latencies = []
+            for _ in range(args.queries):
+                favorites = random.sample(range(1, count + 1), args.favorites)
+                started = time.perf_counter()
+                index.recommend(favorites, favorites, 10)
+                latencies.append(time.perf_counter() - started)
+            latencies.sort()
+            rows.append({
+                "recipes": count,
+                "build_s": build,
+                "p50_ms": statistics.median(latencies) * 1000,
+                "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            })
+    print_table(f"Top 10 of {args.favorites} favorites, {args.queries} queries", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Mixed read/write throughput for each SQLite profile in app.database.
+
+Readers fetch GET /recipes/{id} while writers upsert ratings through
+PUT /ratings/, all against the real app. Each profile gets its own database
+file because journal_mode=WAL persists in the file once set. Failed requests
+(mostly "database is locked") are counted in the errors column.
+
+    python -m benchmarks.sqlite_profiles --requests 2000 --concurrency 10 50 --write-ratio 0.2
+"""
+import argparse
+import os
+import random
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "benchmark") # Signs the writer's token
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.auth import create_access_token
+from app.database import SQLITE_PROFILES, create_engines, get_session
+from app.main import app
+from benchmarks.common import seed_database, serve, run_load, print_table
+
+def bind_app(url: str, profile: str, pool_size: int):
+    """Point the app's get_session at url using the profile's engine settings."""
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    _, async_engine = create_engines(url, profile)
+    async_engine.echo = False
+    async def _get_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+    app.dependency_overrides[get_session] = _get_session
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--profiles", nargs="+", default=list(SQLITE_PROFILES), choices=list(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": "bench"})
+    def make_request():
+        recipe_id = random.randint(1, args.recipes)
+        if random.random() < args.write_ratio:
+            return {
+                "method": "PUT", "url": "/ratings/",
+                "json": {"recipe_id": recipe_id, "value": random.randint(1, 3)},
+                "headers": {"Authorization": f"Bearer {token}"},
+            }
+        return {"method": "GET", "url": f"/recipes/{recipe_id}"}
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in args.profiles:
+            url = f"sqlite:///{os.path.join(tmp, f'{profile}.db')}"
+            seed_database(url, args.recipes)
+            bind_app(url, profile, max(args.concurrency))
+            with serve(app) as base_url:
+                for concurrency in args.concurrency:
+                    result = run_load(base_url, make_request, args.requests, concurrency)
+                    rows.append({"profile": profile, "concurrency": concurrency, **result})
+    print_table(
+        f"{args.requests} requests, {args.write_ratio:.0%} rating upserts / rest GET /recipes/{{id}}", rows
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Cold worker boot time: schema setup in every worker vs a schema-version check.
+
+"before" runs what the lifespan hook used to run (create_db_and_tables: create_all,
+the upgrade checks, ingredient/tag backfill scan and a full FTS rebuild). "after"
+runs check_schema against a database already bootstrapped by python -m app.migrations.
+Each sample starts --workers fresh interpreters at once, like a multi-worker uvicorn
+boot, and reports how long until the slowest one is ready.
+
+    python -m benchmarks.startup_time --recipes 20000 --workers 4 --samples 3
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from app.migrations import upgrade
+from benchmarks.common import seed_database, print_table
+
+# Runs in each worker process: import the app, then do the startup step
+WORKER = """
+import time
+started = time.perf_counter()
+from app.main import app
+from app.database import create_db_and_tables, engine
+from app.migrations import check_schema
+imported = time.perf_counter()
+{step}(engine)
+print(imported - started, time.perf_counter() - imported)
+"""
+
+def boot_workers(url: str, step: str, workers: int) -> dict:
+    """Start workers at once; returns slowest total, import and startup-step times in ms."""
+    env = {**os.environ, "DATABASE_URL": url, "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark")}
+    started = time.perf_counter()
+    processes = [
+        subprocess.Popen([sys.executable, "-c", WORKER.format(step=step)], env=env, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    outputs = [process.communicate()[0].split() for process in processes]
+    wall = time.perf_counter() - started
+    if any(process.returncode for process in processes):
+        raise RuntimeError(f"{step} worker failed")
+    return {
+        "ready_ms": wall * 1000,
+        "import_ms": max(float(out[0]) for out in outputs) * 1000,
+        "step_ms": max(float(out[1]) for out in outputs) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        upgrade(seed_database(url, args.recipes))
+        for name, step in (("before", "create_db_and_tables"), ("after", "check_schema")):
+            samples = [boot_workers(url, step, args.workers) for _ in range(args.samples)]
+            rows.append({"mode": name, **{key: statistics.median(s[key] for s in samples) for key in samples[0]}})
+    print_table(f"{args.workers} workers booting against {args.recipes} recipes, median of {args.samples}", rows)
+
+if __name__ == "__main__":
+    main()
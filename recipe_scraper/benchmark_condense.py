@@ -0,0 +1,77 @@
+"""Prompt size and LLM parse time with the page text condensed to the recipe block
+(condense.py) against the whole page text, over a saved-page corpus, through the stub
+model server (its latency grows with prompt tokens the way a real model's does).
+
+"kept" is the share of the recipe card's ingredient and step lines (WP Recipe Maker
+markup) that survive condensing; pages without that markup aren't counted.
+
+    python benchmark_condense.py --count 40 --ms-per-1k-tokens 400
+"""
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import lxml.html
+import benchmark_corpus
+import stub_ollama
+from condense import CHARS_PER_TOKEN, condense_html
+from parse_service import ParseService
+from recipe_scraper import RecipeScraper, parse_messages
+
+logging.getLogger().setLevel(logging.ERROR)
+
+def card_lines(html: str):
+    root = lxml.html.document_fromstring(html)
+    return [" ".join(item.text_content().split())
+            for item in root.xpath("//li[contains(@class, 'wprm-recipe-ingredient') or contains(@class, 'wprm-recipe-instruction')]")]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=Path, help="Directory of saved *.html recipe pages")
+    parser.add_argument("--count", type=int, default=40, help="Pages to generate when --pages isn't given")
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=400)
+    args = parser.parse_args()
+
+    directory = args.pages
+    if directory is None:
+        directory = Path(tempfile.mkdtemp())
+        benchmark_corpus.generate(directory, args.count)
+    corpus = benchmark_corpus.load(directory)
+
+    full, condensed, condense_seconds, kept, expected = [], [], 0.0, 0, 0
+    for url, html in corpus:
+        full.append((url, RecipeScraper(url).page_text(html)))
+        started = time.perf_counter()
+        text = condense_html(html)
+        condense_seconds += time.perf_counter() - started
+        condensed.append((url, text))
+        lines = card_lines(html)
+        expected += len(lines)
+        kept += sum(line in text for line in lines)
+
+    server = stub_ollama.serve(0, args.latency_ms, args.ms_per_1k_tokens, parallel=1)
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+    rows = []
+    for name, texts in (("whole page text", full), ("condensed", condensed)):
+        tokens = [sum(len(message["content"]) for message in parse_messages(text)) / CHARS_PER_TOKEN for _, text in texts]
+        with ParseService(workers=1, host=host) as service:
+            started = time.perf_counter()
+            for url, text in texts:
+                service.parse(text, url)
+            elapsed = time.perf_counter() - started
+        rows.append((name, statistics.mean(tokens), max(tokens), elapsed / len(texts)))
+    server.shutdown()
+
+    print(f"\n{len(corpus)} pages; stub: {args.latency_ms:g} ms + {args.ms_per_1k_tokens:g} ms/1k prompt tokens")
+    print(f"condense_html: {condense_seconds / len(corpus) * 1000:.1f} ms per page, "
+          f"kept {kept}/{expected} recipe card lines ({kept / max(expected, 1):.1%})")
+    print(f"{'prompt':>16}  {'avg_tokens':>10}  {'max_tokens':>10}  {'parse_s':>8}")
+    for name, average, largest, seconds in rows:
+        print(f"{name:>16}  {average:>10.0f}  {largest:>10.0f}  {seconds:>8.2f}")
+    print(f"prompt tokens -{1 - rows[1][1] / rows[0][1]:.0%}, parse time -{1 - rows[1][3] / rows[0][3]:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Saved-page corpus for the scraper benchmarks.
+
+Point a benchmark at a directory of real saved recipe pages (*.html, named anything)
+with --pages DIR. Without one, a synthetic corpus is generated: WordPress-style recipe
+blog posts with the bulk of a real page (inline scripts, nav menus, long posts, comment
+threads, footers) around a recipe card whose print link is found by class, by link
+text, in a <button>, as a PDF, or not at all. Like real blogs, most pages carry the
+recipe as schema.org structured data: a JSON-LD Recipe (standalone or inside a Yoast
+@graph), microdata on the card, an incomplete JSON-LD Recipe, or none.
+
+    python benchmark_corpus.py corpus/ --count 200
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import List, Tuple
+
+WORDS = ("garlic butter simmer golden crispy weeknight family favorite easy sauce roasted fresh "
+         "tender creamy oven skillet minutes flavor season bake stir whisk dinner lunch").split()
+
+PRINT_LINKS = (
+    '<a href="/wprm_print/{id}" class="wprm-recipe-print wprm-recipe-link wprm-print-recipe-shortcode">'
+    '<span class="wprm-recipe-icon"><svg width="16" height="16"></svg></span> Print Recipe</a>',
+    '<a class="tasty-recipes-print-button tasty-recipes-button" href="/tasty-recipes/print/{id}">Print</a>',
+    '<div class="recipe-actions"><a class="button" href="/recipes/{id}/print"><span>Print</span> this recipe</a></div>',
+    '<button type="button" class="mv-create-button" href="/mv/print/{id}">Print</button>',
+    '<a class="recipe-card-download" href="/wp-content/uploads/recipe-{id}.pdf">Print or download the PDF</a>',
+    "",
+)
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def _links(rng: random.Random, count: int, prefix: str) -> str:
+    return "".join(f'<li class="menu-item"><a href="/{prefix}/{rng.choice(WORDS)}-{i}">{rng.choice(WORDS).title()}</a></li>'
+                   for i in range(count))
+
+STRUCTURED = ("json-ld", "json-ld-graph", "json-ld-graph", "microdata", "incomplete", None)
+
+def json_ld(title: str, lines, steps, serves: int, minutes: int, graph: bool, complete: bool) -> str:
+    recipe = {
+        "@context": "https://schema.org", "@type": "Recipe", "name": title,
+        "author": {"@type": "Person", "name": "Sam Cook"}, "description": f"Our favorite {title.lower()}.",
+        "image": [f"https://example.com/img/{title.lower().replace(' ', '-')}.jpg"],
+        "recipeYield": [str(serves), f"{serves} servings"], "prepTime": "PT10M", "totalTime": f"PT{minutes}M",
+        "recipeCategory": ["Dinner"], "recipeCuisine": ["American"], "keywords": "easy, weeknight, family",
+        "recipeIngredient": lines,
+        "recipeInstructions": [{"@type": "HowToStep", "text": step} for step in steps],
+    }
+    if not complete:
+        del recipe["recipeIngredient"], recipe["totalTime"], recipe["prepTime"]
+    if graph:
+        recipe = {"@context": "https://schema.org", "@graph": [
+            {"@type": "WebPage", "@id": "https://example.com/#webpage", "name": title},
+            {"@type": "Article", "headline": title, "author": {"name": "Sam Cook"}},
+            recipe,
+        ]}
+    return f'<script type="application/ld+json">{json.dumps(recipe)}</script>'
+
+def recipe_page(id: int, rng: random.Random) -> str:
+    title = " ".join(rng.choice(WORDS) for _ in range(3)).title()
+    structured = rng.choice(STRUCTURED)
+    microdata = structured == "microdata"
+    lines = [(rng.randint(1, 4), rng.choice(["cup", "tbsp", "tsp", "lb"]), rng.choice(WORDS)) for _ in range(rng.randint(5, 14))]
+    step_texts = [_sentence(rng) for _ in range(rng.randint(4, 10))]
+    serves, minutes = rng.randint(1, 8), rng.choice([15, 20, 30, 45, 60, 90])
+    prop = (lambda name: f' itemprop="{name}"') if microdata else (lambda name: "")
+    ingredients = "".join(f'<li class="wprm-recipe-ingredient"{prop("recipeIngredient")}><span class="wprm-recipe-ingredient-amount">{amount}</span> '
+                          f'<span class="wprm-recipe-ingredient-unit">{unit}</span> <span class="wprm-recipe-ingredient-name">{name}</span></li>'
+                          for amount, unit, name in lines)
+    steps = "".join(f'<li class="wprm-recipe-instruction"{prop("recipeInstructions")}><div class="wprm-recipe-instruction-text">{step}</div></li>'
+                    for step in step_texts)
+    card_data = (f'<meta itemprop="recipeYield" content="{serves}"><meta itemprop="totalTime" content="PT{minutes}M">'
+                 f'<span itemprop="author">Sam Cook</span><meta itemprop="recipeCategory" content="Dinner">') if microdata else ""
+    head_data = json_ld(title, [f"{amount} {unit} {name}" for amount, unit, name in lines], step_texts, serves, minutes,
+                        structured == "json-ld-graph", structured != "incomplete") if structured and not microdata else ""
+    post = "".join(f'<p>{" ".join(_sentence(rng) for _ in range(4))}</p><figure><img src="/img/{id}-{i}.jpg" alt="{title}" '
+                   f'srcset="/img/{id}-{i}-300.jpg 300w, /img/{id}-{i}-768.jpg 768w" loading="lazy"></figure>'
+                   for i in range(rng.randint(15, 40)))
+    comments = "".join(f'<li class="comment"><article><footer class="comment-meta"><b class="fn">{rng.choice(WORDS).title()}</b>'
+                       f'<a href="#comment-{i}"><time>May {i % 28 + 1}</time></a></footer><div class="comment-content"><p>{_sentence(rng, 30)}</p></div>'
+                       f'<div class="reply"><a rel="nofollow" class="comment-reply-link" href="#respond">Reply</a></div></article></li>'
+                       for i in range(rng.randint(10, 120)))
+    script = "window.__settings = {" + ",".join(f'"k{i}": "{rng.choice(WORDS)}"' for i in range(rng.randint(200, 1500))) + "};"
+    print_link = rng.choice(PRINT_LINKS).format(id=id)
+    return f"""<!DOCTYPE html>
+<html lang="en-US"><head><meta charset="UTF-8"><title>{title}</title>
+{''.join(f'<link rel="stylesheet" href="/wp-content/plugins/p{i}/style.css">' for i in range(20))}
+{head_data}
+<script>{script}</script></head>
+<body class="post-template-default single single-post">
+<header class="site-header"><nav><ul class="menu">{_links(rng, rng.randint(40, 150), "category")}</ul></nav>
+<form class="search-form"><input type="search"><button type="submit">Search</button></form></header>
+<main><article><h1 class="entry-title">{title}</h1>
+<div class="jump-links"><a href="#recipe" class="wprm-recipe-jump">Jump to Recipe</a><a href="#comments">Comments</a></div>
+<div class="entry-content">{post}
+<div id="recipe" class="wprm-recipe-container"><div class="wprm-recipe"{' itemscope itemtype="http://schema.org/Recipe"' if microdata else ""}>
+<h2 class="wprm-recipe-name"{prop("name")}>{title}</h2>{card_data}
+<div class="wprm-recipe-buttons">{print_link}<a href="https://www.pinterest.com/pin/create/" class="wprm-recipe-pin">Pin Recipe</a></div>
+<ul class="wprm-recipe-ingredients">{ingredients}</ul><ul class="wprm-recipe-instructions">{steps}</ul></div></div>
+</div></article>
+<section id="comments"><ol class="comment-list">{comments}</ol></section></main>
+<footer class="site-footer"><ul>{_links(rng, rng.randint(30, 80), "page")}</ul><p>&copy; 2024 {title}</p></footer>
+<script>{script}</script></body></html>"""
+
+def generate(directory: Path, count: int, seed: int = 0):
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    for id in range(1, count + 1):
+        (directory / f"recipe-{id}.html").write_text(recipe_page(id, rng), encoding="utf-8")
+
+def load(directory: Path) -> List[Tuple[str, str]]:
+    """(base URL, html) for every saved page; each file stands in for https://example.com/<name>/."""
+    return [(f"https://example.com/{path.stem}/", path.read_text(encoding="utf-8", errors="replace"))
+            for path in sorted(directory.glob("*.html"))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--count", type=int, default=200)
+    args = parser.parse_args()
+    generate(args.directory, args.count)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Scrape throughput against a local fixture site: serial scrape_recipe vs the crawl engine.
+
+The fixture serves recipe pages that link to a print view, each response delayed by
+--latency-ms to stand in for a remote site. With --flaky, every Nth recipe page answers
+503 on its first request, which the crawler retries (serial scraping just fails it).
+Pages carry ETags, so the cached runs show a recrawl of an unchanged site: the first
+fills a FetchCache, the second gets 304s and parses nothing.
+
+    python benchmark_crawl.py --pages 100 --latency-ms 50 --page-kb 150 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from crawler import CrawlConfig, Crawler
+from fetch_cache import FetchCache
+from recipe_scraper import scrape_recipe
+import logging
+
+logging.getLogger().setLevel(logging.WARNING)
+
+def filler(kb: int) -> str:
+    block = '<div class="entry"><p>Lorem ipsum <a href="/tag/x">dolor</a> sit amet.</p><img src="x.jpg"></div>'
+    return block * (kb * 1024 // len(block))
+
+def fixture_server(latency_ms: float, flaky_every: int, page_kb: int, port: int = 0) -> ThreadingHTTPServer:
+    body = filler(page_kb)
+    failed_once = set()
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Keep-alive, so connection reuse shows up
+
+        def do_GET(self):
+            time.sleep(latency_ms / 1000)
+            kind, _, number = self.path.strip("/").partition("/")
+            if kind == "recipe" and flaky_every and int(number) % flaky_every == 0 and number not in failed_once:
+                failed_once.add(number)
+                return self._send(503, "busy")
+            etag = f'"{kind}-{number}"'
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, "", etag)
+            if kind == "recipe":
+                return self._send(200, f'<html><body><h1>Recipe {number}</h1>{body}'
+                                       f'<a class="wprm-recipe-print" href="/print/{number}">Print</a></body></html>', etag)
+            if kind == "print":
+                return self._send(200, f"<html><body><h1>Recipe {number}</h1><ul><li>1 cup rice</li></ul>"
+                                       f"<ol><li>Cook the rice.</li></ol></body></html>", etag)
+            self._send(404, "not found")
+
+        def _send(self, status: int, body: str, etag: str = None):
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html")
+            if etag:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_serial(urls):
+    errors = 0
+    for url in urls:
+        try:
+            scrape_recipe(url)
+        except Exception:
+            errors += 1
+    return errors
+
+async def run_crawler(urls, config, cache=None):
+    results = []
+    async with Crawler(config, cache=cache) as crawler:
+        async for result in crawler.crawl(urls):
+            results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=20, help="Per-host rate for the rate-limited run")
+    parser.add_argument("--page-kb", type=int, default=150, help="Recipe page size; real recipe blogs run 100-500 KB")
+    parser.add_argument("--flaky", type=int, default=0, help="Every Nth recipe page fails once with 503")
+    args = parser.parse_args()
+
+    port = 0
+    def site():
+        # A fresh server per run, so every run sees the same flaky pages, on the same port
+        # so the URLs (and the cache keys) stay the same
+        nonlocal port
+        server = fixture_server(args.latency_ms, args.flaky, args.page_kb, port)
+        port = server.server_address[1]
+        return server, [f"http://127.0.0.1:{port}/recipe/{i}" for i in range(1, args.pages + 1)]
+
+    rows = []
+    server, urls = site()
+    started = time.perf_counter()
+    errors = run_serial(urls)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    server.server_close()
+    rows.append(("serial scrape_recipe", args.pages / elapsed, elapsed, errors, "-"))
+
+    unlimited = CrawlConfig(concurrency=args.concurrency, per_host=args.concurrency, rate=0, backoff=0.05)
+    cache = FetchCache(os.path.join(tempfile.mkdtemp(), "cache.db"))
+    runs = (
+        (f"crawler x{args.concurrency}", unlimited, None),
+        (f"crawler, {args.rate:g} req/s/host", CrawlConfig(concurrency=args.concurrency, per_host=4, rate=args.rate, backoff=0.05), None),
+        (f"crawler x{args.concurrency}, cold cache", unlimited, cache),
+        (f"crawler x{args.concurrency}, warm cache", unlimited, cache),
+    )
+    for name, config, run_cache in runs:
+        server, urls = site()
+        started = time.perf_counter()
+        results = asyncio.run(run_crawler(urls, config, run_cache))
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+        server.server_close()
+        failed = sum(1 for result in results if result.error)
+        p50 = statistics.median(result.seconds for result in results) * 1000
+        rows.append((name, len(results) / elapsed, elapsed, failed, f"{p50:.0f}"))
+
+    print(f"\n{args.pages} recipe pages of {args.page_kb} KB (2 requests each), {args.latency_ms:g} ms server latency")
+    print(f"{'mode':>28}  {'pages_per_s':>12}  {'seconds':>8}  {'errors':>6}  {'p50_ms':>6}")
+    for name, rate, elapsed, errors, p50 in rows:
+        print(f"{name:>28}  {rate:>12.1f}  {elapsed:>8.2f}  {errors:>6}  {p50:>6}")
+
+if __name__ == "__main__":
+    main()
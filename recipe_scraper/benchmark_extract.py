@@ -0,0 +1,74 @@
+"""Recipes per minute over a saved-page corpus: every page through ollama_parse (the old
+pipeline) against the structured-data fast path with ollama_parse only as the fallback.
+
+The LLM call is the whole cost of the old pipeline, so it's either made for real (--llm,
+needs a running Ollama with llama3) or charged at --llm-seconds per call (default 8 s,
+llama3 8B on a laptop GPU). Local work (structured data, print-link discovery, text) is
+always measured. Saved pages have no print view, so the page text stands in for it.
+
+    python benchmark_extract.py --pages saved_pages/ --llm
+"""
+import argparse
+import logging
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+import benchmark_corpus
+from recipe_scraper import RecipeScraper, ollama_parse
+
+logging.getLogger().setLevel(logging.ERROR)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=Path, help="Directory of saved *.html recipe pages")
+    parser.add_argument("--count", type=int, default=200, help="Pages to generate when --pages isn't given")
+    parser.add_argument("--llm", action="store_true", help="Call ollama_parse instead of charging --llm-seconds")
+    parser.add_argument("--llm-seconds", type=float, default=8.0)
+    args = parser.parse_args()
+
+    directory = args.pages
+    if directory is None:
+        directory = Path(tempfile.mkdtemp())
+        benchmark_corpus.generate(directory, args.count)
+    corpus = benchmark_corpus.load(directory)
+
+    def llm(text: str, url: str) -> float:
+        if not args.llm:
+            return args.llm_seconds
+        started = time.perf_counter()
+        ollama_parse(text, url)
+        return time.perf_counter() - started
+
+    def text_then_llm(scraper: RecipeScraper, html: str) -> float:
+        started = time.perf_counter()
+        scraper.find_print_url(html, scraper.url)
+        text = scraper.page_text(html)
+        return time.perf_counter() - started + llm(text, scraper.url)
+
+    old_seconds = 0.0
+    for url, html in corpus:
+        old_seconds += text_then_llm(RecipeScraper(url), html)
+
+    new_seconds, structured_seconds, sources = 0.0, 0.0, Counter()
+    for url, html in corpus:
+        scraper = RecipeScraper(url)
+        started = time.perf_counter()
+        structured = scraper.structured_data(html)
+        elapsed = time.perf_counter() - started
+        structured_seconds += elapsed
+        new_seconds += elapsed
+        if structured is None:
+            new_seconds += text_then_llm(scraper, html)
+        sources[structured["source"] if structured else "llm"] += 1
+
+    llm_note = "measured" if args.llm else f"{args.llm_seconds:g} s each, assumed"
+    print(f"\n{len(corpus)} pages; LLM calls {llm_note}")
+    print(f"paths taken: {', '.join(f'{source} {count}' for source, count in sources.most_common())}")
+    print(f"structured-data check: {structured_seconds / len(corpus) * 1000:.2f} ms per page")
+    print(f"{'pipeline':>22}  {'recipes_per_min':>16}  {'llm_calls':>9}")
+    print(f"{'LLM for every page':>22}  {len(corpus) / old_seconds * 60:>16.1f}  {len(corpus):>9}")
+    print(f"{'structured first':>22}  {len(corpus) / new_seconds * 60:>16.1f}  {sources['llm']:>9}")
+
+if __name__ == "__main__":
+    main()
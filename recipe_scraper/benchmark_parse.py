@@ -0,0 +1,70 @@
+"""LLM parse throughput against the stub model server: one blocking chat() per recipe
+(what scraper.py did) against ParseService's worker pool, then a recrawl through its
+result cache. The recipe texts are the page text of a saved-page corpus.
+
+    python benchmark_parse.py --count 40 --workers 4 --parallel 4 --malformed 0.1
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from ollama import Client
+import benchmark_corpus
+import stub_ollama
+from fetch_cache import FetchCache
+from parse_service import ParseService
+from recipe_scraper import MODEL, RecipeScraper, Response, parse_messages
+
+logging.getLogger().setLevel(logging.ERROR)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=Path, help="Directory of saved *.html recipe pages")
+    parser.add_argument("--count", type=int, default=40, help="Pages to generate when --pages isn't given")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--parallel", type=int, default=4, help="Requests the stub serves at once")
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=50)
+    parser.add_argument("--malformed", type=float, default=0.1, help="Share of first replies with broken JSON")
+    args = parser.parse_args()
+
+    directory = args.pages
+    if directory is None:
+        directory = Path(tempfile.mkdtemp())
+        benchmark_corpus.generate(directory, args.count)
+    texts = [(url, RecipeScraper(url).page_text(html)) for url, html in benchmark_corpus.load(directory)]
+    server = stub_ollama.serve(0, args.latency_ms, args.ms_per_1k_tokens, args.parallel, args.malformed)
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+
+    rows = []
+    client = Client(host=host)
+    started = time.perf_counter()
+    invalid = 0
+    for url, text in texts:
+        content = client.chat(model=MODEL, messages=parse_messages(text), format=Response.model_json_schema()).message.content
+        try:
+            Response.model_validate_json(content)
+        except ValueError:
+            invalid += 1
+    rows.append(("serial chat()", time.perf_counter() - started, len(texts), 0, invalid))
+
+    cache = FetchCache(os.path.join(tempfile.mkdtemp(), "cache.db"))
+    for name, run_cache in ((f"ParseService x{args.workers}", None), ("  + cache, cold", cache), ("  + cache, warm", cache)):
+        with ParseService(workers=args.workers, cache=run_cache, host=host) as service:
+            started = time.perf_counter()
+            futures = [service.submit(text, url) for url, text in texts]
+            failed = sum(1 for future in futures if future.exception() is not None)
+            rows.append((name, time.perf_counter() - started, service.stats["calls"], service.stats["retries"], failed))
+    server.shutdown()
+
+    print(f"\n{len(texts)} recipes, avg {sum(len(text) for _, text in texts) // len(texts)} chars of text; stub: "
+          f"{args.latency_ms:g} ms + {args.ms_per_1k_tokens:g} ms/1k tokens, {args.parallel} parallel, "
+          f"{args.malformed:.0%} malformed first replies")
+    print(f"{'mode':>20}  {'recipes_per_s':>13}  {'seconds':>8}  {'llm_calls':>9}  {'retries':>7}  {'invalid':>7}")
+    for name, elapsed, calls, retries, invalid in rows:
+        print(f"{name:>20}  {len(texts) / elapsed:>13.2f}  {elapsed:>8.2f}  {calls:>9}  {retries:>7}  {invalid:>7}")
+
+if __name__ == "__main__":
+    main()
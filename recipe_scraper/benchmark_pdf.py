@@ -0,0 +1,129 @@
+"""PDF print view extraction: the old buffer-everything fetch_pdf against the streamed,
+page-at-a-time one, on a generated cookbook PDF served locally.
+
+Each recipe takes one page plus a photo (an uncompressed image of --image-kb, the bulk
+of a real cookbook's bytes). Peak memory is Python allocations in this process
+(tracemalloc), so it leaves out the worker processes of the parallel run.
+
+    python benchmark_pdf.py --recipes 60 --image-kb 200 --workers 4
+"""
+import argparse
+import functools
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+import pdfplumber
+import requests
+from pdf_pages import PdfTooLarge, download_pdf
+from recipe_scraper import HEADERS, RecipeScraper
+import logging
+
+logging.getLogger().setLevel(logging.WARNING)
+
+INGREDIENTS = ["rice", "onion", "garlic clove", "olive oil", "butter", "chicken stock", "parmesan", "white wine",
+               "thyme sprig", "lemon", "salt", "black pepper", "carrot", "celery stalk", "tomato", "cream"]
+UNITS = ["cup", "tbsp", "tsp", "g", "ml", "piece"]
+
+def recipe_lines(number: int, rng: random.Random):
+    lines = [f"Cookbook Recipe {number}", f"Serves {rng.randint(2, 8)} | Total time {rng.randint(2, 12) * 5} mins", "Ingredients"]
+    lines += [f"{rng.randint(1, 4)} {rng.choice(UNITS)} {rng.choice(INGREDIENTS)}" for _ in range(rng.randint(8, 14))]
+    lines.append("Instructions")
+    lines += [f"{step}. Stir the pot and cook for {rng.randint(2, 20)} minutes until it is done." for step in range(1, rng.randint(6, 10))]
+    lines += ["Nutrition", f"Calories: {rng.randint(200, 900)} kcal"]
+    return lines
+
+def pdf_string(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def cookbook_pdf(recipes: int, image_kb: int, seed: int = 0) -> bytes:
+    """A minimal PDF: one page per recipe, Helvetica text and a gray image of image_kb."""
+    rng = random.Random(seed)
+    side = int((image_kb * 1024) ** 0.5)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for number in range(1, recipes + 1):
+        text = "".join(f"BT /F1 10 Tf 50 {760 - 14 * i} Td ({pdf_string(line)}) Tj ET\n"
+                       for i, line in enumerate(recipe_lines(number, rng)))
+        content = f"q 200 0 0 150 350 600 cm /Im1 Do Q\n{text}".encode()
+        image = rng.randbytes(side * side)
+        image_id = len(objects) + 1
+        objects.append(b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                       b"/BitsPerComponent 8 /Length %d >>\nstream\n" % (side, side, len(image)) + image + b"\nendstream")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R >> /XObject << /Im1 %d 0 R >> >> >>" % (image_id + 1, image_id))
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def buffered_fetch_pdf(url: str) -> str:
+    """fetch_pdf before streaming: the whole body in memory, every page extracted and joined."""
+    response = requests.get(url, headers=HEADERS, timeout=10)
+    with pdfplumber.open(BytesIO(response.content)) as pdf:
+        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=60)
+    parser.add_argument("--image-kb", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    data = cookbook_pdf(args.recipes, args.image_kb)
+    with open(os.path.join(directory, "cookbook.pdf"), "wb") as file:
+        file.write(data)
+    class Handler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+    handler = functools.partial(Handler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.handle_error = lambda *args: None # The capped download hangs up mid-body
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/cookbook.pdf"
+    scraper = RecipeScraper(url)
+
+    rows = []
+    text, elapsed, peak = measure(lambda: buffered_fetch_pdf(url))
+    rows.append(("buffered, all pages", elapsed, peak, 1, len(text)))
+    text, elapsed, peak = measure(lambda: scraper.fetch_pdf(url))
+    rows.append(("streamed, first recipe", elapsed, peak, 1, len(text)))
+    for workers in sorted({1, args.workers}):
+        texts, elapsed, peak = measure(lambda: scraper.fetch_pdf_recipes(url, workers=workers))
+        rows.append((f"all recipes, {workers} proc", elapsed, peak, len(texts), sum(len(text) for text in texts)))
+    try:
+        download_pdf(requests, url, HEADERS, max_bytes=len(data) // 2)
+        capped = "not enforced"
+    except PdfTooLarge:
+        capped = "rejected"
+    server.shutdown()
+
+    print(f"\n{args.recipes}-page cookbook, {len(data) / 2**20:.1f} MiB; a PDF over half that size: {capped}")
+    print(f"{'mode':>24}  {'seconds':>8}  {'peak_MiB':>8}  {'recipes':>7}  {'chars':>7}")
+    for name, elapsed, peak, recipes, chars in rows:
+        print(f"{name:>24}  {elapsed:>8.2f}  {peak / 2**20:>8.1f}  {recipes:>7}  {chars:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Print-link discovery throughput over a saved-page corpus: the original find_print_url
+(full html.parser parse, walk every <a>/<button>) against the current one with each
+parser (html.parser behind a SoupStrainer, or lxml with a compiled XPath). Checks that
+every path finds the same print URL on every page.
+
+    python benchmark_print_url.py --pages saved_pages/   # or a generated corpus of --count pages
+"""
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+import benchmark_corpus
+from recipe_scraper import RecipeScraper
+
+logging.getLogger().setLevel(logging.ERROR)
+
+def original_find_print_url(html: str, base_url: str):
+    """find_print_url before the SoupStrainer/lxml change, kept as the baseline."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for some_button in soup.find_all(['a', 'button'], recursive=True):
+        for some_class in some_button.get('class', []):
+            if 'print' in some_class.lower():
+                href = some_button.get('href')
+                if href:
+                    return urljoin(base_url, href)
+        if 'print' in some_button.get_text(strip=True).lower():
+            href = some_button.get('href')
+            if href:
+                return urljoin(base_url, href)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=Path, help="Directory of saved *.html recipe pages")
+    parser.add_argument("--count", type=int, default=200, help="Pages to generate when --pages isn't given")
+    args = parser.parse_args()
+
+    directory = args.pages
+    if directory is None:
+        directory = Path(tempfile.mkdtemp())
+        benchmark_corpus.generate(directory, args.count)
+    corpus = benchmark_corpus.load(directory)
+    megabytes = sum(len(html) for _, html in corpus) / 2**20
+
+    modes = (
+        ("original, html.parser", original_find_print_url),
+        ("strainer, html.parser", RecipeScraper("", parser="html.parser").find_print_url),
+        ("lxml + XPath", RecipeScraper("", parser="lxml").find_print_url),
+    )
+    baseline = None
+    print(f"\n{len(corpus)} pages, {megabytes:.1f} MB")
+    print(f"{'mode':>24}  {'pages_per_s':>12}  {'ms_per_page':>12}  {'speedup':>8}")
+    for name, find in modes:
+        started = time.perf_counter()
+        found = [find(html, url) for url, html in corpus]
+        elapsed = time.perf_counter() - started
+        if baseline is None:
+            baseline = (found, elapsed)
+        mismatches = sum(a != b for a, b in zip(found, baseline[0]))
+        assert not mismatches, f"{name}: {mismatches} pages with a different print URL"
+        print(f"{name:>24}  {len(corpus) / elapsed:>12.1f}  {elapsed / len(corpus) * 1000:>12.2f}  {baseline[1] / elapsed:>7.1f}x")
+    print(f"print links found on {sum(url is not None for url in baseline[0])} of {len(corpus)} pages")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Cut scraped page text down to the recipe before it goes into the LLM prompt.
+
+A print view or full blog post carries navigation, jump links, share buttons, comment
+threads and footers around the recipe, and every line is prompt tokens. Here:
+
+1. condense_html isolates the recipe block: the recipe card / print container by class
+   (or schema.org itemtype) if there is one, otherwise the lowest element holding both
+   the densest ingredient list and the densest step list
+2. condense_text (also used alone, for PDF text) keeps the window from the ingredients
+   heading through the steps when it finds one, drops button and comment boilerplate,
+   removes repeated lines and caps the result at a token budget
+3. recipe_sections splits PDF page text into recipes as the pages are extracted, so the
+   pages after the recipe that's wanted are never read
+"""
+import re
+from typing import Iterable, Iterator, List, Optional
+import lxml.html
+from lxml import etree
+
+MAX_PROMPT_TOKENS = 1500 # Recipe text budget; a long recipe is ~800
+CHARS_PER_TOKEN = 4 # Rough average for English with llama-style tokenizers
+
+# Recipe plugins' cards and print containers (WP Recipe Maker, Tasty, Mediavine Create,
+# Zip/Easy/WP Ultimate Recipe, hRecipe) and generic recipe/print wrappers
+CONTAINER_PATTERN = re.compile(
+    r"\b(?:wprm-recipe-container|wprm-recipe|tasty-recipes|mv-create-card|zlrecipe-container|easyrecipe|"
+    r"wpurp-container|h-recipe|hrecipe|recipe-card|recipe-container|print-container|recipe-print)\b",
+    re.IGNORECASE,
+)
+ITEMTYPE_PATTERN = re.compile(r"schema\.org/Recipe\b", re.IGNORECASE)
+INGREDIENT_LINE = re.compile(r"^\s*(?:\d|[½⅓⅔¼¾⅕⅛⅜⅝⅞]|a\s+(?:pinch|handful|dash)\b)", re.IGNORECASE)
+STEP_LINE = re.compile(r"^\s*(?:step\s*)?\d{1,2}\s*[.):]\s+\S|^\s*step\s+\d{1,2}\b", re.IGNORECASE)
+INGREDIENTS_HEADING = re.compile(r"^\s*ingredients?\b\s*:?\s*$", re.IGNORECASE)
+STEPS_HEADING = re.compile(r"^\s*(?:instructions|directions|method|steps|preparation|how to make it)\b\s*:?\s*$", re.IGNORECASE)
+# Where a recipe ends on a print view or post: what follows is not for the model
+END_HEADING = re.compile(r"^\s*(?:nutrition(?: information| facts)?|comments?|leave a (?:comment|reply)|"
+                         r"related(?: posts| recipes)?|you (?:may|might) also like|reader interactions)\b", re.IGNORECASE)
+BOILERPLATE_LINE = re.compile(
+    r"^\s*(?:print(?: recipe)?|pin(?: recipe)?|jump to recipe|save(?: recipe)?|share|tweet|email|reply|"
+    r"rate this recipe|leave a review|cook mode|prevent your screen from going dark|"
+    r"did you make this recipe\??|\d+ comments?|skip to (?:content|main content|recipe)|menu|search)\s*$",
+    re.IGNORECASE,
+)
+SKIPPED_TAGS = ("script", "style", "noscript", "svg", "form", "iframe", "nav", "footer")
+# Elements that start a new line; spans, links and the like stay inline ("<span>2</span> cups")
+BLOCK_TAGS = frozenset(("address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption",
+                        "figure", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "ol", "p", "pre",
+                        "section", "table", "td", "th", "tr", "ul"))
+
+def _lines(element) -> List[str]:
+    """Text of an lxml element, one line per block element, whitespace collapsed."""
+    parts = []
+    def walk(node):
+        block = node.tag in BLOCK_TAGS
+        if block:
+            parts.append("\n")
+        if node.text and isinstance(node.tag, str): # Not a comment
+            parts.append(node.text)
+        for child in node:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if block:
+            parts.append("\n")
+    walk(element)
+    return [line for line in (" ".join(line.split()) for line in "".join(parts).splitlines()) if line]
+
+def _list_score(element, pattern) -> int:
+    return sum(1 for item in element.iterfind("li") if pattern.match(item.text_content()))
+
+def _ingredient_items(element) -> int:
+    return sum(1 for item in element.iter("li") if INGREDIENT_LINE.match(item.text_content()))
+
+def _recipe_block(root) -> Optional[etree._Element]:
+    containers = [element for element in root.iter(etree.Element)
+                  if (CONTAINER_PATTERN.search(element.get("class") or "") or ITEMTYPE_PATTERN.search(element.get("itemtype") or ""))
+                  and _ingredient_items(element) >= 2] # Not a "Jump to Recipe" link or a print button
+    if containers:
+        # The outermost card wins over the sections nested inside it
+        return max(containers, key=lambda element: len(element.text_content()))
+    lists = root.xpath("//ul | //ol")
+    if not lists:
+        return None
+    ingredients = max(lists, key=lambda element: _list_score(element, INGREDIENT_LINE))
+    if _list_score(ingredients, INGREDIENT_LINE) < 2:
+        return None
+    # Steps: the <ol> (or numbered <ul>) with the most text after the ingredients
+    steps = max((element for element in lists if element is not ingredients),
+                key=lambda element: (element.tag == "ol") * 1000 + len(element.findall("li")) * 50
+                                    + _list_score(element, STEP_LINE) * 100, default=None)
+    if steps is None:
+        return ingredients.getparent()
+    ancestors = set(ingredients.iterancestors())
+    common = next((element for element in steps.iterancestors() if element in ancestors), None)
+    # A common ancestor as big as the page (body, main) is no isolation at all
+    if common is None or common.tag in ("body", "html"):
+        return None
+    return common
+
+def condense_html(html: str, max_tokens: int = MAX_PROMPT_TOKENS) -> str:
+    """The recipe's text from an HTML page, condensed for the prompt."""
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (ValueError, etree.ParserError):
+        return condense_text(html, max_tokens)
+    for element in list(root.iter(*SKIPPED_TAGS)):
+        element.drop_tree()
+    # Buttons sit side by side inline ("Print RecipePin Recipe"), so drop them here, not by line
+    for element in list(root.iter("a", "button")):
+        if BOILERPLATE_LINE.match(" ".join(element.text_content().split())):
+            element.drop_tree()
+    block = _recipe_block(root)
+    if block is None:
+        return condense_text(_lines(root), max_tokens)
+    lines = _lines(block)
+    heading = root.find(".//h1")
+    title = " ".join(heading.text_content().split()) if heading is not None else ""
+    if title and title not in lines:
+        lines.insert(0, title) # Cards usually repeat it, print views and plain posts may not
+    return condense_text(lines, max_tokens)
+
+def _window(lines: List[str]) -> List[str]:
+    """From a little before the ingredients heading through the steps, if both headings are there."""
+    ingredients = next((i for i, line in enumerate(lines) if INGREDIENTS_HEADING.match(line)), None)
+    if ingredients is None:
+        return lines
+    steps = next((i for i in range(ingredients + 1, len(lines)) if STEPS_HEADING.match(lines[i])), None)
+    if steps is None:
+        return lines
+    end = next((i for i in range(steps + 1, len(lines)) if END_HEADING.match(lines[i])), len(lines))
+    # Keep the title, servings and times that usually sit just above the ingredients
+    return lines[max(ingredients - 12, 0):end]
+
+def recipe_sections(pages: Iterable[str]) -> Iterator[List[str]]:
+    """Lines of each recipe in a run of page texts (a PDF print view or cookbook), yielded as
+    soon as it ends, so a caller wanting only the first never pulls the pages after it.
+
+    A recipe ends at an end heading after its steps, or where the next recipe's ingredients
+    heading starts, taking the next recipe's title with it: from the start of that page if
+    the steps were on an earlier one, otherwise the line above. What follows an end heading
+    on its page (nutrition, notes) is dropped. Text without the headings is one section.
+    """
+    lines: List[str] = []
+    ingredients = ended = False
+    steps_at = None # Index of the current recipe's steps heading in lines
+    for page in pages:
+        page_start = len(lines)
+        for line in page.splitlines():
+            line = " ".join(line.split())
+            if not line:
+                continue
+            if steps_at is not None and END_HEADING.match(line):
+                yield lines
+                lines, ingredients, ended, steps_at, page_start = [], False, True, None, 0
+            elif steps_at is not None and INGREDIENTS_HEADING.match(line):
+                split = page_start if page_start > steps_at else max(len(lines) - 1, steps_at + 1)
+                yield lines[:split]
+                lines, steps_at, page_start = lines[split:], None, 0
+            elif ingredients and steps_at is None and STEPS_HEADING.match(line):
+                steps_at = len(lines)
+            elif ended and not ingredients and INGREDIENTS_HEADING.match(line):
+                lines, page_start = lines[page_start:], 0 # The last recipe's nutrition and notes
+            ingredients = ingredients or bool(INGREDIENTS_HEADING.match(line))
+            lines.append(line)
+    if lines and (ingredients or not ended):
+        yield lines
+
+def condense_text(text, max_tokens: int = MAX_PROMPT_TOKENS) -> str:
+    """text (a string, or lines) without boilerplate or repeated lines, within max_tokens."""
+    lines: Iterable[str] = text.splitlines() if isinstance(text, str) else text
+    lines = [" ".join(line.split()) for line in lines]
+    seen, kept = set(), []
+    for line in _window([line for line in lines if line]):
+        key = line.lower()
+        if key in seen or BOILERPLATE_LINE.match(line):
+            continue
+        seen.add(key)
+        kept.append(line)
+    budget, out = max_tokens * CHARS_PER_TOKEN, []
+    for line in kept:
+        budget -= len(line) + 1
+        if budget < 0:
+            break
+        out.append(line)
+    return "\n".join(out)
@@ -0,0 +1,339 @@
+"""Concurrent crawl engine around RecipeScraper.
+
+One shared httpx connection pool, a bounded queue of URLs read lazily from a file,
+per-host concurrency and request-rate limits, robots.txt rules, and retries with
+exponential backoff.
+Parsing (BeautifulSoup, pdfplumber) runs on worker threads so it doesn't stall the
+other downloads. PDF print views are streamed to temporary files up to a size cap and
+read page by page (pdf_pages.py). With --cache, pages are revalidated against an
+on-disk FetchCache and unchanged content isn't parsed again.
+
+    python crawler.py urls.txt --out crawl.ndjson --concurrency 16 --per-host 4 --rate 2 --cache scrape_cache.db
+
+Pages with a complete schema.org Recipe (JSON-LD or microdata) are extracted directly,
+without fetching their print view. Writes one JSON object per URL: {"url", "source",
+"recipe"} for those, {"url", "print_url", "text"} for the rest (text cut down to the
+recipe block, see condense.py, unless --full-text), or {"url", "error"}. With --parse,
+the text goes through a ParseService (the LLM, or stub_ollama.py with --ollama-host)
+and those pages are written as {"url", "source": "llm", "recipe"} too. With --log, recipes
+are appended to that RecipeLog (recipe_log.py) instead, for `python -m app.ingest`, URLs
+it already has are skipped, and --out only gets the text and error records.
+
+    python crawler.py urls.txt --parse --log recipes.ndjson --out crawl-errors.ndjson
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+import httpx
+from pydantic import ValidationError
+from fetch_cache import FetchCache
+from parse_service import ParseService
+from pdf_pages import CHUNK_BYTES, MAX_PDF_BYTES, PdfSpool
+from recipe_log import RecipeLog
+from recipe_scraper import DEFAULT_PARSER, HEADERS, RecipeScraper
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+@dataclass
+class CrawlConfig:
+    concurrency: int = 16 # Requests in flight overall, also the connection pool size
+    per_host: int = 4 # Requests in flight per host
+    rate: float = 2.0 # Request starts per second per host, 0 for unlimited
+    retries: int = 3
+    backoff: float = 0.5 # Seconds before the first retry, doubled each time
+    max_backoff: float = 30.0
+    timeout: float = 10.0
+    queue_size: int = 100 # URLs read ahead of the workers
+    parser: str = DEFAULT_PARSER # BeautifulSoup tree builder
+    condense: bool = True # Write only the recipe block's text (condense.py), what the LLM is given
+    max_pdf_bytes: int = MAX_PDF_BYTES # Bigger PDF print views are abandoned mid-download
+    robots: bool = True # Skip URLs the site's robots.txt disallows for our User-Agent
+
+@dataclass
+class CrawlResult:
+    url: str
+    text: Optional[str] = None
+    print_url: Optional[str] = None
+    recipe: Optional[dict] = None # From structured data or the service, as RecipeScraper.extract returns it
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+class HostLimiter:
+    """Caps concurrent requests and spaces request starts, separately for each host."""
+    def __init__(self, per_host: int, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._semaphores = defaultdict(lambda: asyncio.Semaphore(per_host))
+        self._next_start = defaultdict(float)
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        async with self._semaphores[host]:
+            if self.interval:
+                # Reserve the next start time before sleeping; the event loop makes this race-free
+                now = asyncio.get_running_loop().time()
+                start = max(now, self._next_start[host])
+                self._next_start[host] = start + self.interval
+                if start > now:
+                    await asyncio.sleep(start - now)
+            yield
+
+def read_urls(path: str) -> Iterator[str]:
+    """URLs from a file, one per line; blank lines and # comments are skipped."""
+    with open(path) as file:
+        for line in file:
+            url = line.strip()
+            if url and not url.startswith("#"):
+                yield url
+
+class RobotsDisallowed(httpx.HTTPError):
+    """robots.txt disallows the URL for our User-Agent."""
+
+class Crawler:
+    def __init__(self, config: Optional[CrawlConfig] = None, client: Optional[httpx.AsyncClient] = None,
+                 cache: Optional[FetchCache] = None, service: Optional[ParseService] = None):
+        config = config or CrawlConfig() # A fresh one each time, not a default shared by every Crawler
+        self.config = config
+        self.cache = cache
+        self.service = service # Parses page text into recipes; without it results carry the text
+        self._robots: Dict[str, asyncio.Task] = {} # Origin -> task fetching its robots.txt, fetched once
+        self.client = client or httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=config.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=config.concurrency, max_keepalive_connections=config.concurrency),
+        )
+        self.limiter = HostLimiter(config.per_host, config.rate)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.config.max_backoff)
+        delay = self.config.backoff * 2 ** attempt
+        return min(delay * random.uniform(1, 1.5), self.config.max_backoff) # Jitter spreads out retries
+
+    async def _read_robots(self, origin: str) -> RobotFileParser:
+        """The origin's robots.txt rules: 401/403 disallow everything, a missing or unreachable file nothing."""
+        robots = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            async with self.limiter.slot(urlparse(origin).netloc):
+                response = await self.client.get(robots.url)
+        except httpx.TransportError as e:
+            logger.info(f"No robots.txt for {origin} ({e!r}), crawling it unrestricted")
+            response = None
+        if response is not None and response.status_code in (401, 403):
+            robots.disallow_all = True
+        elif response is not None and response.status_code == 200:
+            robots.parse(response.text.splitlines())
+        else:
+            robots.allow_all = True
+        return robots
+
+    async def allowed(self, url: str) -> bool:
+        """Whether robots.txt lets HEADERS' User-Agent fetch url (always, with config.robots off)."""
+        if not self.config.robots:
+            return True
+        parts = urlparse(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self._robots:
+            # A task, so workers reaching a new host at once share one robots.txt request
+            self._robots[origin] = asyncio.ensure_future(self._read_robots(origin))
+        robots = await self._robots[origin]
+        return robots.can_fetch(HEADERS["User-Agent"], url)
+
+    async def fetch(self, url: str, pdf: bool = False):
+        """GET url within its host's limits, retrying transport errors, 429 and 5xx.
+
+        With a cache the request is conditional, and a 304 comes back as the cached body.
+        With pdf, the body is streamed into a PdfSpool instead (not cached, see pdf_pages.py).
+        Raises RobotsDisallowed without a request if robots.txt rules url out.
+        """
+        if not await self.allowed(url):
+            raise RobotsDisallowed(f"{url}: disallowed by robots.txt")
+        host = urlparse(url).netloc
+        headers = self.cache.validators(url) if self.cache and not pdf else None
+        for attempt in range(self.config.retries + 1):
+            response = None
+            try:
+                async with self.limiter.slot(host):
+                    if pdf:
+                        async with self.client.stream("GET", url) as response:
+                            if response.status_code not in RETRY_STATUSES:
+                                response.raise_for_status()
+                                return await self._spool(url, response)
+                    else:
+                        response = await self.client.get(url, headers=headers)
+                if response.status_code not in RETRY_STATUSES:
+                    if response.status_code != 304:
+                        response.raise_for_status()
+                    return await asyncio.to_thread(self.cache.resolve, url, response) if self.cache else response
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                error = repr(e)
+            if attempt == self.config.retries:
+                raise httpx.HTTPError(f"{url}: giving up after {attempt + 1} attempts ({error})")
+            delay = self._retry_delay(attempt, response)
+            logger.info(f"Retrying {url} in {delay:.1f}s ({error})")
+            await asyncio.sleep(delay)
+
+    async def _spool(self, url: str, response: httpx.Response) -> PdfSpool:
+        spool = PdfSpool(url, self.config.max_pdf_bytes, response.headers.get("content-length"))
+        try:
+            async for chunk in response.aiter_bytes(CHUNK_BYTES):
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+        return spool.finish()
+
+    async def parse(self, text: str, url: str) -> dict:
+        """The service's parse of text, awaited without blocking the event loop."""
+        # submit() blocks while the service has max_pending parses, so it runs on a thread
+        future = await asyncio.to_thread(self.service.submit, text, url)
+        return {"source": "llm", **await asyncio.wrap_future(future)}
+
+    async def scrape(self, url: str) -> CrawlResult:
+        """Same steps as RecipeScraper.extract with a service (RecipeScraper.scrape without one):
+        the page, its structured data, else its print view (HTML or PDF) and the parse of its text."""
+        started = time.perf_counter()
+        scraper = RecipeScraper(url, cache=self.cache, parser=self.config.parser)
+        try:
+            page = await self.fetch(url)
+            structured = await asyncio.to_thread(
+                scraper.remembered, "structured", url + "\n" + page.text, lambda: scraper.structured_data(page.text)
+            )
+            if structured is not None:
+                return CrawlResult(url, recipe=structured, seconds=time.perf_counter() - started)
+            print_url = await asyncio.to_thread(
+                scraper.remembered, "print_url", url + "\n" + page.text, lambda: scraper.find_print_url(page.text, url)
+            )
+            condensed = self.config.condense
+            if print_url is None:
+                text = await asyncio.to_thread(scraper.html_text, page.text, condensed)
+            else:
+                if print_url.lower().endswith(".pdf"):
+                    with await self.fetch(print_url, pdf=True) as spool:
+                        text = await asyncio.to_thread(scraper.document_text, spool, condensed)
+                else:
+                    printed = await self.fetch(print_url)
+                    text = await asyncio.to_thread(scraper.html_text, printed.text, condensed)
+            if self.service is not None:
+                recipe = await self.parse(text, url)
+                return CrawlResult(url, print_url=print_url, recipe=recipe, seconds=time.perf_counter() - started)
+        except Exception as e:
+            logger.warning(f"Failed to scrape {url}: {e}")
+            return CrawlResult(url, error=str(e), seconds=time.perf_counter() - started)
+        return CrawlResult(url, text=text, print_url=print_url, seconds=time.perf_counter() - started)
+
+    async def crawl(self, urls: Iterable[str]) -> AsyncIterator[CrawlResult]:
+        """Scrape urls with config.concurrency workers, yielding results as they finish.
+
+        urls is consumed lazily through a bounded queue, so a huge URL file is never held in memory.
+        Results are bounded too: a slow consumer holds the workers back instead of piling up pages.
+        """
+        queue: asyncio.Queue = asyncio.Queue(self.config.queue_size)
+        results: asyncio.Queue = asyncio.Queue(self.config.concurrency)
+        done = object()
+
+        async def produce():
+            for url in urls:
+                await queue.put(url)
+            for _ in range(self.config.concurrency):
+                await queue.put(done)
+
+        async def work():
+            while (url := await queue.get()) is not done:
+                await results.put(await self.scrape(url))
+            await results.put(done)
+
+        tasks = [asyncio.create_task(produce())] + [asyncio.create_task(work()) for _ in range(self.config.concurrency)]
+        try:
+            finished = 0
+            while finished < self.config.concurrency:
+                result = await results.get()
+                if result is done:
+                    finished += 1
+                else:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+async def crawl_to_file(urls: Iterable[str], out_path: str, config: CrawlConfig, cache: Optional[FetchCache] = None,
+                        service: Optional[ParseService] = None, log: Optional[RecipeLog] = None) -> int:
+    """Crawl urls into out_path, or recipes into log when there is one. Returns the URLs crawled."""
+    written = 0
+    if log is not None:
+        urls = (url for url in urls if url not in log)
+    async with Crawler(config, cache=cache, service=service) as crawler:
+        with open(out_path, "a", encoding="utf-8") as out:
+            async for result in crawler.crawl(urls):
+                written += 1
+                if result.recipe and log is not None:
+                    try:
+                        log.append(result.url, result.recipe)
+                        continue
+                    except ValidationError as e:
+                        result.error = f"invalid recipe: {e.error_count()} errors"
+                if result.error:
+                    record = {"url": result.url, "error": result.error}
+                elif result.recipe:
+                    record = {"url": result.url, "source": result.recipe["source"], "recipe": result.recipe["recipe"]}
+                else:
+                    record = {"url": result.url, "print_url": result.print_url, "text": result.text}
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("urls", help="File with one URL per line")
+    parser.add_argument("--out", default="crawl.ndjson")
+    defaults = CrawlConfig()
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--per-host", type=int, default=defaults.per_host)
+    parser.add_argument("--rate", type=float, default=defaults.rate, help="Requests per second per host, 0 for unlimited")
+    parser.add_argument("--retries", type=int, default=defaults.retries)
+    parser.add_argument("--parser", default=defaults.parser, choices=["lxml", "html.parser"])
+    parser.add_argument("--full-text", action="store_true", help="Write whole page text instead of the recipe block")
+    parser.add_argument("--max-pdf-bytes", type=int, default=defaults.max_pdf_bytes)
+    parser.add_argument("--cache", help="SQLite file to revalidate pages against and skip re-parsing with")
+    parser.add_argument("--ignore-robots", action="store_true", help="Fetch URLs robots.txt disallows")
+    parser.add_argument("--parse", action="store_true", help="Parse page text with the LLM instead of writing it")
+    parser.add_argument("--ollama-host", help="Ollama server for --parse, e.g. stub_ollama.py's http://127.0.0.1:11435")
+    parser.add_argument("--log", help="RecipeLog to append recipes to, skipping the URLs already in it")
+    args = parser.parse_args()
+
+    config = CrawlConfig(concurrency=args.concurrency, per_host=args.per_host, rate=args.rate, retries=args.retries,
+                         parser=args.parser, condense=not args.full_text, max_pdf_bytes=args.max_pdf_bytes, robots=not args.ignore_robots)
+    cache = FetchCache(args.cache) if args.cache else None
+    service = ParseService(cache=cache, host=args.ollama_host) if args.parse else None
+    log = RecipeLog(args.log) if args.log else None
+    started = time.perf_counter()
+    try:
+        written = asyncio.run(crawl_to_file(read_urls(args.urls), args.out, config, cache, service, log))
+    finally:
+        if service is not None:
+            service.close()
+        if log is not None:
+            log.close()
+    print(f"Scraped {written} URLs into {args.out} in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Persistent fetch cache for the scraper, in one SQLite file.
+
+Two layers:
+- responses: the last body fetched for each URL with its ETag/Last-Modified, so a
+  recrawl sends conditional requests and a 304 reuses the stored body
+- derived: results computed from content (print URL of a page, text of a print view,
+  LLM output for a text), keyed by a SHA-256 of that content, so unchanged content
+  is never parsed twice even when the server doesn't send validators
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Union
+
+@dataclass
+class CachedResponse:
+    """The parts of a requests/httpx response the scraper reads."""
+    url: str
+    content: bytes
+    encoding: str
+    status_code: int = 200
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+def content_hash(data: Union[bytes, str]) -> str:
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+class FetchCache:
+    def __init__(self, path: str = "scrape_cache.db"):
+        # Shared by the crawler's event loop and its parsing threads
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # One commit per stored page; WAL without a full fsync each time keeps that cheap
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,
+                content BLOB NOT NULL, encoding TEXT NOT NULL, fetched_at REAL NOT NULL)""")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS derived (
+                kind TEXT NOT NULL, hash TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL,
+                PRIMARY KEY (kind, hash))""")
+
+    def close(self):
+        self._conn.close()
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Conditional request headers for url, empty if it was never fetched with validators."""
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified FROM responses WHERE url = ?", (url,)).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def resolve(self, url: str, response) -> CachedResponse:
+        """The body for a response to a request sent with validators(url): the stored one on a 304,
+        otherwise the new one, stored if the server sent an ETag or Last-Modified."""
+        if response.status_code == 304:
+            with self._lock:
+                row = self._conn.execute("SELECT content, encoding FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                raise LookupError(f"{url}: 304 Not Modified but nothing cached")
+            return CachedResponse(url, row[0], row[1])
+        cached = CachedResponse(url, response.content, response.encoding or "utf-8", response.status_code)
+        etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+        if etag or last_modified:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, etag, last_modified, cached.content, cached.encoding, time.time()),
+                )
+        return cached
+
+    def lookup(self, kind: str, data: Union[bytes, str]) -> tuple:
+        """(True, value) if a kind result was recorded for this exact content, else (False, None)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM derived WHERE kind = ? AND hash = ?", (kind, content_hash(data))
+            ).fetchone()
+        return (True, json.loads(row[0])) if row else (False, None)
+
+    def record(self, kind: str, data: Union[bytes, str], value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO derived VALUES (?, ?, ?, ?)",
+                (kind, content_hash(data), json.dumps(value, ensure_ascii=False), time.time()),
+            )
+
+    def memoize(self, kind: str, data: Union[bytes, str], compute: Callable[[], Optional[str]]) -> Optional[str]:
+        """compute(), or what it returned in an earlier run for the same content."""
+        found, value = self.lookup(kind, data)
+        if not found:
+            value = compute()
+            self.record(kind, data, value)
+        return value
@@ -0,0 +1,125 @@
+"""LLM parse service: ollama_parse behind a bounded worker pool, a persistent result
+cache and validation against the Response model.
+
+- workers: chat calls in flight at once (match the server's OLLAMA_NUM_PARALLEL)
+- max_pending: parses queued or running; submit() blocks past that, so a fast
+  scraper can't queue up a whole crawl's worth of page text
+- results are cached in a FetchCache keyed by a hash of the normalized text and the
+  model name, so a recrawl only pays for text the model hasn't seen; identical text
+  already in flight shares one call
+- a reply that isn't a valid Response is sent back with the validation error for a
+  corrected one, up to `retries` times
+
+    with ParseService(cache=FetchCache("scrape_cache.db")) as service:
+        futures = [service.submit(text, url) for url, text in pages]
+        recipes = [future.result() for future in futures]
+
+Point it at stub_ollama.py (host="http://127.0.0.1:11435") to run without a model.
+"""
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+from ollama import Client
+from pydantic import ValidationError
+from fetch_cache import FetchCache
+from recipe_scraper import MODEL, Response, parse_messages
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """Whitespace collapsed within lines and blank lines dropped: what the cache is keyed on
+    and what the model is sent, so reformatted but otherwise identical text is a cache hit."""
+    return "\n".join(" ".join(line.split()) for line in text.splitlines() if line.strip())
+
+class ParseError(Exception):
+    """The model didn't produce a valid Response within the allowed retries."""
+
+class ParseService:
+    def __init__(self, model: str = MODEL, workers: int = 2, max_pending: int = 32, retries: int = 2,
+                 cache: Optional[FetchCache] = None, host: Optional[str] = None, client: Optional[Client] = None):
+        self.model = model
+        self.retries = retries
+        self.cache = cache
+        self.client = client or Client(host=host)
+        self.stats = Counter() # calls, cache_hits, shared, retries, failures
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="parse")
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    @property
+    def cache_kind(self) -> str:
+        return f"llm:{self.model}"
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def submit(self, text: str, url: str) -> Future:
+        """A Future for the parsed Response as a dict. Blocks while max_pending parses are outstanding."""
+        text = normalize_text(text)
+        if self.cache is not None:
+            found, value = self.cache.lookup(self.cache_kind, text)
+            if found:
+                self._count("cache_hits")
+                future = Future()
+                future.set_result(value)
+                return future
+        self._pending.acquire()
+        with self._lock:
+            if text in self._in_flight:
+                self.stats["shared"] += 1
+                self._pending.release()
+                return self._in_flight[text]
+            future = self._pool.submit(self._parse, text, url)
+            self._in_flight[text] = future
+        # Outside the lock: runs right here if the parse already finished
+        future.add_done_callback(lambda _: self._done(text))
+        return future
+
+    def _done(self, text: str):
+        with self._lock:
+            self._in_flight.pop(text, None)
+        self._pending.release()
+
+    def parse(self, text: str, url: str) -> Dict:
+        """Blocking parse, for RecipeScraper.extract(parse=service.parse) from scraper threads."""
+        return self.submit(text, url).result()
+
+    def _parse(self, text: str, url: str) -> Dict:
+        messages = parse_messages(text)
+        for attempt in range(self.retries + 1):
+            self._count("calls")
+            response = self.client.chat(model=self.model, messages=messages, format=Response.model_json_schema())
+            content = response.message.content
+            try:
+                result = Response.model_validate_json(content).model_dump()
+                break
+            except ValidationError as e:
+                error = e
+                logger.info(f"invalid reply for {url} (attempt {attempt + 1}): {e.error_count()} errors")
+                # Show the model its reply and what was wrong with it
+                messages = messages + [
+                    {"role": "assistant", "content": content},
+                    {"role": "user", "content": f"That reply is not valid against the schema:\n{e}\n"
+                                                f"Reply with only the corrected JSON object."},
+                ]
+                if attempt < self.retries:
+                    self._count("retries")
+        else:
+            self._count("failures")
+            raise ParseError(f"{url}: no valid Response after {self.retries + 1} attempts: {error}")
+        if self.cache is not None:
+            self.cache.record(self.cache_kind, text, result)
+        return result
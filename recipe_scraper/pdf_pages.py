@@ -0,0 +1,114 @@
+"""PDF print views in bounded memory.
+
+A print link can point at a one-page recipe card or at a whole cookbook. Rather than
+buffering the response and extracting every page before looking at any of them:
+
+1. PdfSpool streams the body into a temporary file, hashing it on the way (the hash
+   keys the extracted text in the FetchCache) and refusing anything over MAX_PDF_BYTES,
+   by Content-Length up front when the server sends one
+2. iter_pages extracts text one page at a time and frees each page's parsed layout
+   before the next, so condense.recipe_sections can stop pulling pages once the first
+   recipe's steps are over
+3. parallel_pages extracts all pages across processes, for cookbook PDFs whose every
+   recipe is wanted
+
+    with download_pdf(requests, url, HEADERS) as spool:
+        text = "\\n".join(next(recipe_sections(iter_pages(spool.path)), []))
+"""
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Optional
+import pdfplumber
+from pdfminer.pdfpage import PDFPage
+from pdfplumber.page import Page
+
+MAX_PDF_BYTES = 20 * 1024 * 1024 # Recipe cards are well under 1 MiB, whole cookbooks a few MiB
+CHUNK_BYTES = 64 * 1024
+PAGES_PER_TASK = 8 # Smallest page range worth a process round trip
+
+class PdfTooLarge(ValueError):
+    """The PDF is bigger than the spool's max_bytes."""
+
+class PdfSpool:
+    """A PDF body written to a temporary file as it arrives. close() (or the with block) deletes it."""
+
+    def __init__(self, url: str, max_bytes: int = MAX_PDF_BYTES, content_length: Optional[str] = None):
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise PdfTooLarge(f"{url}: {content_length} bytes, the limit is {max_bytes}")
+        self.url = url
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.digest: Optional[str] = None # sha256 hex of the body, once finished
+        self._hash = hashlib.sha256()
+        self._file = tempfile.NamedTemporaryFile(prefix="recipe-", suffix=".pdf", delete=False)
+        self.path = self._file.name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise PdfTooLarge(f"{self.url}: more than {self.max_bytes} bytes")
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def finish(self) -> "PdfSpool":
+        self._file.close()
+        self.digest = self._hash.hexdigest()
+        return self
+
+    def close(self):
+        self._file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+def download_pdf(session, url: str, headers: dict, max_bytes: int = MAX_PDF_BYTES, timeout: float = 10) -> PdfSpool:
+    """Stream url (with a requests Session or the requests module) into a finished PdfSpool."""
+    with session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        spool = PdfSpool(url, max_bytes, response.headers.get("Content-Length"))
+        try:
+            for chunk in response.iter_content(CHUNK_BYTES):
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+    return spool.finish()
+
+def iter_pages(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Text of pages start..stop (0-based, stop exclusive), parsed one at a time as they're consumed."""
+    with pdfplumber.open(path) as pdf:
+        # Walk the page tree directly: pdf.pages would build every Page up front
+        for number, page_object in islice(enumerate(PDFPage.create_pages(pdf.doc), 1), start, stop):
+            page = Page(pdf, page_object, page_number=number)
+            try:
+                yield page.extract_text() or ""
+            finally:
+                page.close() # Drops the page's parsed layout objects
+
+def page_count(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return sum(1 for _ in PDFPage.create_pages(pdf.doc))
+
+def _page_range(path: str, start: int, stop: int) -> List[str]:
+    return list(iter_pages(path, start, stop))
+
+def parallel_pages(path: str, workers: int) -> List[str]:
+    """Text of every page, in order, with contiguous page ranges extracted in up to `workers` processes."""
+    count = page_count(path)
+    step = max(-(-count // workers), PAGES_PER_TASK)
+    ranges = [(start, min(start + step, count)) for start in range(0, count, step)]
+    if len(ranges) <= 1:
+        return list(iter_pages(path))
+    with ProcessPoolExecutor(min(workers, len(ranges))) as pool:
+        chunks = pool.map(_page_range, [path] * len(ranges), *zip(*ranges))
+        return [text for chunk in chunks for text in chunk]
@@ -0,0 +1,73 @@
+"""Append-only NDJSON log of scraped recipes, one {"url", "source", "recipe"} line each.
+
+Each record is validated against Recipe, written as one line and flushed, so saving a
+recipe costs one line however long the crawl has run. A crash loses at most the line
+being written, and that partial line is cut off the next time the log is opened. The
+URLs already logged are read on open, so a restarted crawl can skip them; a complete
+line that isn't a record (a hand edit, say) is logged and skipped, not fatal. The app loads
+the log with `python -m app.ingest recipe_scraper/recipes.ndjson`.
+
+    with RecipeLog("recipes.ndjson") as log:
+        for url in (url for url in urls if url not in log):
+            log.append(url, extract_recipe(url))
+"""
+import json
+import logging
+import os
+from typing import Dict, Set
+from recipe_scraper import Recipe
+
+logger = logging.getLogger(__name__)
+
+class RecipeLog:
+    def __init__(self, path: str = "recipes.ndjson"):
+        self.path = path
+        self.urls: Set[str] = set()
+        self._recover()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.urls
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def _recover(self):
+        """Read the logged URLs and truncate a last line left without its newline."""
+        if not os.path.exists(self.path):
+            return
+        end = 0
+        with open(self.path, "rb") as file:
+            for number, line in enumerate(file, 1):
+                if not line.endswith(b"\n"):
+                    break
+                end += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    self.urls.add(json.loads(line)["url"])
+                except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError) as e:
+                    logger.warning(f"{self.path} line {number}: skipping unreadable record ({e!r})")
+        if end < os.path.getsize(self.path):
+            os.truncate(self.path, end)
+
+    def append(self, url: str, data: Dict) -> bool:
+        """Log extract_recipe's result for url; False if url is already logged. Raises ValidationError for a bad recipe."""
+        if url in self.urls:
+            return False
+        recipe = Recipe.model_validate(data["recipe"]).model_dump()
+        self._file.write(json.dumps({"url": url, "source": data["source"], "recipe": recipe}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.urls.add(url)
+        return True
+
+    def close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
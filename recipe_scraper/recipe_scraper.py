@@ -1,79 +1,194 @@
+import re
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import lxml.html
+from lxml import etree
 from urllib.parse import urljoin, urlparse
 import json
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 import logging
-import pdfplumber
 from ollama import chat, ChatResponse
 from pydantic import BaseModel
 from typing import List
-from io import BytesIO
+import extruct
+from fetch_cache import FetchCache
+from condense import condense_html, condense_text, recipe_sections
+from pdf_pages import PdfSpool, download_pdf, iter_pages, parallel_pages
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# lxml (C, already installed as an extruct dependency) parses several times faster
+# than the pure-Python "html.parser", which can be passed for the old behaviour
+DEFAULT_PARSER = "lxml"
+PRINT_PATTERN = re.compile("print", re.IGNORECASE)
+# Print link candidates: with lxml, matched by a compiled XPath over the lxml tree
+# (no BeautifulSoup objects at all); with other parsers, the only tags BeautifulSoup keeps
+LINK_XPATH = etree.XPath("//a[@href] | //button[@href]")
+LINK_TAGS = SoupStrainer(["a", "button"])
+# Structured data tried before the LLM, best first, each only if its marker is on the page
+STRUCTURED_SYNTAXES = (("json-ld", "application/ld+json"), ("microdata", "itemtype"))
+
 class RecipeScraper:
-    def __init__(self, url: str):
+    def __init__(self, url: str, session: Optional[requests.Session] = None, cache: Optional[FetchCache] = None,
+                 parser: str = DEFAULT_PARSER):
         self.url = url
-        self.headers = {"User-Agent": "Mozilla/5.0"}
+        self.parser = parser # BeautifulSoup tree builder, "lxml" or "html.parser"
+        self.headers = HEADERS
+        self.session = session or requests # Pass a Session to reuse connections across scrapers
+        self.cache = cache # Revalidates instead of re-downloading, and skips re-parsing unchanged content
         self.recipe_data = {}  # Changed to dict to match return type
 
-    def fetch_page(self, url: str) -> Optional[str]:
-        response = requests.get(url, headers=self.headers, timeout=10)
+    def get(self, url: str):
+        headers = self.headers if self.cache is None else {**self.headers, **self.cache.validators(url)}
+        response = self.session.get(url, headers=headers, timeout=10)
         response.raise_for_status()
+        return response if self.cache is None else self.cache.resolve(url, response)
+
+    def remembered(self, kind: str, content, compute):
+        """compute(), reused from an earlier run on the same content when there's a cache."""
+        if self.cache is None:
+            return compute()
+        return self.cache.memoize(kind, content, compute)
+
+    def fetch_page(self, url: str) -> Optional[str]:
+        response = self.get(url)
         logger.info(f"logged page {url}")
         return response.text
         
-    def fetch_pdf(self, url: str):
-        response = requests.get(url, headers=self.headers, timeout=10)
+    def fetch_pdf(self, url: str, condensed: bool = False) -> str:
+        """Text of the first recipe in a PDF print view, streamed to a temporary file
+        (see pdf_pages.py) and read only as far as that recipe goes."""
         logger.info(f"now scraping: {url}")
-        with pdfplumber.open(BytesIO(response.content)) as pdf:
-            text = "\n".join(page.extract_text() or "" for page in pdf.pages)
-        return text
+        with download_pdf(self.session, url, self.headers) as spool:
+            return self.document_text(spool, condensed)
+
+    def fetch_pdf_recipes(self, url: str, condensed: bool = False, workers: int = 1) -> List[str]:
+        """Text of every recipe in a PDF (a cookbook), pages extracted in `workers` processes."""
+        with download_pdf(self.session, url, self.headers) as spool:
+            def compute():
+                pages = parallel_pages(spool.path, workers) if workers > 1 else iter_pages(spool.path)
+                return ["\n".join(lines) for lines in recipe_sections(pages)]
+            texts = self.remembered("pdf_recipes", spool.digest, compute)
+        return [condense_text(text) for text in texts] if condensed else texts
+
+    def html_text(self, html: str, condensed: bool = False) -> str:
+        """Text of a page; condensed to the recipe block for an LLM prompt (see condense.py)."""
+        if condensed:
+            return self.remembered("condensed", html, lambda: condense_html(html))
+        return self.remembered("text", html, lambda: self.page_text(html))
+
+    def document_text(self, spool: PdfSpool, condensed: bool = False) -> str:
+        """Text of a downloaded PDF's first recipe, optionally condensed like html_text."""
+        text = self.remembered("pdf_text", spool.digest, lambda: self.pdf_text(spool.path))
+        return condense_text(text) if condensed else text
+
+    @staticmethod
+    def pdf_text(path: str) -> str:
+        # Stops extracting pages once the first recipe has ended
+        return "\n".join(next(recipe_sections(iter_pages(path)), []))
+
+    def page_text(self, html: str) -> str:
+        soup = BeautifulSoup(html, self.parser)
+        return soup.get_text(separator="\n", strip=True)
+
+    def links(self, html: str):
+        """(href, class attribute, stripped text) of each <a>/<button>, in document order."""
+        if self.parser == "lxml":
+            try:
+                root = lxml.html.document_fromstring(html)
+            except (ValueError, etree.ParserError):
+                pass # Empty, or a str with an XML encoding declaration; BeautifulSoup copes
+            else:
+                for element in LINK_XPATH(root):
+                    yield element.get("href"), element.get("class") or "", "".join(s.strip() for s in element.itertext())
+                return
+        soup = BeautifulSoup(html, self.parser, parse_only=LINK_TAGS)
+        for some_button in soup.find_all(['a', 'button']):
+            yield some_button.get('href'), " ".join(some_button.get('class', ())), some_button.get_text(strip=True)
 
     def find_print_url(self, html: str, base_url: str):
-        """Find the print button on a recipe page."""
-        soup = BeautifulSoup(html, 'html.parser')
-
-        all_buttons = soup.find_all(['a', 'button'], recursive=True)
-        for some_button in all_buttons:
-            button_classes = some_button.get('class', [])
-            for some_class in button_classes:
-                if 'print' in some_class.lower() \
-                    or 'print recipe' in some_class.lower() \
-                    or 'wprm-recipe-print' in some_class.lower() \
-                    or 'recipe-print' in some_class.lower():
-                    href = some_button.get('href')
-                    if href:
-                        print_url = urljoin(base_url, href)
-                        logger.info(f"Found printurl at {print_url}")
-                        return print_url
-            text = some_button.get_text(strip=True).lower()
-            if 'print' in text:
-                href = some_button.get('href')
-                if href:
-                    print_url = urljoin(base_url, href)
-                    logger.info(f"printURL found at {print_url}")
-                    return print_url
+        """Find the print button on a recipe page: the first <a>/<button> with an href
+        and "print" in a class name or in its text."""
+        if not PRINT_PATTERN.search(html):
+            # No "print" anywhere, so nothing to parse for
+            logger.warning(f"no print url found on {base_url}")
+            return None
+        for href, classes, text in self.links(html):
+            if href and (PRINT_PATTERN.search(classes) or PRINT_PATTERN.search(text)):
+                print_url = urljoin(base_url, href)
+                logger.info(f"Found printurl at {print_url}")
+                return print_url
         logger.warning(f"no print url found on {base_url}")
 
-    def scrape(self) -> Dict:
+    def structured_data(self, html: str) -> Optional[Dict]:
+        """The page's schema.org Recipe (JSON-LD, else microdata) as ollama_parse output plus
+        "source", or None if there isn't one with everything recipe_from_schema requires."""
+        for syntax, marker in STRUCTURED_SYNTAXES:
+            if marker not in html:
+                continue
+            try:
+                data = extruct.extract(html, base_url=self.url, syntaxes=[syntax], uniform=True)
+            except Exception as e:
+                logger.warning(f"unreadable {syntax} on {self.url}: {e}")
+                continue
+            for item in schema_recipes(data.get(syntax, [])):
+                recipe = recipe_from_schema(item, self.url)
+                if recipe is not None:
+                    return {
+                        "source": syntax,
+                        "agent_response": f"Read from the page's schema.org Recipe ({syntax}).",
+                        "recipe": recipe.model_dump(),
+                    }
+        return None
+
+    def extract(self, parse: Optional[Callable[[str, str], Dict]] = None) -> Dict:
+        """The recipe, from the page's structured data when it's complete, otherwise from
+        the LLM over the scraped text. "source" records which: "json-ld", "microdata" or "llm".
+
+        parse(text, url) returns the parsed Response as a dict; ParseService.parse caches and
+        validates, and bounds concurrent LLM calls across scrapers. Without it, ollama_parse.
+        """
         main_html = self.fetch_page(self.url)
-        print_url = self.find_print_url(main_html, self.url)
-        if print_url.lower().endswith('.pdf'):
-            raw_text = self.fetch_pdf(print_url)
+        structured = self.remembered("structured", self.url + "\n" + main_html, lambda: self.structured_data(main_html))
+        if structured is not None:
+            logger.info(f"structured data ({structured['source']}) on {self.url}, skipping the LLM")
+            return structured
+        # Only the recipe block goes into the prompt; the rest of the page is tokens and latency
+        raw_text = self.recipe_text(main_html, condensed=True)
+        if parse is None:
+            result = json.loads(self.remembered("llm", raw_text, lambda: ollama_parse(raw_text, self.url)))
         else:
-            print_html = self.fetch_page(print_url)
-            soup = BeautifulSoup(print_html, 'html.parser')
-            raw_text = soup.get_text(separator="\n", strip=True)
+            result = parse(raw_text, self.url)
+        return {"source": "llm", **result}
+
+    def scrape(self) -> Dict:
+        return self.recipe_text(self.fetch_page(self.url))
+
+    def recipe_text(self, main_html: str, condensed: bool = False) -> str:
+        # Keyed on the URL too: relative print links resolve against it
+        print_url = self.remembered("print_url", self.url + "\n" + main_html, lambda: self.find_print_url(main_html, self.url))
+        if print_url is None:
+            # No print view, the page itself is all we have
+            raw_text = self.html_text(main_html, condensed)
+        elif print_url.lower().endswith('.pdf'):
+            raw_text = self.fetch_pdf(print_url, condensed)
+        else:
+            raw_text = self.html_text(self.fetch_page(print_url), condensed)
         logger.info(f"{raw_text}")
         return raw_text #Print out the entire recipe
 
-def scrape_recipe(url: str) -> Dict:
-    scraper = RecipeScraper(url)
+def scrape_recipe(url: str, cache: Optional[FetchCache] = None, parser: str = DEFAULT_PARSER) -> Dict:
+    scraper = RecipeScraper(url, cache=cache, parser=parser)
     return scraper.scrape()
 
+def extract_recipe(url: str, cache: Optional[FetchCache] = None, parser: str = DEFAULT_PARSER,
+                   parse: Optional[Callable[[str, str], Dict]] = None) -> Dict:
+    scraper = RecipeScraper(url, cache=cache, parser=parser)
+    return scraper.extract(parse)
+
 class Ingredient(BaseModel):
     id: str
     amount: float
@@ -98,9 +213,149 @@ class Response(BaseModel):
     agent_response: str
     recipe: Recipe
 
-def ollama_parse(text: str, url: str):
+# schema.org Recipe -> Recipe, for pages that embed one (most recipe plugins do)
+
+FRACTIONS = {"½": 1/2, "⅓": 1/3, "⅔": 2/3, "¼": 1/4, "¾": 3/4, "⅕": 1/5, "⅛": 1/8, "⅜": 3/8, "⅝": 5/8, "⅞": 7/8}
+_FRACTION = "[" + "".join(FRACTIONS) + "]"
+# "1 1/2", "1/2", "1½", "1.5", "½", optionally a range ("2-3", "2 to 3") of which the first is kept
+QUANTITY_PATTERN = re.compile(
+    rf"^\s*(\d+\s+\d+\s*/\s*\d+|\d+\s*/\s*\d+|\d+\s*{_FRACTION}|\d+(?:[.,]\d+)?|{_FRACTION})"
+    rf"(?:\s*(?:-|–|to)\s*[\d./{''.join(FRACTIONS)}]+)?\s*"
+)
+UNITS = {
+    "cup": "cup", "cups": "cup", "c": "cup",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbsp": "tbsp", "tbs": "tbsp", "tbl": "tbsp", "T": "tbsp",
+    "teaspoon": "tsp", "teaspoons": "tsp", "tsp": "tsp", "t": "tsp",
+    "pound": "lb", "pounds": "lb", "lb": "lb", "lbs": "lb",
+    "ounce": "oz", "ounces": "oz", "oz": "oz",
+    "gram": "g", "grams": "g", "g": "g", "kilogram": "kg", "kilograms": "kg", "kg": "kg",
+    "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml", "ml": "ml",
+    "liter": "l", "liters": "l", "litre": "l", "litres": "l", "l": "l",
+    "clove": "clove", "cloves": "clove", "can": "can", "cans": "can", "pinch": "pinch", "pinches": "pinch",
+    "slice": "slice", "slices": "slice", "sprig": "sprig", "sprigs": "sprig", "piece": "piece", "pieces": "piece",
+    "stick": "stick", "sticks": "stick", "package": "package", "packages": "package", "bunch": "bunch", "dash": "dash",
+}
+# Sizes that qualify an ingredient without naming it: "1 large onion" is onion, 1 piece
+SIZE_PATTERN = re.compile(r"^(?:(?:extra[- ]?)?(?:small|medium|large|big)(?:-sized)?|jumbo|heaping|heaped|level)\s+", re.IGNORECASE)
+DURATION_PATTERN = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:[\d.]+S)?)?$")
+
+def schema_recipes(items):
+    """Every schema.org Recipe in extruct's output, including ones nested in @graph."""
+    for item in items if isinstance(items, list) else [items]:
+        if not isinstance(item, dict):
+            continue
+        types = item.get("@type", [])
+        if any(str(type).endswith("Recipe") for type in (types if isinstance(types, list) else [types])):
+            yield item
+        yield from schema_recipes(item.get("@graph", []))
+
+def _first(value):
+    return value[0] if isinstance(value, list) and value else value
+
+def _quantity(text: str) -> float:
+    total = 0.0
+    for part in re.findall(rf"\d+\s*/\s*\d+|\d+(?:[.,]\d+)?|{_FRACTION}", text):
+        if part in FRACTIONS:
+            total += FRACTIONS[part]
+        elif "/" in part:
+            numerator, denominator = part.split("/")
+            total += int(numerator) / int(denominator) if int(denominator) else 0
+        else:
+            total += float(part.replace(",", "."))
+    return total
+
+def _without_sizes(text: str) -> str:
+    while SIZE_PATTERN.match(text):
+        text = SIZE_PATTERN.sub("", text, count=1)
+    return text
+
+def parse_ingredient(line: str) -> Ingredient:
+    """ "1 1/2 cups flour, sifted" -> Ingredient(id="flour", amount=1.5, unit="cup")"""
+    line = " ".join(line.split())
+    amount, unit = 1.0, "to taste" # The LLM prompt's convention for "salt and pepper"-style lines
+    match = QUANTITY_PATTERN.match(line)
+    if match:
+        amount, unit, line = _quantity(match.group(1)), "piece", line[match.end():]
+        line = _without_sizes(re.sub(r"^\([^)]*\)\s*", "", line)) # "2 (14 oz) cans" -> "cans"
+        word, _, rest = line.partition(" ")
+        word = word.rstrip(".")
+        if word in UNITS or word.lower() in UNITS:
+            unit, line = UNITS.get(word, UNITS.get(word.lower())), rest
+    name = re.split(r"[,(]", _without_sizes(re.sub(r"^of\s+", "", line)), maxsplit=1)[0].strip().lower().removesuffix(" to taste")
+    return Ingredient(id=re.sub(r"\s+", "_", name) or "ingredient", amount=amount, unit=unit)
+
+def _minutes(duration) -> Optional[int]:
+    match = DURATION_PATTERN.match(str(_first(duration) or "").strip())
+    if not match or not any(match.groups()):
+        return None
+    days, hours, minutes = (int(group or 0) for group in match.groups())
+    return days * 1440 + hours * 60 + minutes
+
+def _steps(instructions) -> List[str]:
+    """recipeInstructions flattened: a string, strings, HowToSteps, HowToSections of either."""
+    if isinstance(instructions, str):
+        return [line.strip() for line in instructions.split("\n") if line.strip()]
+    steps = []
+    for item in instructions if isinstance(instructions, list) else [instructions]:
+        if isinstance(item, str):
+            steps.extend(_steps(item))
+        elif isinstance(item, dict):
+            if "itemListElement" in item:
+                steps.extend(_steps(item["itemListElement"]))
+            elif item.get("text") or item.get("name"):
+                steps.append(" ".join(str(item.get("text") or item.get("name")).split()))
+    return steps
 
-    schema = """
+def _names(value) -> List[str]:
+    """Strings from a schema.org text-or-thing value, lists and comma-separated keywords split out."""
+    names = []
+    for item in value if isinstance(value, list) else [value]:
+        if isinstance(item, dict):
+            item = item.get("name") or item.get("url") or ""
+        names.extend(part.strip() for part in str(item or "").split(",") if part.strip())
+    return names
+
+def _names_or_lines(value) -> List[str]:
+    """recipeIngredient lines; unlike _names, commas inside a line are kept."""
+    return [" ".join(str(line).split()) for line in (value if isinstance(value, list) else [value]) if line and str(line).strip()]
+
+def recipe_from_schema(item: Dict, url: str) -> Optional[Recipe]:
+    """A Recipe from a schema.org Recipe dict, or None if it lacks a name, ingredients,
+    instructions, yield or time (the LLM estimates those; structured data that omits them
+    goes to the LLM instead)."""
+    title = " ".join(str(_first(item.get("name")) or "").split())
+    ingredients = [parse_ingredient(line) for line in _names_or_lines(item.get("recipeIngredient") or item.get("ingredients"))]
+    steps = _steps(item.get("recipeInstructions") or [])
+    serves = next((int(n) for n in re.findall(r"\d+", " ".join(map(str, _names(item.get("recipeYield"))))) if int(n)), None)
+    minutes = _minutes(item.get("totalTime"))
+    if minutes is None and (item.get("prepTime") or item.get("cookTime")):
+        minutes = (_minutes(item.get("prepTime")) or 0) + (_minutes(item.get("cookTime")) or 0)
+    missing = [name for name, value in (("name", title), ("ingredients", ingredients), ("instructions", steps),
+                                        ("yield", serves), ("time", minutes)) if not value]
+    if missing:
+        logger.info(f"schema.org Recipe on {url} is missing {', '.join(missing)}")
+        return None
+    image = _first(item.get("image"))
+    tags = []
+    for tag in _names(item.get("keywords")) + _names(item.get("recipeCuisine")) + _names(item.get("recipeCategory")):
+        if tag.lower() not in (existing.lower() for existing in tags):
+            tags.append(tag)
+    return Recipe(
+        title=title,
+        time=f"{minutes} Mins",
+        serves=serves,
+        creator=(_names(item.get("author")) or [urlparse(url).netloc.removeprefix("www.")])[0],
+        ingredients=ingredients,
+        description=" ".join(str(_first(item.get("description")) or "").split()),
+        instructions=Instructions(Steps=steps),
+        image_source=str((image.get("url") if isinstance(image, dict) else image) or ""),
+        category=(_names(item.get("recipeCategory")) or ["Other"])[0],
+        tags=tags[:8],
+    )
+
+MODEL = 'llama3:latest'
+
+SCHEMA_EXAMPLE = """
     {
         "title": "Spaghetti and Meatballs",
         "time": "30 Mins",
@@ -133,9 +388,9 @@ def ollama_parse(text: str, url: str):
     }
     """
 
-    response: ChatResponse = chat(
-        model='llama3:latest',
-        messages=[
+def parse_messages(text: str) -> List[Dict]:
+    """The chat messages asking the model to turn recipe text into a Response."""
+    return [
             {
                 'role': 'user',
                 'content': f"""
@@ -149,12 +404,17 @@ def ollama_parse(text: str, url: str):
                     - Ensure "tags" is a JSON array of exactly 8 strings, inferring from context if needed (e.g., ["Chinese", "Pork", ...]).
                     - Ensure the JSON is complete with all closing braces.
 
-                    Schema: {schema}
+                    Schema: {SCHEMA_EXAMPLE}
 
                     Recipe Text: {text}
                 """
             },
-        ],
+        ]
+
+def ollama_parse(text: str, url: str):
+    response: ChatResponse = chat(
+        model=MODEL,
+        messages=parse_messages(text),
         format=Response.model_json_schema(),  # Pass the schema
     )
     data = response.message.content
@@ -1,18 +1,36 @@
-from recipe_scraper import scrape_recipe, ollama_parse
-import json
+import asyncio
+from collections import Counter
+from crawler import CrawlConfig, Crawler
+from fetch_cache import FetchCache
+from parse_service import ParseService
+from recipe_log import RecipeLog
 
 urls = [
     # Website
 ]
-for url in urls:
-        recipe = scrape_recipe(url)
-        result = ollama_parse(recipe, url)
-        data = json.loads(result)
+# Pages are fetched by the crawler (per-host limits, robots.txt, retries); LLM calls are
+# capped separately by the parse service.
+# Re-runs skip URLs already in recipes.ndjson, revalidate pages instead of downloading
+# them and don't ask the LLM about text it has already parsed.
+# Load the recipes into the app with: python -m app.ingest recipe_scraper/recipes.ndjson
+config = CrawlConfig(concurrency=8)
+cache = FetchCache("scrape_cache.db")
+sources = Counter()
 
-        with open("test.json", "r+") as json_file:
+async def scrape(log: RecipeLog, service: ParseService):
+    todo = [url for url in urls if url not in log]
+    print(f"{len(urls) - len(todo)} urls already in {log.path}")
+    async with Crawler(config, cache=cache, service=service) as crawler:
+        async for result in crawler.crawl(todo):
+            try:
+                if result.error:
+                    raise ValueError(result.error)
+                log.append(result.url, result.recipe)
+            except Exception as e:
+                print(f"failed: {result.url}: {e}")
+                continue
+            sources[result.recipe["source"]] += 1 # "json-ld"/"microdata" skipped the LLM, "llm" didn't
 
-            file_data=json.load(json_file)
-            file_data["recipes"].append(data)
-
-        with open("test.json", 'w') as json_file:
-            json.dump(file_data, json_file, indent=4, ensure_ascii=False)
\ No newline at end of file
+with RecipeLog("recipes.ndjson") as log, ParseService(cache=cache) as service:
+    asyncio.run(scrape(log, service))
+print(dict(sources), dict(service.stats))
@@ -0,0 +1,107 @@
+"""Local stand-in for Ollama's /api/chat, for running the parse service without a model.
+
+Replies with a Response built from the recipe text in the prompt (first line as the
+title, lines starting with a number as ingredients, the rest as steps). Latency is a
+fixed part plus a part per prompt token (~4 characters), so prompt size shows up the
+way it does with a real model, and `parallel` requests are served at once like
+OLLAMA_NUM_PARALLEL. With malformed > 0, that share of first attempts gets truncated
+JSON, so retries can be exercised; a retry (more than one message) always gets valid JSON.
+With invalid > 0, that share of all replies is well-formed JSON without a recipe, which
+no retry fixes.
+
+    python stub_ollama.py --port 11435 --latency-ms 500 --ms-per-1k-tokens 300 --parallel 4
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def stub_response(text: str) -> dict:
+    lines = [line.strip() for line in text.splitlines() if line.strip()] or ["Untitled"]
+    ingredients, steps = [], []
+    for line in lines[1:]:
+        match = re.match(r"^(\d+(?:\.\d+)?)\s+(\S+)\s+(.+)$", line)
+        if match:
+            ingredients.append({"id": match.group(3).lower().replace(" ", "_"), "amount": float(match.group(1)), "unit": match.group(2)})
+        else:
+            steps.append(line)
+    return {
+        "agent_response": "Stub model reply.",
+        "recipe": {
+            "title": lines[0][:80], "time": "30 Mins", "serves": 4, "creator": "Unknown", "ingredients": ingredients,
+            "description": lines[0][:80], "instructions": {"Steps": steps[:20]}, "image_source": "", "category": "Dinner",
+            "tags": ["stub"] * 8,
+        },
+    }
+
+def serve(port: int = 0, latency_ms: float = 500, ms_per_1k_tokens: float = 300, parallel: int = 4,
+          malformed: float = 0.0, seed: int = 0, invalid: float = 0.0) -> ThreadingHTTPServer:
+    """Start the stub on a daemon thread; server.server_address has the port."""
+    slots = threading.Semaphore(parallel)
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if self.path != "/api/chat":
+                return self._send(404, {"error": "not found"})
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            messages = request.get("messages", [])
+            prompt = "".join(message.get("content", "") for message in messages)
+            text = prompt.split("Recipe Text:", 1)[-1]
+            with slots:
+                time.sleep((latency_ms + ms_per_1k_tokens * len(prompt) / 4 / 1000) / 1000)
+            content = json.dumps(stub_response(text))
+            with rng_lock:
+                broken = len(messages) == 1 and rng.random() < malformed
+                unusable = rng.random() < invalid
+            if unusable:
+                content = json.dumps({"agent_response": "I could not find a recipe."})
+            elif broken:
+                content = content[: len(content) // 2]
+            self._send(200, {
+                "model": request.get("model", "stub"), "created_at": datetime.now(timezone.utc).isoformat(),
+                "message": {"role": "assistant", "content": content}, "done": True, "done_reason": "stop",
+                "prompt_eval_count": len(prompt) // 4,
+            })
+
+        def _send(self, status: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=300)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--malformed", type=float, default=0.0)
+    parser.add_argument("--invalid", type=float, default=0.0)
+    args = parser.parse_args()
+    server = serve(args.port, args.latency_ms, args.ms_per_1k_tokens, args.parallel, args.malformed, invalid=args.invalid)
+    print(f"Stub Ollama on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import sys
+import os
+# The scraper's modules import each other by name, as they do when run from recipe_scraper/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import stub_ollama
+from fetch_cache import FetchCache
+
+@pytest.fixture
+def ollama_host():
+    """A stub_ollama server replying at once; the test gets its URL."""
+    servers = []
+    def start(**options):
+        server = stub_ollama.serve(0, latency_ms=0, ms_per_1k_tokens=0, **options)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def fetch_cache(tmp_path):
+    cache = FetchCache(str(tmp_path / "scrape_cache.db"))
+    yield cache
+    cache.close()
+
+@pytest.fixture
+def site():
+    """A local site serving {path: (status, body)}, body HTML text or PDF bytes; the test gets its base URL and the paths requested."""
+    pages, requested = {}, []
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requested.append(self.path)
+            status, body = pages.get(self.path, (404, ""))
+            self.send_response(status)
+            if isinstance(body, bytes):
+                # No Content-Length: the body runs to the end of the connection, so size limits apply mid-download
+                self.send_header("Content-Type", "application/pdf")
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            data = body.encode()
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", pages, requested
+    server.shutdown()
+    server.server_close()
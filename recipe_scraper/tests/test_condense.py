@@ -0,0 +1,57 @@
+from pathlib import Path
+from condense import condense_html, condense_text, recipe_sections
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+def fixture(name: str) -> str:
+    return (FIXTURES / name).read_text()
+
+def test_recipe_block():
+    """A recipe card is cut out of the page: no navigation, buttons, nutrition or comments."""
+    lines = condense_html(fixture("recipe_card.html")).splitlines()
+    assert lines == [
+        "Garlic Butter Rice", "Serves 4 | Total time 30 mins",
+        "Ingredients", "2 cups rice", "1 tbsp butter", "2 cloves garlic, minced",
+        "Instructions", "Rinse the rice until the water runs clear.", "Melt the butter with the garlic.",
+        "Cook the rice in the garlic butter with 3 cups of water.",
+    ]
+
+def test_no_recipe_block():
+    """Without a recipe block the whole page text is kept, less boilerplate and repeated lines."""
+    lines = condense_html(fixture("no_recipe.html")).splitlines()
+    assert lines == [
+        "Our Trip to Rome", "We spent a week in Rome and ate pasta every day.",
+        "The best carbonara was in a tiny place near the Pantheon.",
+        "Day one: the Colosseum", "Day two: the Vatican",
+    ]
+
+def test_several_recipe_blocks():
+    """Of several recipe cards, the page's own recipe wins over sidebar and related ones."""
+    lines = condense_html(fixture("several_recipes.html")).splitlines()
+    assert lines[0] == "Weeknight Soup"
+    assert "4 cups vegetable stock" in lines and "Season with the salt." in lines
+    assert not any("Toast" in line or "Lentil" in line or "lentils" in line for line in lines)
+
+def test_unmarked_lists():
+    """Without a card, the ingredient and step lists' common parent is the block."""
+    html = """<html><body><h1>Pancakes</h1><ul><li><a>Home</a></li><li><a>About</a></li></ul>
+    <div class="post"><p>Intro text.</p><div class="entry"><ul><li>2 eggs</li><li>1 cup flour</li></ul>
+    <ol><li>Whisk everything.</li><li>Fry in a pan.</li></ol></div><p>Thanks for reading.</p></div></body></html>"""
+    assert condense_html(html).splitlines() == ["Pancakes", "2 eggs", "1 cup flour", "Whisk everything.", "Fry in a pan."]
+
+def test_condense_text_budget():
+    text = "\n".join(f"Line {number} of a long story" for number in range(1000))
+    condensed = condense_text(text, max_tokens=50)
+    assert len(condensed) <= 50 * 4
+    assert condensed.startswith("Line 0 of a long story")
+
+def test_recipe_sections():
+    """PDF pages split into recipes: the next title goes with the next recipe, nutrition is dropped."""
+    pages = [
+        "Rice\nIngredients\n2 cups rice\nInstructions\n1. Cook it.",
+        "Soup\nIngredients\n1 onion\nInstructions\n1. Simmer it.\nNutrition\nCalories: 90",
+    ]
+    assert list(recipe_sections(pages)) == [
+        ["Rice", "Ingredients", "2 cups rice", "Instructions", "1. Cook it."],
+        ["Soup", "Ingredients", "1 onion", "Instructions", "1. Simmer it."],
+    ]
@@ -0,0 +1,83 @@
+import asyncio
+import httpx
+from crawler import CrawlConfig, CrawlResult, Crawler
+from parse_service import ParseService
+
+PAGE = """<html><body><h1>Garlic Butter Rice</h1>
+<ul><li>2 cup rice</li><li>1 tbsp butter</li></ul>
+<ol><li>Rinse the rice.</li><li>Cook it with the butter until tender.</li></ol>
+</body></html>"""
+
+def crawl(urls, handler, **options):
+    """The crawl's results by URL, against handler for every request."""
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with Crawler(CrawlConfig(retries=0), client=client, **options) as crawler:
+            return {result.url: result async for result in crawler.crawl(urls)}
+    return asyncio.run(run())
+
+def site(robots=None, robots_status=200):
+    requested = []
+    def handler(request):
+        requested.append(request.url.path)
+        if request.url.path == "/robots.txt":
+            return httpx.Response(robots_status if robots is not None else 404, text=robots or "")
+        return httpx.Response(200, text=PAGE, headers={"Content-Type": "text/html"})
+    return handler, requested
+
+def test_crawl_text():
+    handler, requested = site()
+    results = crawl(["https://example.com/rice"], handler)
+    assert "2 cup rice" in results["https://example.com/rice"].text
+    assert results["https://example.com/rice"].recipe is None
+    assert requested == ["/robots.txt", "/rice"]
+
+def test_crawl_parses_text(ollama_host):
+    """With a service, text pages come back parsed, like RecipeScraper.extract's LLM results."""
+    handler, _ = site()
+    with ParseService(host=ollama_host()) as service:
+        results = crawl(["https://example.com/rice"], handler, service=service)
+    result = results["https://example.com/rice"]
+    assert result.error is None
+    assert result.recipe["source"] == "llm"
+    assert result.recipe["recipe"]["title"] == "Garlic Butter Rice"
+
+def test_crawl_robots():
+    """robots.txt is fetched once per host, and disallowed pages are never requested."""
+    handler, requested = site("User-agent: *\nDisallow: /private/\n")
+    urls = ["https://example.com/rice", "https://example.com/private/rice", "https://example.com/soup"]
+    results = crawl(urls, handler)
+    assert "robots.txt" in results["https://example.com/private/rice"].error
+    assert results["https://example.com/rice"].text and results["https://example.com/soup"].text
+    assert sorted(requested) == ["/rice", "/robots.txt", "/soup"]
+
+def test_crawl_robots_forbidden():
+    handler, requested = site("", robots_status=403)
+    results = crawl(["https://example.com/rice"], handler)
+    assert "robots.txt" in results["https://example.com/rice"].error
+    assert requested == ["/robots.txt"]
+
+def test_crawler_config_not_shared():
+    first, second = Crawler(), Crawler()
+    first.config.rate = 0
+    assert second.config.rate == CrawlConfig().rate
+    asyncio.run(first.client.aclose())
+    asyncio.run(second.client.aclose())
+
+def test_crawl_results_bounded():
+    """A consumer that stops reading holds the workers back: the crawl doesn't run ahead of it."""
+    scraped = []
+    async def run():
+        crawler = Crawler(CrawlConfig(concurrency=2, queue_size=2))
+        async def scrape(url):
+            scraped.append(url)
+            return CrawlResult(url)
+        crawler.scrape = scrape
+        async with crawler:
+            results = crawler.crawl(f"https://example.com/{number}" for number in range(100))
+            await anext(results)
+            await asyncio.sleep(0.1)
+            await results.aclose()
+    asyncio.run(run())
+    # The one consumed, a full results queue and one result waiting in each worker
+    assert len(scraped) <= 1 + 2 + 2
@@ -0,0 +1,48 @@
+import pytest
+from parse_service import ParseError, ParseService
+
+RECIPE_TEXT = """Garlic Butter Rice
+2 cup rice
+1 tbsp butter
+Rinse the rice.
+Cook it with the butter until tender."""
+
+def test_parse(ollama_host):
+    """A valid reply comes back as the Response, in one call."""
+    with ParseService(host=ollama_host()) as service:
+        result = service.parse(RECIPE_TEXT, "https://example.com/rice")
+    assert result["recipe"]["title"] == "Garlic Butter Rice"
+    assert [ingredient["id"] for ingredient in result["recipe"]["ingredients"]] == ["rice", "butter"]
+    assert service.stats["calls"] == 1
+
+def test_parse_cache_hit(ollama_host, fetch_cache):
+    """Text already parsed, even reformatted or by another service on the cache, costs no call."""
+    host = ollama_host()
+    with ParseService(host=host, cache=fetch_cache) as service:
+        first = service.parse(RECIPE_TEXT, "https://example.com/rice")
+        reformatted = "\n\n".join("  " + line.replace(" ", "   ") for line in RECIPE_TEXT.splitlines())
+        assert service.parse(reformatted, "https://example.com/rice-print") == first
+    assert service.stats["calls"] == 1
+    assert service.stats["cache_hits"] == 1
+    with ParseService(host=host, cache=fetch_cache) as restarted:
+        assert restarted.parse(RECIPE_TEXT, "https://example.com/rice") == first
+    assert restarted.stats["calls"] == 0
+
+def test_parse_retries_malformed_json(ollama_host):
+    """Truncated JSON is sent back with the error, and the corrected reply is used."""
+    with ParseService(host=ollama_host(malformed=1.0)) as service:
+        result = service.parse(RECIPE_TEXT, "https://example.com/rice")
+    assert result["recipe"]["title"] == "Garlic Butter Rice"
+    assert service.stats["calls"] == 2
+    assert service.stats["retries"] == 1
+    assert service.stats["failures"] == 0
+
+def test_parse_rejects_invalid_response(ollama_host, fetch_cache):
+    """A reply without a recipe fails validation on every attempt: ParseError, nothing cached."""
+    with ParseService(host=ollama_host(invalid=1.0), retries=2, cache=fetch_cache) as service:
+        with pytest.raises(ParseError):
+            service.parse(RECIPE_TEXT, "https://example.com/rice")
+    assert service.stats["calls"] == 3
+    assert service.stats["retries"] == 2
+    assert service.stats["failures"] == 1
+    assert fetch_cache.lookup(service.cache_kind, RECIPE_TEXT)[0] is False
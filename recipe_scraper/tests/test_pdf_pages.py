@@ -0,0 +1,70 @@
+import tempfile
+import pytest
+import requests
+from benchmark_pdf import cookbook_pdf
+from pdf_pages import PdfSpool, PdfTooLarge, download_pdf, iter_pages, page_count, parallel_pages
+from recipe_scraper import HEADERS, RecipeScraper
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    """Temporary files (the PDF spools) go to a directory of the test's own, to check what's left in it."""
+    directory = tmp_path / "tmp"
+    directory.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(directory))
+    return directory
+
+@pytest.fixture
+def cookbook(tmp_path):
+    path = tmp_path / "cookbook.pdf"
+    path.write_bytes(cookbook_pdf(20, image_kb=1))
+    return str(path)
+
+def titles(pages):
+    return [page.splitlines()[0] for page in pages]
+
+def test_iter_pages(cookbook):
+    assert page_count(cookbook) == 20
+    assert titles(iter_pages(cookbook)) == [f"Cookbook Recipe {number}" for number in range(1, 21)]
+    assert titles(iter_pages(cookbook, 5, 8)) == ["Cookbook Recipe 6", "Cookbook Recipe 7", "Cookbook Recipe 8"]
+
+def test_parallel_pages(cookbook):
+    """Page ranges extracted in separate processes come back in page order."""
+    assert titles(parallel_pages(cookbook, workers=2)) == [f"Cookbook Recipe {number}" for number in range(1, 21)]
+
+def test_spool(temp_dir):
+    data = cookbook_pdf(1, image_kb=1)
+    with PdfSpool("https://example.com/card.pdf") as spool:
+        spool.write(data[:100])
+        spool.write(data[100:])
+        spool.finish()
+        assert spool.size == len(data)
+        assert titles(iter_pages(spool.path)) == ["Cookbook Recipe 1"]
+    assert list(temp_dir.iterdir()) == []
+    with pytest.raises(PdfTooLarge):
+        PdfSpool("https://example.com/card.pdf", max_bytes=10, content_length="11")
+    assert list(temp_dir.iterdir()) == []
+
+def test_fetch_pdf(site, temp_dir):
+    """The first recipe is extracted, and the spool is gone afterwards."""
+    base, pages, _ = site
+    pages["/cookbook.pdf"] = (200, cookbook_pdf(3, image_kb=1))
+    text = RecipeScraper(f"{base}/recipe").fetch_pdf(f"{base}/cookbook.pdf")
+    assert text.splitlines()[0] == "Cookbook Recipe 1"
+    assert "Cookbook Recipe 2" not in text
+    assert list(temp_dir.iterdir()) == []
+
+def test_fetch_pdf_cleanup(site, temp_dir, monkeypatch):
+    """A failed extraction or an oversized download leaves no temporary file behind."""
+    base, pages, _ = site
+    data = cookbook_pdf(3, image_kb=1)
+    pages["/cookbook.pdf"] = (200, data)
+    scraper = RecipeScraper(f"{base}/recipe")
+    def broken(path):
+        raise ValueError("unreadable PDF")
+    monkeypatch.setattr(RecipeScraper, "pdf_text", staticmethod(broken))
+    with pytest.raises(ValueError):
+        scraper.fetch_pdf(f"{base}/cookbook.pdf")
+    assert list(temp_dir.iterdir()) == []
+    with pytest.raises(PdfTooLarge):
+        download_pdf(requests, f"{base}/cookbook.pdf", HEADERS, max_bytes=len(data) // 2)
+    assert list(temp_dir.iterdir()) == []
@@ -0,0 +1,45 @@
+import asyncio
+import json
+from crawler import CrawlConfig, crawl_to_file
+from recipe_log import RecipeLog
+
+RECIPE = {
+    "title": "Rice", "time": "20 Mins", "serves": 2, "creator": "x", "description": "d",
+    "ingredients": [{"id": "rice", "amount": 1, "unit": "cup"}], "instructions": {"Steps": ["Cook", "Serve"]},
+    "image_source": "", "category": "Dinner", "tags": ["Quick"],
+}
+PAGE = """<html><head><script type="application/ld+json">{"@context": "https://schema.org", "@type": "Recipe",
+"name": "Rice", "recipeYield": "2 servings", "totalTime": "PT20M", "recipeIngredient": ["1 cup rice"],
+"recipeInstructions": ["Cook", "Serve"]}</script></head>
+<body><h1>Rice</h1></body></html>"""
+
+def test_recover(tmp_path):
+    """Reopening keeps the logged URLs, skips unreadable lines and cuts off a partial last line."""
+    path = tmp_path / "recipes.ndjson"
+    path.write_text(
+        json.dumps({"url": "https://a.test/rice", "source": "json-ld", "recipe": RECIPE}) + "\n"
+        + '{"url": "https://a.test/garbled", "rec\n'
+        + json.dumps({"url": "https://a.test/stew", "source": "json-ld", "recipe": RECIPE})[:30]
+    )
+    with RecipeLog(str(path)) as log:
+        assert set(log.urls) == {"https://a.test/rice"}
+        assert log.append("https://a.test/stew", {"source": "llm", "recipe": RECIPE})
+        assert not log.append("https://a.test/rice", {"source": "llm", "recipe": RECIPE})
+    with RecipeLog(str(path)) as log:
+        assert len(log) == 2
+    assert path.read_text().endswith("\n")
+
+def test_crawl_to_log(tmp_path, site):
+    """Crawled recipes go into the log, URLs it already has are not fetched, the rest go to --out."""
+    base, pages, requested = site
+    pages["/old"] = pages["/rice"] = (200, PAGE)
+    path, out = tmp_path / "recipes.ndjson", tmp_path / "crawl.ndjson"
+    path.write_text(json.dumps({"url": f"{base}/old", "source": "json-ld", "recipe": RECIPE}) + "\n")
+    urls = [f"{base}/old", f"{base}/rice", f"{base}/missing"]
+    with RecipeLog(str(path)) as log:
+        assert asyncio.run(crawl_to_file(urls, str(out), CrawlConfig(retries=0, rate=0), log=log)) == 2
+    assert "/old" not in requested
+    logged = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["url"] for record in logged] == [f"{base}/old", f"{base}/rice"]
+    assert logged[1]["source"] == "json-ld"
+    assert [json.loads(line)["url"] for line in out.read_text().splitlines()] == [f"{base}/missing"]
@@ -0,0 +1,91 @@
+import pytest
+from recipe_scraper import _minutes, parse_ingredient, recipe_from_schema
+
+@pytest.mark.parametrize("line, expected", [
+    ("2 cups rice", ("rice", 2.0, "cup")),
+    ("1 1/2 cups flour, sifted", ("flour", 1.5, "cup")),
+    ("1/4 tsp nutmeg", ("nutmeg", 0.25, "tsp")),
+    ("0.5 kg potatoes", ("potatoes", 0.5, "kg")),
+    ("1,5 l water", ("water", 1.5, "l")),
+    ("½ cup milk", ("milk", 0.5, "cup")),
+    ("1½ tsp salt", ("salt", 1.5, "tsp")),
+    ("¾ cup of sugar", ("sugar", 0.75, "cup")),
+    ("2-3 cloves garlic, minced", ("garlic", 2.0, "clove")),
+    ("2 to 3 tbsp olive oil", ("olive_oil", 2.0, "tbsp")),
+    ("1–2 tsp chili flakes", ("chili_flakes", 1.0, "tsp")),
+    ("2 (14 oz) cans diced tomatoes", ("diced_tomatoes", 2.0, "can")),
+    ("1 (8 ounce) package cream cheese, softened", ("cream_cheese", 1.0, "package")),
+    ("3 Tbsp. butter", ("butter", 3.0, "tbsp")),
+    ("1 T honey", ("honey", 1.0, "tbsp")),
+    ("1 large onion, diced", ("onion", 1.0, "piece")),
+    ("2 extra-large eggs", ("eggs", 2.0, "piece")),
+    ("1 medium-sized carrot", ("carrot", 1.0, "piece")),
+    ("1 heaping tbsp of sugar", ("sugar", 1.0, "tbsp")),
+    ("Salt to taste", ("salt", 1.0, "to taste")),
+    ("Salt and pepper, to taste", ("salt_and_pepper", 1.0, "to taste")),
+    ("Fresh parsley (optional)", ("fresh_parsley", 1.0, "to taste")),
+])
+def test_parse_ingredient(line, expected):
+    ingredient = parse_ingredient(line)
+    assert (ingredient.id, ingredient.amount, ingredient.unit) == expected
+
+@pytest.mark.parametrize("duration, minutes", [
+    ("PT45M", 45),
+    ("PT1H30M", 90),
+    ("PT2H", 120),
+    ("P1DT2H", 1560),
+    ("PT20M30S", 20),
+    (["PT10M"], 10),
+    ("", None),
+    (None, None),
+    ("P", None),
+    ("45 minutes", None),
+])
+def test_minutes(duration, minutes):
+    assert _minutes(duration) == minutes
+
+SCHEMA = {
+    "@type": "Recipe",
+    "name": "  Garlic   Butter Rice ",
+    "recipeYield": ["4", "4 servings"],
+    "prepTime": "PT10M",
+    "cookTime": "PT20M",
+    "recipeIngredient": ["2 cups rice", "1 large onion, diced", "Salt to taste"],
+    "recipeInstructions": [
+        {"@type": "HowToSection", "name": "Rice", "itemListElement": [
+            {"@type": "HowToStep", "text": "Rinse the rice."},
+            {"@type": "HowToStep", "text": "Cook it."},
+        ]},
+        "Stir in the butter.",
+    ],
+    "author": {"@type": "Person", "name": "Jane Cook"},
+    "image": [{"@type": "ImageObject", "url": "https://example.com/rice.jpg"}],
+    "keywords": "rice, quick",
+    "recipeCuisine": "Quick",
+    "recipeCategory": "Side Dish",
+}
+
+def test_recipe_from_schema():
+    recipe = recipe_from_schema(SCHEMA, "https://www.example.com/rice")
+    assert recipe.title == "Garlic Butter Rice"
+    assert (recipe.time, recipe.serves, recipe.creator) == ("30 Mins", 4, "Jane Cook")
+    assert [ingredient.id for ingredient in recipe.ingredients] == ["rice", "onion", "salt"]
+    assert recipe.instructions.Steps == ["Rinse the rice.", "Cook it.", "Stir in the butter."]
+    assert recipe.image_source == "https://example.com/rice.jpg"
+    assert recipe.category == "Side Dish"
+    assert recipe.tags == ["rice", "quick", "Side Dish"] # "Quick" is already there
+
+def test_recipe_from_schema_defaults():
+    """totalTime wins over prep + cook; a missing author is the site, a missing category Other."""
+    item = {**SCHEMA, "totalTime": "PT1H", "author": None, "recipeCategory": None}
+    recipe = recipe_from_schema(item, "https://www.example.com/rice")
+    assert (recipe.time, recipe.creator, recipe.category) == ("60 Mins", "example.com", "Other")
+
+@pytest.mark.parametrize("missing", ["name", "recipeIngredient", "recipeInstructions", "recipeYield"])
+def test_recipe_from_schema_incomplete(missing):
+    """Structured data without a required field is left to the LLM."""
+    assert recipe_from_schema({**SCHEMA, missing: None}, "https://example.com/rice") is None
+
+def test_recipe_from_schema_without_time():
+    item = {key: value for key, value in SCHEMA.items() if key not in ("prepTime", "cookTime")}
+    assert recipe_from_schema(item, "https://example.com/rice") is None
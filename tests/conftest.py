@@ -2,11 +2,17 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from app.main import app as fastapi_app
 from app.database import get_session
+from app.auth import user_cache
+from app.response_cache import response_cache
 
 @pytest.fixture(scope="function")
 def test_engine():
@@ -31,9 +37,18 @@ def test_db(test_engine):
         yield session
 
 @pytest.fixture(scope="function")
-def client(test_db):
-    def _override_get_session():
-        yield test_db
+def test_async_engine(test_engine):
+    # App uses the async driver against the same file test_db reads from.
+    # NullPool: TestClient may run each request on a fresh event loop
+    return create_async_engine("sqlite+aiosqlite:///test.db", poolclass=NullPool)
+
+@pytest.fixture(scope="function")
+def client(test_async_engine):
+    async def _override_get_session():
+        async with AsyncSession(test_async_engine, expire_on_commit=False) as session:
+            yield session
     fastapi_app.dependency_overrides[get_session] = _override_get_session
+    user_cache.clear() # Identities from earlier tests' databases
+    asyncio.run(response_cache.clear())
     yield TestClient(fastapi_app)
     fastapi_app.dependency_overrides.clear()
\ No newline at end of file
@@ -1,7 +1,20 @@
 import json
-from app.models import User
-from app.auth import pwd_context
+import pytest
+from app.models import User, Recipe, RecipeTag
+from app.seed import recipes_exist, seed_recipes
+from app.ingest import SCRAPER_USERNAME, checkpoint_path, ingest_log
+from app.migrations import HEAD, REVISIONS, SchemaOutOfDate, check_schema, current_revision, upgrade
+from app import auth
+from app.auth import pwd_context, create_access_token, user_cache
+from passlib.context import CryptContext
+from app.cache import TTLCache, cache_requests
+from app.response_cache import RedisBackend, response_cache
+from app.embeddings import recipe_index, update_index
+from app.collaborative import MODEL_FILE, build_model, interaction_index, load_interactions, load_model, update_model
+from app.database import create_engines
+from app import metrics
 from sqlmodel import select
+from sqlalchemy import text
 from tests.test_utils import create_user, login_user, create_recipe, create_rating
 import logging
 
@@ -66,6 +79,7 @@ def test_create_recipe(client, test_db):
     assert data["title"] == "Test Recipe"
     assert "id" in data
     assert data["author_id"] == 1
+    assert not {"rating_sum", "content_hash", "source_url"} & data.keys() # Internal columns
 
 def test_get_recipes_1(client, test_db):
     """Test retrieving empty recipe db."""
@@ -246,7 +260,7 @@ def test_update_rating_1(client, test_db):
     assert response.json()["detail"] == "Rating must be between 1 and 3"
 
 def test_update_rating_2(client, test_db):
-    """Test updating a rating that doesn’t exist for the authenticated user."""
+    """Test updating a rating that doesn’t exist for the authenticated user creates it."""
     create_user(client)
     token = login_user(client)
     recipe_response = create_recipe(client, token)
@@ -262,8 +276,10 @@ def test_update_rating_2(client, test_db):
     }
     response = client.put("/ratings/", json=rating_data, headers={"Authorization": f"Bearer {token2}"})
     logger.info(f"Update non-existent rating response: {response.text}")
-    assert response.status_code == 404
-    assert response.json()["detail"] == "Rating not found"
+    # PUT is an upsert, so the 2nd user's rating gets created
+    assert response.status_code == 200
+    assert response.json()["user_id"] == 2
+    assert response.json()["value"] == 3
 
 def test_remove_rating(client, test_db):
     """Test for remove user rating."""
@@ -362,3 +378,567 @@ def test_remove_favorite(client, test_db):
     assert response.status_code == 200
     data = response.json()
     assert data["message"] == f"Favorite (user_id=1, recipe_id={recipe_id}) removed successfully"
+
+def test_get_recipes_summary(client, test_db):
+    """Test list view only returns card fields."""
+    create_user(client)
+    token = login_user(client)
+    create_recipe(client, token)
+    response = client.get("/recipes/")
+    assert response.status_code == 200
+    data = response.json()[0]
+    assert data["title"] == "Test Recipe"
+    assert data["category"] == "category"
+    assert "ingredients" not in data
+    assert "instructions" not in data
+    assert "description" not in data
+    assert "Link" not in response.headers
+
+def test_get_recipes_paginated(client, test_db):
+    """Test walking the recipe list with limit and next cursor."""
+    create_user(client)
+    token = login_user(client)
+    for i in range(5):
+        create_recipe(client, token, f"Recipe {i}")
+    titles = []
+    url = "/recipes/?limit=2"
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        titles += [recipe["title"] for recipe in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/recipes/?limit=2&cursor={cursor}" if cursor else None
+        if cursor:
+            assert 'rel="next"' in response.headers["Link"]
+    assert titles == [f"Recipe {i}" for i in range(5)]
+
+def test_get_recipes_bad_cursor(client, test_db):
+    """Test malformed cursor is rejected."""
+    response = client.get("/recipes/?cursor=notacursor")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+def test_search_recipes(client, test_db):
+    """Test full-text search ranks title matches and covers ingredients and tags."""
+    create_user(client)
+    token = login_user(client)
+    create_recipe(client, token, "Garlic Bread", ingredients="bread, butter", tags=["Italian"])
+    create_recipe(client, token, "Pasta", ingredients="pasta, garlic", tags=["Italian"])
+    create_recipe(client, token, "Pancakes", ingredients="flour, milk", tags=["Breakfast"])
+    response = client.get("/recipes/search?q=garlic")
+    assert response.status_code == 200
+    titles = [recipe["title"] for recipe in response.json()]
+    assert titles == ["Garlic Bread", "Pasta"]
+    response = client.get("/recipes/search?q=breakf")
+    assert [recipe["title"] for recipe in response.json()] == ["Pancakes"]
+    response = client.get('/recipes/search?q="italian" -')
+    assert len(response.json()) == 2
+
+def test_search_index_skips_rating_writes(client, test_engine):
+    """Test the search update trigger, upgraded from the any-column one, ignores rating columns."""
+    with test_engine.begin() as connection:
+        connection.execute(text("DROP TRIGGER recipe_fts_au"))
+        connection.execute(text("CREATE TRIGGER recipe_fts_au AFTER UPDATE ON recipe BEGIN SELECT 1; END"))
+    upgrade(test_engine)
+    create_user(client)
+    token = login_user(client)
+    recipe_id = create_recipe(client, token, "Garlic Bread").json()["id"]
+    connection = test_engine.raw_connection()
+    try:
+        before = connection.total_changes
+        connection.execute("UPDATE recipe SET rating_count = 1, rating_sum = 5 WHERE id = ?", (recipe_id,))
+        assert connection.total_changes - before == 1 # The recipe row only, no index rows
+        connection.execute("UPDATE recipe SET title = 'Onion Bread' WHERE id = ?", (recipe_id,))
+        connection.commit()
+    finally:
+        connection.close()
+    assert [recipe["title"] for recipe in client.get("/recipes/search?q=onion").json()] == ["Onion Bread"]
+    assert client.get("/recipes/search?q=garlic").json() == []
+
+def test_search_recipes_paginated(client, test_db):
+    """Test search pages via offset and Link header."""
+    create_user(client)
+    token = login_user(client)
+    for i in range(3):
+        create_recipe(client, token, f"Soup {i}")
+    response = client.get("/recipes/search?q=soup&limit=2")
+    assert len(response.json()) == 2
+    assert "offset=2" in response.headers["Link"]
+    response = client.get("/recipes/search?q=soup&limit=2&offset=2")
+    assert len(response.json()) == 1
+    assert "Link" not in response.headers
+
+def test_filter_recipes(client, test_db):
+    """Test filtering by tag, ingredient and category together, category in any case."""
+    create_user(client)
+    token = login_user(client)
+    create_recipe(client, token, "Garlic Pasta", ingredients="200 g pasta, 2 cloves garlic", tags=["Vegetarian", "Italian"], category="Dinner")
+    create_recipe(client, token, "Garlic Steak", ingredients="1 steak, 2 cloves garlic", tags=["Meat"], category="Dinner")
+    create_recipe(client, token, "Veggie Wrap", ingredients="1 wrap, 1 tomato", tags=["Vegetarian"], category="Lunch")
+    response = client.get("/recipes/?ingredient=garlic&tag=vegetarian")
+    assert [recipe["title"] for recipe in response.json()] == ["Garlic Pasta"]
+    response = client.get("/recipes/?tag=Vegetarian&category=Lunch")
+    assert [recipe["title"] for recipe in response.json()] == ["Veggie Wrap"]
+    response = client.get("/recipes/?ingredient=garlic")
+    assert len(response.json()) == 2
+    response = client.get("/recipes/?category=dinner")
+    assert sorted(recipe["title"] for recipe in response.json()) == ["Garlic Pasta", "Garlic Steak"]
+    response = client.get("/recipes/?tag=vegetarian&category=LUNCH")
+    assert [recipe["title"] for recipe in response.json()] == ["Veggie Wrap"]
+
+def test_category_facet_mixed_case(client, test_db):
+    """Test categories differing only in case or spaces are one facet bucket, counting what its filter returns."""
+    create_user(client)
+    token = login_user(client)
+    create_recipe(client, token, "Pasta", category="Dinner")
+    create_recipe(client, token, "Steak", category="dinner")
+    create_recipe(client, token, "Stew", category="DINNER ")
+    create_recipe(client, token, "Wrap", category="Lunch")
+    categories = client.get("/recipes/facets").json()["categories"]
+    assert categories == {"DINNER": 3, "Lunch": 1}
+    for category, count in categories.items():
+        assert len(client.get("/recipes/", params={"category": category}).json()) == count
+
+def test_recipe_facets(client, test_db):
+    """Test facet counts follow the filters."""
+    create_user(client)
+    token = login_user(client)
+    create_recipe(client, token, "Garlic Pasta", ingredients="pasta, garlic", tags=["Vegetarian"], category="Dinner")
+    create_recipe(client, token, "Garlic Steak", ingredients="steak, garlic", tags=["Meat"], category="Dinner")
+    create_recipe(client, token, "Veggie Wrap", ingredients="wrap", tags=["Vegetarian"], category="Lunch")
+    response = client.get("/recipes/facets")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["tags"] == {"vegetarian": 2, "meat": 1}
+    assert data["categories"] == {"Dinner": 2, "Lunch": 1}
+    assert data["ingredients"]["garlic"] == 2
+    data = client.get("/recipes/facets?ingredient=garlic").json()
+    assert data["tags"] == {"meat": 1, "vegetarian": 1}
+    assert data["categories"] == {"Dinner": 2}
+
+def test_rating_aggregates(client, test_db):
+    """Test rating aggregates follow create, update and remove, and show up inline."""
+    create_user(client, "user1", "user1@example.com")
+    token1 = login_user(client, "user1")
+    recipe_id = create_recipe(client, token1).json()["id"]
+    create_user(client, "user2", "user2@example.com")
+    token2 = login_user(client, "user2")
+    create_rating(client, recipe_id, token1, value=3)
+    create_rating(client, recipe_id, token2, value=1)
+    data = client.get(f"/recipes/{recipe_id}").json()
+    assert data["average_rating"] == 2.0
+    assert data["rating_count"] == 2
+    assert "rating_sum" not in data
+    client.put("/ratings/", json={"recipe_id": recipe_id, "value": 2}, headers={"Authorization": f"Bearer {token2}"})
+    data = client.get("/recipes/").json()[0]
+    assert data["average_rating"] == 2.5
+    assert data["rating_count"] == 2
+    assert "rating_sum" not in data
+    client.request("DELETE", "/ratings/", json={"recipe_id": recipe_id, "value": 3}, headers={"Authorization": f"Bearer {token1}"})
+    response = client.get(f"/recipes/{recipe_id}/average-rating")
+    assert response.json()["average_rating"] == 2.0
+
+def test_batch_ratings(client, test_db):
+    """Test fetching rating aggregates for several recipes at once."""
+    create_user(client)
+    token = login_user(client)
+    first_id = create_recipe(client, token).json()["id"]
+    second_id = create_recipe(client, token).json()["id"]
+    create_rating(client, first_id, token, value=3)
+    response = client.get(f"/recipes/ratings?ids={first_id},{second_id},999")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"recipe_id": first_id, "average_rating": 3.0, "rating_count": 1},
+        {"recipe_id": second_id, "average_rating": 0.0, "rating_count": 0},
+    ]
+    response = client.get("/recipes/ratings?ids=1,abc")
+    assert response.status_code == 400
+
+def test_duplicate_rating(client, test_db):
+    """Test rating a recipe twice via POST."""
+    create_user(client)
+    token = login_user(client)
+    recipe_id = create_recipe(client, token).json()["id"]
+    create_rating(client, recipe_id, token, value=3)
+    response = create_rating(client, recipe_id, token, value=1)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Already rated"
+    response = client.get(f"/recipes/{recipe_id}")
+    assert response.json()["rating_count"] == 1
+
+def test_upsert_rating(client, test_db):
+    """Test PUT creates then updates the same rating row."""
+    create_user(client)
+    token = login_user(client)
+    recipe_id = create_recipe(client, token).json()["id"]
+    headers = {"Authorization": f"Bearer {token}"}
+    first = client.put("/ratings/", json={"recipe_id": recipe_id, "value": 1}, headers=headers).json()
+    second = client.put("/ratings/", json={"recipe_id": recipe_id, "value": 3}, headers=headers).json()
+    assert first["id"] == second["id"]
+    assert second["value"] == 3
+    data = client.get(f"/recipes/{recipe_id}").json()
+    assert data["rating_count"] == 1
+    assert data["average_rating"] == 3.0
+    response = client.put("/ratings/", json={"recipe_id": 999, "value": 3}, headers=headers)
+    assert response.status_code == 404
+
+def test_sqlite_production_profile(tmp_path, monkeypatch):
+    """Test the production profile's pragmas and env-driven pool size."""
+    monkeypatch.setenv("DB_POOL_SIZE", "7")
+    sync_engine, _ = create_engines(f"sqlite:///{tmp_path / 'profile.db'}", "production")
+    with sync_engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+    assert sync_engine.pool.size() == 7
+    sync_engine.dispose()
+
+def test_query_metrics(client, test_async_engine, monkeypatch):
+    """Test sampled query histograms and the slow-query counter on /metrics."""
+    monkeypatch.setattr(metrics, "QUERY_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(metrics, "SLOW_QUERY_MS", 0.0) # Every statement counts as slow
+    metrics.instrument_engine(test_async_engine.sync_engine)
+    slow_before = metrics.slow_queries.value()
+    create_user(client)
+    token = login_user(client)
+    recipe_id = create_recipe(client, token).json()["id"]
+    client.get(f"/recipes/{recipe_id}")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'db_queries_per_request_count{route="/recipes/{id}"}' in body
+    assert 'db_query_duration_seconds_bucket{route="/recipes/{id}",le="+Inf"}' in body
+    assert metrics.slow_queries.value() > slow_before
+
+def test_current_user_cache(client, test_db):
+    """Test repeat requests reuse the cached identity, with and without the uid claim."""
+    create_user(client)
+    token = login_user(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    hits = cache_requests.value(cache="auth_user", result="hit")
+    misses = cache_requests.value(cache="auth_user", result="miss")
+    first = client.get("/users/me", headers=headers)
+    second = client.get("/users/me", headers=headers)
+    assert first.json() == second.json()
+    assert second.json()["email"] == "test@example.com"
+    assert cache_requests.value(cache="auth_user", result="miss") == misses + 1
+    assert cache_requests.value(cache="auth_user", result="hit") == hits + 1
+    # Tokens without uid fall back to the username lookup
+    user_cache.clear()
+    legacy = create_access_token({"sub": "testuser"})
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {legacy}"})
+    assert response.status_code == 200
+    assert response.json()["username"] == "testuser"
+
+def test_login_rehashes_outdated_password(client, test_db, monkeypatch):
+    """Test login upgrades a hash made with older bcrypt cost settings."""
+    create_user(client)
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4))
+    login_user(client)
+    test_db.expire_all()
+    db_user = test_db.exec(select(User).where(User.username == "testuser")).first()
+    assert db_user.hashed_password.startswith("$2b$04$")
+    login_user(client) # New hash still verifies
+
+def test_password_pool_backpressure(client, test_db, monkeypatch):
+    """Test logins get 503 once the password pool and its queue are full."""
+    create_user(client)
+    monkeypatch.setattr(auth, "_password_calls", auth.PASSWORD_WORKERS + auth.PASSWORD_QUEUE_LIMIT)
+    response = client.post("/users/token", json={"username": "testuser", "password": "password123"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_seed_recipes_idempotent(test_engine, test_db, tmp_path):
+    """Test the seed loader reads both file shapes and skips recipes already loaded."""
+    recipe = {
+        "title": "Seeded Soup", "description": "test", "time": "10 Mins", "serves": 2,
+        "ingredients": [{"id": "Leek", "amount": 1, "unit": "piece"}, {"id": "butter", "amount": 1.5, "unit": "tbsp"}],
+        "instructions": ["Simmer"], "image_source": "", "category": "Soup", "tags": ["French", "Soup"],
+    }
+    wrapped = tmp_path / "wrapped.json"
+    wrapped.write_text(json.dumps({"recipes": [{"recipe": recipe}, {"recipe": {**recipe, "title": "Other Soup"}}]}))
+    bare = tmp_path / "bare.json"
+    bare.write_text(json.dumps([recipe])) # Same recipe as in wrapped.json
+    assert not recipes_exist(test_engine)
+    assert seed_recipes(test_engine, [wrapped, bare], batch_size=1) == {"read": 3, "inserted": 2}
+    assert seed_recipes(test_engine, [wrapped, bare]) == {"read": 3, "inserted": 0}
+    assert recipes_exist(test_engine)
+    soup = test_db.exec(select(Recipe).where(Recipe.title == "Seeded Soup")).one()
+    assert soup.ingredients == "1 piece Leek\n, 1.5 tbsp butter\n"
+    tags = test_db.exec(select(RecipeTag.tag).where(RecipeTag.recipe_id == soup.id)).all()
+    assert sorted(tags) == ["french", "soup"]
+
+def test_ingest_recipe_log(test_engine, test_db, tmp_path):
+    """Test the scraper log loads once per URL, skips unreadable lines and a rerun resumes after the last complete line."""
+    def record(url, title):
+        return json.dumps({"url": url, "source": "json-ld", "recipe": {
+            "title": title, "time": "20 Mins", "serves": 2, "creator": "x", "description": "d",
+            "ingredients": [{"id": "rice", "amount": 1, "unit": "cup"}], "instructions": {"Steps": ["Cook", "Serve"]},
+            "image_source": "", "category": "Dinner", "tags": ["Quick"],
+        }}) + "\n"
+    log = tmp_path / "recipes.ndjson"
+    log.write_text(
+        record("https://a.test/rice", "Rice")
+        + json.dumps({"url": "https://a.test/broken", "error": "timeout"}) + "\n" # Crawler error record
+        + '{"url": "https://a.test/garbled", "rec\n' # Torn line from an older crawl, skipped
+        + record("https://a.test/rice", "Rice, rescraped")
+        + record("https://a.test/stew", "Stew")
+        + record("https://a.test/soup", "Soup")[:40] # Cut off by a crash
+    )
+    assert ingest_log(test_engine, log, batch_size=1) == {"read": 3, "inserted": 2, "invalid": 0}
+    assert int(checkpoint_path(log).read_text()) == log.read_text().rindex("\n") + 1
+    rice = test_db.exec(select(Recipe).where(Recipe.source_url == "https://a.test/rice")).one()
+    assert (rice.title, json.loads(rice.instructions)) == ("Rice", ["Cook", "Serve"])
+
+    # The scraper restarts: the partial line is replaced and loading picks up from the checkpoint
+    text = log.read_text()
+    log.write_text(text[:text.rindex("\n") + 1] + record("https://a.test/soup", "Soup"))
+    assert ingest_log(test_engine, log) == {"read": 1, "inserted": 1, "invalid": 0}
+    assert ingest_log(test_engine, log) == {"read": 0, "inserted": 0, "invalid": 0}
+    assert ingest_log(test_engine, log, from_start=True) == {"read": 4, "inserted": 0, "invalid": 0}
+
+def test_ingest_author(test_engine, test_db, tmp_path):
+    """Test ingest into an empty database credits recipes to the scraper user, or to --author-id."""
+    def record(url, title):
+        return json.dumps({"url": url, "source": "llm", "recipe": {
+            "title": title, "time": "20 Mins", "serves": 2, "creator": "x", "description": "d",
+            "ingredients": [{"id": "rice", "amount": 1, "unit": "cup"}], "instructions": {"Steps": ["Cook"]},
+            "image_source": "", "category": "Dinner", "tags": [],
+        }}) + "\n"
+    log = tmp_path / "recipes.ndjson"
+    log.write_text(record("https://a.test/rice", "Rice") + record("https://a.test/stew", "Stew"))
+    assert ingest_log(test_engine, log) == {"read": 2, "inserted": 2, "invalid": 0}
+    scraper = test_db.exec(select(User).where(User.username == SCRAPER_USERNAME)).one()
+    assert {recipe.author_id for recipe in test_db.exec(select(Recipe)).all()} == {scraper.id}
+    assert test_db.exec(select(User)).all() == [scraper]
+
+    author = User(username="editor", email="editor@example.com", hashed_password="x")
+    test_db.add(author)
+    test_db.commit()
+    with open(log, "a") as file:
+        file.write(record("https://a.test/soup", "Soup"))
+    assert ingest_log(test_engine, log, author_id=author.id)["inserted"] == 1
+    soup = test_db.exec(select(Recipe).where(Recipe.source_url == "https://a.test/soup")).one()
+    assert soup.author_id == author.id
+    assert len(test_db.exec(select(User)).all()) == 2
+
+def test_schema_revisions(test_engine):
+    """Test workers refuse an unmigrated DB and upgrade applies each revision once."""
+    with pytest.raises(SchemaOutOfDate):
+        check_schema(test_engine)
+    assert upgrade(test_engine) == [revision_id for revision_id, _, _ in REVISIONS]
+    assert current_revision(test_engine) == HEAD
+    check_schema(test_engine)
+    assert upgrade(test_engine) == []
+
+def test_recipe_conditional_get(client, test_db):
+    """Detail reads carry validators; a rating changes them."""
+    create_user(client)
+    token = login_user(client)
+    recipe_id = create_recipe(client, token).json()["id"]
+    response = client.get(f"/recipes/{recipe_id}")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "public, no-cache"
+    assert "Last-Modified" in response.headers
+    response = client.get(f"/recipes/{recipe_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    create_rating(client, recipe_id, token)
+    response = client.get(f"/recipes/{recipe_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["rating_count"] == 1
+    assert client.get("/recipes/999", headers={"If-None-Match": etag}).status_code == 404
+
+def test_recipe_list_conditional_get(client, test_db):
+    """List ETags follow the recipe table's write counter and the query string."""
+    create_user(client)
+    token = login_user(client)
+    create_recipe(client, token)
+    response = client.get("/recipes/?limit=5")
+    etag = response.headers["ETag"]
+    assert client.get("/recipes/?limit=5", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/recipes/?limit=6", headers={"If-None-Match": etag}).status_code == 200
+    create_recipe(client, token)
+    response = client.get("/recipes/?limit=5", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    # Bulk imports go through the same write hook: new ETag, cached pages dropped
+    etag = response.headers["ETag"]
+    body = json.dumps({"title": "Congee", "description": "d", "ingredients": "1 cup rice", "instructions": ["Cook"],
+                       "category": "Dinner", "image_source": "x.png", "serves": 2, "time": "10 Mins", "tags": []}) + "\n"
+    client.post("/recipes/bulk", content=body, headers={"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"})
+    response = client.get("/recipes/?limit=5", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+class FakeRedis:
+    """Local stand-in for the redis.asyncio client calls RedisBackend makes."""
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_response_cache(client, test_db, monkeypatch, backend):
+    """Hot reads are served from the cache until a write drops exactly what it changed."""
+    if backend == "redis":
+        monkeypatch.setattr(response_cache, "backend", RedisBackend(FakeRedis(), ttl=30))
+    create_user(client)
+    token = login_user(client)
+    recipe_id = create_recipe(client, token).json()["id"]
+    first = client.get(f"/recipes/{recipe_id}")
+    hits = cache_requests.value(cache="response", result="hit")
+    second = client.get(f"/recipes/{recipe_id}")
+    assert cache_requests.value(cache="response", result="hit") == hits + 1
+    assert second.json() == first.json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert client.get(f"/recipes/{recipe_id}", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert client.get("/recipes/").json() == client.get("/recipes/").json()
+    assert client.get(f"/recipes/{recipe_id}/average-rating").json() == {"average_rating": 0}
+
+    create_rating(client, recipe_id, token, value=3)
+    assert client.get(f"/recipes/{recipe_id}").json()["rating_count"] == 1
+    assert client.get(f"/recipes/{recipe_id}/average-rating").json() == {"average_rating": 3}
+    assert client.get("/recipes/").json()[0]["rating_count"] == 1
+    create_recipe(client, token)
+    assert len(client.get("/recipes/").json()) == 2
+    assert "cache_hit_ratio{cache=\"response\"}" in client.get("/metrics").text
+
+def test_response_cache_byte_limit():
+    cache = TTLCache("test_bytes", maxsize=100, ttl=60, maxbytes=10)
+    cache.set("a", b"12345", size=5)
+    cache.set("b", b"12345", size=5)
+    cache.get("a") # a is now the most recently used
+    cache.set("c", b"123", size=3)
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12345"
+    assert cache.bytes == 8
+
+def test_recommendations(client, test_engine, monkeypatch, tmp_path):
+    """Nearest recipes to the user's favorites, from the embedding index and its incremental path."""
+    monkeypatch.setattr(recipe_index, "directory", tmp_path)
+    monkeypatch.setattr(interaction_index, "directory", tmp_path)
+    create_user(client)
+    token = login_user(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    chili = create_recipe(client, token, title="Chili", ingredients="1 lb ground beef, 2 chili pepper, 1 can beans",
+                          tags=["Spicy", "Mexican"], category="Dinner").json()["id"]
+    tacos = create_recipe(client, token, title="Tacos", ingredients="1 lb ground beef, 4 tortillas, 1 chili pepper",
+                          tags=["Mexican"], category="Dinner").json()["id"]
+    cake = create_recipe(client, token, title="Cake", ingredients="2 cups flour, 3 eggs, 1 cup sugar",
+                         tags=["Dessert"], category="Dessert").json()["id"]
+    assert client.get("/recommendations/", headers=headers).json() == []
+    client.post("/favorites/", json={"recipe_id": chili}, headers=headers)
+    assert client.get("/recommendations/", headers=headers).status_code == 503 # Index not built
+
+    assert update_index(test_engine, tmp_path) == 3
+    ids = [recipe["id"] for recipe in client.get("/recommendations/", headers=headers).json()]
+    assert ids == [tacos, cake]
+
+    # Created after the build: embedded by the request's background task
+    chili_2 = create_recipe(client, token, title="Chili 2", ingredients="1 lb ground beef, 2 chili pepper, 1 can beans",
+                            tags=["Spicy", "Mexican"], category="Dinner").json()["id"]
+    ids = [recipe["id"] for recipe in client.get("/recommendations/?limit=2", headers=headers).json()]
+    assert ids == [chili_2, tacos]
+    assert update_index(test_engine, tmp_path) == 0 # Already indexed
+
+def test_recommendations_empty_index(client, test_engine, monkeypatch, tmp_path):
+    """An index built before any recipe exists loads and recommends nothing until recipes are added."""
+    monkeypatch.setattr(recipe_index, "directory", tmp_path)
+    monkeypatch.setattr(interaction_index, "directory", tmp_path)
+    assert update_index(test_engine, tmp_path) == 0
+    assert recipe_index.refresh()
+    assert recipe_index.recommend([1], [], 5) == []
+    create_user(client)
+    token = login_user(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/recommendations/", headers=headers).json() == []
+    soup = create_recipe(client, token, title="Soup").json()["id"]
+    client.post("/favorites/", json={"recipe_id": soup}, headers=headers)
+    response = client.get("/recommendations/", headers=headers)
+    assert response.status_code == 200 and response.json() == []
+
+def test_collaborative_recommendations(client, test_engine, monkeypatch, tmp_path):
+    """Recipes liked by users with similar interactions; refreshes only recompute affected recipes."""
+    monkeypatch.setattr(recipe_index, "directory", tmp_path)
+    monkeypatch.setattr(interaction_index, "directory", tmp_path)
+    tokens = {}
+    for name in ("alice", "bob", "carol", "dave"):
+        create_user(client, name, f"{name}@example.com")
+        tokens[name] = {"Authorization": f"Bearer {login_user(client, name)}"}
+    token = tokens["alice"]["Authorization"].removeprefix("Bearer ")
+    recipe_ids = [create_recipe(client, token, title=f"Recipe {i}").json()["id"] for i in range(5)]
+    def favorite(name, index):
+        client.post("/favorites/", json={"recipe_id": recipe_ids[index]}, headers=tokens[name])
+    for index in (0, 1):
+        favorite("alice", index)
+    for index in (0, 1, 2):
+        favorite("bob", index)
+    favorite("carol", 3)
+    favorite("dave", 4)
+    assert update_model(test_engine, tmp_path) == 5
+    response = client.get("/recommendations/", headers=tokens["alice"])
+    assert [recipe["id"] for recipe in response.json()] == [recipe_ids[2]]
+
+    # Carol's rating links recipe 3 to recipe 0; only recipe 0's interactions changed
+    client.post("/ratings/", json={"recipe_id": recipe_ids[0], "value": 3}, headers=tokens["carol"])
+    assert update_model(test_engine, tmp_path) == 1
+    rebuilt, _ = build_model(*load_interactions(test_engine))
+    incremental = load_model(tmp_path / MODEL_FILE)
+    order = incremental.recipe_ids.argsort()
+    assert (incremental.recipe_ids[order] == rebuilt.recipe_ids).all()
+    assert abs(incremental.neighbors[order][:, order] - rebuilt.neighbors).max() < 1e-6
+    response = client.get("/recommendations/", headers=tokens["alice"])
+    assert [recipe["id"] for recipe in response.json()] == [recipe_ids[2], recipe_ids[3]]
+    assert update_model(test_engine, tmp_path) == 0
+
+def test_bulk_import_and_export(client, test_db):
+    """NDJSON import reports per-row errors and duplicates; the export streams back importable rows."""
+    create_user(client)
+    headers = {"Authorization": f"Bearer {login_user(client)}", "Content-Type": "application/x-ndjson"}
+    def recipe(title, tags):
+        return json.dumps({"title": title, "description": "d", "ingredients": "1 cup rice, 2 eggs", "instructions": ["Cook"],
+                           "category": "Dinner", "image_source": "x.png", "serves": 2, "time": "10 Mins", "tags": tags})
+    body = "\n".join([
+        recipe("Fried Rice", ["Quick"]),
+        "{not json",
+        recipe("Omelette", ["Quick", "Breakfast"]),
+        json.dumps({"title": "No ingredients"}),
+        "",
+        recipe("Fried Rice", ["Quick"]),
+        recipe("Congee", ["Breakfast"]),
+    ]) + "\n"
+    response = client.post("/recipes/bulk", content=body, headers=headers)
+    assert response.status_code == 200
+    result = response.json()
+    assert {key: result[key] for key in ("received", "inserted", "duplicates", "failed")} == \
+        {"received": 6, "inserted": 3, "duplicates": 1, "failed": 2}
+    assert [error["line"] for error in result["errors"]] == [2, 4]
+    assert "ingredients" in result["errors"][1]["detail"]
+    assert [r["title"] for r in client.get("/recipes/?tag=breakfast").json()] == ["Omelette", "Congee"]
+
+    # Re-importing is a no-op
+    assert client.post("/recipes/bulk", content=body, headers=headers).json()["inserted"] == 0
+
+    response = client.get("/recipes/export")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Fried Rice", "Omelette", "Congee"]
+    assert rows[1]["tags"] == ["Quick", "Breakfast"] and rows[1]["instructions"] == ["Cook"]
+    result = client.post("/recipes/bulk", content=response.text, headers=headers).json()
+    assert (result["inserted"], result["duplicates"]) == (0, 3)